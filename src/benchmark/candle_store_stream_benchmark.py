@@ -0,0 +1,145 @@
+import argparse
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from benchmark.ib_websocket_stub_server import IBWebsocketStubServer
+
+from datasource.candle_store import CandleStore
+from datasource.ib_market_data_stream import IBMarketDataStream, convert_updated_time_to_us_datetime
+
+from constant.candle.bar_size import BarSize
+
+idx = pd.IndexSlice
+
+# Serves history from the ticks the stub server has sent, so history and stream describe the same market
+class StubHistoryConnector:
+    def __init__(self, stub_server: IBWebsocketStubServer):
+        self.__stub_server = stub_server
+        self.__requested_ticker_list = []
+
+    @property
+    def requested_ticker_list(self):
+        return self.__requested_ticker_list
+
+    def get_historical_candle_df(self, contract_list: list, period: str, bar_size: BarSize, outside_rth: str = 'true') -> pd.DataFrame:
+        self.__requested_ticker_list.extend(contract['symbol'] for contract in contract_list)
+
+        range_end_datetime = get_stub_datetime(self.__stub_server).replace(second=0, microsecond=0)
+        range_start_datetime = range_end_datetime - pd.Timedelta(minutes=int(period[:-3]))
+        return self.__stub_server.get_candle_df(contract_list, range_start_datetime, range_end_datetime)
+
+def get_stub_datetime(stub_server: IBWebsocketStubServer):
+    return convert_updated_time_to_us_datetime(stub_server.last_tick_time_in_ms)
+
+def get_mismatch_list(candle_df: pd.DataFrame, history_candle_df: pd.DataFrame) -> list:
+    expected_candle_df = history_candle_df.reindex(index=candle_df.index, columns=candle_df.columns) if history_candle_df is not None else candle_df * np.nan
+    mismatch_np = ~np.isclose(candle_df.to_numpy(), expected_candle_df.to_numpy(), equal_nan=True)
+    row_position_np, column_position_np = np.nonzero(mismatch_np)
+
+    return [f'{candle_df.columns[column_position]} at {candle_df.index[row_position]}, got: {candle_df.iat[row_position, column_position]}, history: {expected_candle_df.iat[row_position, column_position]}'
+                for row_position, column_position in zip(row_position_np, column_position_np)]
+
+def mask_before_stream_start(candle_df: pd.DataFrame, ticker_to_stream_start_datetime_dict: dict) -> pd.DataFrame:
+    # Bars before the stream start are only partly observed by the stream
+    masked_candle_df = candle_df.copy()
+
+    for ticker in masked_candle_df.columns.get_level_values(0).unique():
+        stream_start_datetime = ticker_to_stream_start_datetime_dict.get(ticker)
+        before_stream_start_np = masked_candle_df.index < stream_start_datetime if stream_start_datetime is not None else np.full(len(masked_candle_df), True)
+        masked_candle_df.loc[before_stream_start_np, idx[ticker, :]] = np.nan
+
+    return masked_candle_df
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run candle store cycles against the Client Portal websocket stub and check the stream merged candles against history of the same ticks')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--ticker', type=int, default=5)
+    parser.add_argument('--cycle', type=int, default=5)
+    parser.add_argument('--cycle-interval-in-second', type=float, default=3)
+    parser.add_argument('--lookback-in-minute', type=int, default=30)
+    parser.add_argument('--tick-interval-in-ms', type=int, default=20)
+    parser.add_argument('--tick-time-step-in-ms', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-of-prior-close-tick', type=int, default=90)
+    args = parser.parse_args()
+
+    stub_server = IBWebsocketStubServer(args.port, args.tick_interval_in_ms, args.tick_time_step_in_ms, args.seed, args.no_of_prior_close_tick)
+    stub_server.start()
+
+    contract_list = [dict(con_id=100000 + position, symbol=f'STUB{position}') for position in range(args.ticker)]
+    stale_contract_list = [dict(con_id=200000 + position, symbol=f'STALE{position}') for position in range(args.ticker)]
+
+    # The lines only fit one scan family, the stale result has to give way to the candle store result
+    market_data_stream = IBMarketDataStream(websocket_url=stub_server.websocket_url, max_no_of_subscription=args.ticker)
+    market_data_stream.update_subscription('stale', stale_contract_list)
+    market_data_stream.start()
+
+    while not market_data_stream.is_connected or stub_server.last_tick_time_in_ms is None:
+        time.sleep(0.1)
+
+    candle_store = CandleStore(market_data_stream)
+    history_connector = StubHistoryConnector(stub_server)
+    failure_list = []
+    no_of_stream_cycle = 0
+
+    for cycle in range(args.cycle):
+        time.sleep(args.cycle_interval_in_second)
+
+        range_end_datetime = get_stub_datetime(stub_server)
+        range_start_datetime = range_end_datetime - pd.Timedelta(minutes=args.lookback_in_minute)
+        # Ticks sent before the range end have to reach the stream before the cycle reads them
+        time.sleep(args.tick_interval_in_ms * 5 / 1000)
+
+        no_of_requested_ticker = len(history_connector.requested_ticker_list)
+        cycle_start_time = time.time()
+        candle_df = candle_store.get_candle_df(history_connector, contract_list, BarSize.ONE_MINUTE, range_start_datetime, range_end_datetime)
+        cycle_time = time.time() - cycle_start_time
+
+        if candle_df is None:
+            print(f'Cycle {cycle}: no candle yet')
+            continue
+
+        is_stream_cycle = len(history_connector.requested_ticker_list) == no_of_requested_ticker
+        no_of_stream_cycle += is_stream_cycle
+
+        # The range end bar is still forming, only completed bars have a final history value to compare with
+        compare_candle_df = candle_df.iloc[:-1]
+        history_candle_df = stub_server.get_candle_df(contract_list, compare_candle_df.index[0], compare_candle_df.index[-1])
+        mismatch_list = get_mismatch_list(compare_candle_df, history_candle_df)
+        failure_list.extend(f'Cycle {cycle}: {mismatch}' for mismatch in mismatch_list)
+
+        # Every streamed bar since the stream start is checked, including minutes the candle store still takes from history
+        ticker_to_stream_start_datetime_dict = {contract['symbol']: market_data_stream.get_stream_start_datetime(contract['symbol']) for contract in contract_list}
+        stream_candle_df = market_data_stream.get_candle_df([contract['symbol'] for contract in contract_list], compare_candle_df.index[0], compare_candle_df.index[-1])
+        stream_mismatch_list = []
+
+        if stream_candle_df is not None:
+            stream_candle_df = mask_before_stream_start(stream_candle_df, ticker_to_stream_start_datetime_dict)
+            expected_candle_df = mask_before_stream_start(history_candle_df.reindex(index=stream_candle_df.index, columns=stream_candle_df.columns), ticker_to_stream_start_datetime_dict) if history_candle_df is not None else None
+            stream_mismatch_list = get_mismatch_list(stream_candle_df, expected_candle_df)
+            failure_list.extend(f'Cycle {cycle}: stream {mismatch}' for mismatch in stream_mismatch_list)
+
+        print(f'Cycle {cycle}: {"stream" if is_stream_cycle else "history"}, {cycle_time * 1000:.2f} ms, no. of bar: {len(compare_candle_df.dropna(how="all"))}, no. of mismatch: {len(mismatch_list)}, no. of stream mismatch: {len(stream_mismatch_list)}')
+
+    stats = market_data_stream.get_stats()
+    market_data_stream.stop()
+    stub_server.stop()
+
+    if no_of_stream_cycle == 0:
+        failure_list.append('No cycle is served from the stream, increase --cycle or --cycle-interval-in-second')
+
+    if stats['no_of_subscription'] > args.ticker:
+        failure_list.append(f'No. of subscription {stats["no_of_subscription"]} is over the limit {args.ticker}')
+
+    if set(stats['ticker']) != {contract['symbol'] for contract in contract_list}:
+        failure_list.append(f'Streamed ticker {sorted(stats["ticker"])} are not the most recent scanner result')
+
+    print(f'No. of message: {stats["no_of_message"]}, no. of subscription: {stats["no_of_subscription"]}, no. of stream cycle: {no_of_stream_cycle}/{args.cycle}')
+
+    for failure in failure_list:
+        print(f'FAILURE: {failure}')
+
+    if failure_list:
+        sys.exit(1)
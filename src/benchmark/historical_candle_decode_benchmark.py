@@ -0,0 +1,119 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from utils.dataframe_util import convert_historical_candle_response_to_df
+from utils.datetime_util import US_BUSINESS_DAY
+
+from constant.indicator.indicator import Indicator
+
+# Decoding path of IBConnector.get_historical_candle_df before the bulk decoder, kept as reference
+def convert_historical_candle_response_to_df_by_loop(candle_response_list: list, datetime_range_index: pd.DatetimeIndex, is_daily_candle: bool) -> pd.DataFrame:
+    ticker_candle_df_list = []
+
+    for historical_data in candle_response_list:
+        if 'error' in historical_data:
+            continue
+
+        if 'symbol' not in historical_data:
+            continue
+
+        ticker = historical_data['symbol']
+        historical_ohlcv_list = historical_data['data']
+
+        ohlcv_list = []
+        datetime_idx_list = []
+
+        for historical_ohlcv in historical_ohlcv_list:
+            open = historical_ohlcv['o']
+            high = historical_ohlcv['h']
+            low = historical_ohlcv['l']
+            close = historical_ohlcv['c']
+            volume = int(historical_ohlcv['v'] * 100)
+            dt = historical_ohlcv['t']
+            ohlcv_list.append([open, high, low, close, volume])
+            datetime_idx_list.append(dt)
+
+        if is_daily_candle:
+            datetime_index = (pd.DatetimeIndex(pd.to_datetime(datetime_idx_list, unit='ms', utc=False)
+                                                 .tz_localize('UTC')
+                                                 .tz_convert('US/Eastern')).tz_localize(None).date)
+        else:
+            datetime_index = (pd.DatetimeIndex(pd.to_datetime(datetime_idx_list, unit='ms', utc=False)
+                                                 .tz_localize('UTC')
+                                                 .tz_convert('US/Eastern')).tz_localize(None)
+                                                                           .floor('T'))
+
+        ticker_to_indicator_column = pd.MultiIndex.from_product([[ticker], [Indicator.OPEN.value, Indicator.HIGH.value, Indicator.LOW.value, Indicator.CLOSE.value, Indicator.VOLUME.value]])
+        single_ticker_candle_df = pd.DataFrame(ohlcv_list, columns=ticker_to_indicator_column, index=datetime_index)
+
+        if single_ticker_candle_df.index.duplicated().any():
+            single_ticker_candle_df = single_ticker_candle_df.loc[~single_ticker_candle_df.index.duplicated(keep='first')]
+
+        single_ticker_candle_df = single_ticker_candle_df.reindex(datetime_range_index)
+        ticker_candle_df_list.append(single_ticker_candle_df)
+
+    if not ticker_candle_df_list:
+        return None
+
+    return pd.concat(ticker_candle_df_list, axis=1)
+
+def generate_candle_response_list(no_of_ticker: int, no_of_bar: int, is_daily_candle: bool, seed: int) -> tuple:
+    rng = np.random.default_rng(seed)
+
+    if is_daily_candle:
+        datetime_range_index = pd.date_range(end=pd.Timestamp('2024-03-15'), periods=no_of_bar, freq=US_BUSINESS_DAY)
+        bar_datetime_index = datetime_range_index + pd.Timedelta(hours=4)
+    else:
+        datetime_range_index = pd.date_range(start=pd.Timestamp('2024-03-15 04:00'), periods=no_of_bar, freq='1min')
+        bar_datetime_index = datetime_range_index + pd.Timedelta(seconds=1)
+
+    timestamp_np = (bar_datetime_index.tz_localize('US/Eastern').tz_convert('UTC').asi8 // 10 ** 6).tolist()
+    candle_response_list = []
+
+    for ticker_no in range(no_of_ticker):
+        # Missing bars, a duplicated bar and integer prices as returned by the history endpoint
+        bar_position_list = sorted(rng.choice(no_of_bar, size=int(no_of_bar * 0.9), replace=False).tolist())
+        bar_position_list.insert(len(bar_position_list) // 2, bar_position_list[len(bar_position_list) // 2])
+        close_np = np.round(rng.uniform(1, 20, no_of_bar), 2)
+
+        data_list = [dict(o=float(close_np[position - 1]) if position > 0 else 1,
+                          h=float(close_np[position]) + 0.05,
+                          l=float(close_np[position]) - 0.05,
+                          c=float(close_np[position]),
+                          v=float(np.round(rng.uniform(0, 5000), 2)),
+                          t=timestamp_np[position]) for position in bar_position_list]
+        candle_response_list.append(dict(symbol=f'T{ticker_no}', data=data_list))
+
+    candle_response_list.append(dict(error='Chart data unavailable'))
+    return candle_response_list, datetime_range_index
+
+def run_benchmark(no_of_ticker: int, no_of_bar: int, is_daily_candle: bool, no_of_repeat: int) -> None:
+    candle_response_list, datetime_range_index = generate_candle_response_list(no_of_ticker, no_of_bar, is_daily_candle, seed=no_of_ticker * no_of_bar)
+
+    loop_df = convert_historical_candle_response_to_df_by_loop(candle_response_list, datetime_range_index, is_daily_candle)
+    bulk_df = convert_historical_candle_response_to_df(candle_response_list, datetime_range_index, is_daily_candle)
+    # The loop keeps volume as int64 when a ticker has no missing bar, the bulk decoder is always float64
+    pd.testing.assert_frame_equal(loop_df, bulk_df, check_dtype=False)
+
+    result_list = []
+    for decode in [convert_historical_candle_response_to_df_by_loop, convert_historical_candle_response_to_df]:
+        elapsed_time_list = []
+
+        for _ in range(no_of_repeat):
+            start_time = time.perf_counter()
+            decode(candle_response_list, datetime_range_index, is_daily_candle)
+            elapsed_time_list.append(time.perf_counter() - start_time)
+
+        result_list.append(np.median(elapsed_time_list))
+
+    print(f'{"daily" if is_daily_candle else "minute"} candle, no. of ticker: {no_of_ticker}, no. of bar: {no_of_bar}, loop: {result_list[0] * 1000:.2f} ms, bulk: {result_list[1] * 1000:.2f} ms, speedup: {result_list[0] / result_list[1]:.1f}x')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare historical candle response decoding against the per-ticker loop')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for no_of_ticker, no_of_bar, is_daily_candle in [(5, 390, False), (15, 960, False), (30, 960, False), (15, 365, True)]:
+        run_benchmark(no_of_ticker, no_of_bar, is_daily_candle, args.repeat)
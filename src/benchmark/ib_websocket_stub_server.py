@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+import numpy as np
+import pandas as pd
+from aiohttp import web, WSMsgType
+
+from datasource.ib_market_data_stream import IBMarketDataStream, LAST_PRICE_FIELD, DAY_VOLUME_FIELD, PRIOR_CLOSE_PREFIX
+from model.candle.minute_bar_builder import OHLCV_INDICATOR_LIST
+
+# Serves the subset of the Client Portal websocket used by IBMarketDataStream, smd/umd subscriptions and the tic heartbeat
+class IBWebsocketStubServer:
+    def __init__(self, port: int, tick_interval_in_ms: int, tick_time_step_in_ms: int = None, seed: int = 0, no_of_prior_close_tick: int = 0):
+        self.__port = port
+        self.__tick_interval_in_ms = tick_interval_in_ms
+        self.__tick_time_step_in_ms = tick_time_step_in_ms if tick_time_step_in_ms else tick_interval_in_ms
+        self.__random_generator = np.random.default_rng(seed)
+        # A new subscription quotes the C prefixed prior close for this many ticks before its first trade
+        self.__no_of_prior_close_tick = no_of_prior_close_tick
+
+        self.__con_id_to_price_dict = {}
+        self.__con_id_to_day_volume_dict = {}
+        self.__con_id_to_remaining_prior_close_tick_dict = {}
+        # Conid -> [(updated time in ms, price, day volume)] of every tick sent, history is rebuilt from them
+        self.__con_id_to_tick_list_dict = {}
+        self.__last_tick_time_in_ms = None
+        self.__no_of_heartbeat = 0
+        self.__loop = None
+        self.__runner = None
+
+    @property
+    def websocket_url(self):
+        return f'ws://localhost:{self.__port}/v1/api/ws'
+
+    @property
+    def no_of_heartbeat(self):
+        return self.__no_of_heartbeat
+
+    @property
+    def last_tick_time_in_ms(self):
+        return self.__last_tick_time_in_ms
+
+    def start(self) -> None:
+        self.__loop = asyncio.new_event_loop()
+        threading.Thread(target=self.__loop.run_forever, name='ib_websocket_stub_server', daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self.__start_server(), self.__loop).result()
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.__runner.cleanup(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+
+    def get_candle_df(self, contract_list: list, range_start_datetime: pd.Timestamp, range_end_datetime: pd.Timestamp) -> pd.DataFrame:
+        # One minute bars the history endpoint would return for the ticks sent so far
+        candle_df_list = []
+
+        for contract in contract_list:
+            tick_list = list(self.__con_id_to_tick_list_dict.get(contract['con_id'], []))
+
+            if not tick_list:
+                continue
+
+            tick_df = pd.DataFrame(tick_list, columns=['updated_time_in_ms', 'price', 'day_volume'])
+            tick_df.index = pd.to_datetime(tick_df['updated_time_in_ms'], unit='ms', utc=True).dt.tz_convert('US/Eastern').dt.tz_localize(None)
+            tick_df['volume'] = tick_df['day_volume'].diff().fillna(tick_df['day_volume'])
+
+            candle_df = tick_df.resample('1min').agg(dict(price=['first', 'max', 'min', 'last'], volume='sum')).dropna()
+            candle_df.columns = pd.MultiIndex.from_product([[contract['symbol']], OHLCV_INDICATOR_LIST])
+            candle_df_list.append(candle_df.loc[range_start_datetime:range_end_datetime])
+
+        if not candle_df_list:
+            return None
+
+        return pd.concat(candle_df_list, axis=1)
+
+    async def __start_server(self) -> None:
+        app = web.Application()
+        app.router.add_get('/v1/api/ws', self.__handle_websocket)
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        await web.TCPSite(self.__runner, 'localhost', self.__port).start()
+
+    async def __handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        await websocket.send_str(json.dumps(dict(topic='system', success='stub')))
+
+        subscribed_con_id_set = set()
+        tick_task = asyncio.create_task(self.__send_tick(websocket, subscribed_con_id_set))
+
+        try:
+            async for message in websocket:
+                if message.type != WSMsgType.TEXT:
+                    continue
+
+                if message.data == 'tic':
+                    self.__no_of_heartbeat += 1
+                    await websocket.send_str(json.dumps(dict(topic='tic', alive=True)))
+                elif message.data.startswith('smd+'):
+                    con_id = int(message.data.split('+')[1])
+                    subscribed_con_id_set.add(con_id)
+                    self.__con_id_to_price_dict.setdefault(con_id, float(self.__random_generator.uniform(1, 20)))
+                    self.__con_id_to_day_volume_dict.setdefault(con_id, 0)
+                    self.__con_id_to_remaining_prior_close_tick_dict.setdefault(con_id, self.__no_of_prior_close_tick)
+                elif message.data.startswith('umd+'):
+                    subscribed_con_id_set.discard(int(message.data.split('+')[1]))
+        finally:
+            tick_task.cancel()
+
+        return websocket
+
+    async def __send_tick(self, websocket: web.WebSocketResponse, subscribed_con_id_set: set) -> None:
+        tick_time_in_ms = int(time.time() * 1000)
+
+        while not websocket.closed:
+            await asyncio.sleep(self.__tick_interval_in_ms / 1000)
+            tick_time_in_ms += self.__tick_time_step_in_ms
+
+            for con_id in list(subscribed_con_id_set):
+                if self.__con_id_to_remaining_prior_close_tick_dict[con_id] > 0:
+                    # Not a trade, history has no bar for it
+                    self.__con_id_to_remaining_prior_close_tick_dict[con_id] -= 1
+                    await websocket.send_str(json.dumps({'topic': f'smd+{con_id}',
+                                                         'conid': con_id,
+                                                         '_updated': tick_time_in_ms,
+                                                         LAST_PRICE_FIELD: f'{PRIOR_CLOSE_PREFIX}{self.__con_id_to_price_dict[con_id]}',
+                                                         DAY_VOLUME_FIELD: str(self.__con_id_to_day_volume_dict[con_id])}))
+                    continue
+
+                price = round(self.__con_id_to_price_dict[con_id] * (1 + self.__random_generator.normal(0, 0.002)), 4)
+                self.__con_id_to_price_dict[con_id] = price
+                self.__con_id_to_day_volume_dict[con_id] += int(self.__random_generator.integers(0, 5000))
+                self.__con_id_to_tick_list_dict.setdefault(con_id, []).append((tick_time_in_ms, price, self.__con_id_to_day_volume_dict[con_id]))
+
+                await websocket.send_str(json.dumps({'topic': f'smd+{con_id}',
+                                                     'conid': con_id,
+                                                     '_updated': tick_time_in_ms,
+                                                     LAST_PRICE_FIELD: str(price),
+                                                     DAY_VOLUME_FIELD: str(self.__con_id_to_day_volume_dict[con_id])}))
+
+            self.__last_tick_time_in_ms = tick_time_in_ms
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stream synthetic ticks from a local Client Portal websocket stub into IBMarketDataStream and print the one minute bars')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--ticker', type=int, default=5)
+    parser.add_argument('--tick-interval-in-ms', type=int, default=50)
+    parser.add_argument('--tick-time-step-in-ms', type=int, default=1000)
+    parser.add_argument('--duration-in-second', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-of-prior-close-tick', type=int, default=0)
+    args = parser.parse_args()
+
+    stub_server = IBWebsocketStubServer(args.port, args.tick_interval_in_ms, args.tick_time_step_in_ms, args.seed, args.no_of_prior_close_tick)
+    stub_server.start()
+
+    contract_list = [dict(con_id=100000 + position, symbol=f'STUB{position}') for position in range(args.ticker)]
+    market_data_stream = IBMarketDataStream(websocket_url=stub_server.websocket_url)
+    market_data_stream.start()
+    market_data_stream.update_subscription('stub', contract_list)
+
+    time.sleep(args.duration_in_second)
+
+    stats = market_data_stream.get_stats()
+    ticker_to_stream_start_datetime_dict = {ticker: ticker_stats['stream_start_datetime'] for ticker, ticker_stats in stats['ticker'].items()}
+    range_start_datetime = min(ticker_to_stream_start_datetime_dict.values()) - pd.Timedelta(minutes=1)
+    candle_df = market_data_stream.get_candle_df([contract['symbol'] for contract in contract_list], range_start_datetime, range_start_datetime + pd.Timedelta(seconds=args.duration_in_second * args.tick_time_step_in_ms / args.tick_interval_in_ms))
+
+    market_data_stream.stop()
+    stub_server.stop()
+
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', None):
+        print(candle_df.dropna(how='all'))
+
+    print(f'No. of message: {stats["no_of_message"]}, no. of subscription: {stats["no_of_subscription"]}, no. of heartbeat: {stub_server.no_of_heartbeat}')
+    for ticker, ticker_stats in stats['ticker'].items():
+        print(f'{ticker}: no. of tick: {ticker_stats["no_of_tick"]}, no. of bar: {ticker_stats["no_of_bar"]}, stream start datetime: {ticker_stats["stream_start_datetime"]}')
@@ -0,0 +1,275 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+import types
+from concurrent.futures import Future
+from contextlib import ExitStack
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+
+from benchmark.synthetic_candle_generator import generate_daily_candle_df, generate_minute_candle_df, get_ticker_list
+
+from pattern.initial_pop import InitialPop
+from pattern.initial_dip import InitialDip
+from pattern.intra_day_breakout import IntraDayBreakout
+from pattern.previous_days_top_gainer_support import PreviousDayTopGainerSupport
+from pattern.previous_days_top_gainer_continuation import PreviousDayTopGainerContinuation, MIN_MULTI_DAYS_CLOSE_CHANGE_PCT
+from pattern.yesterday_bullish_daily_candle import YesterdayBullishDailyCandle, google_search_util
+
+from utils.customised_indicator_engine import CustomisedIndicatorEngine
+from utils.dataframe_util import append_customised_indicator, concat_daily_df_and_minute_df, get_ticker_to_occurrence_idx_list, replace_daily_df_latest_day_with_minute
+from utils.datetime_util import SimulatedClock, set_simulated_clock
+
+from constant.indicator.indicator import Indicator
+from constant.indicator.customised_indicator import CustomisedIndicator
+from constant.indicator.runtime_indicator import RuntimeIndicator
+from constant.candle.bar_size import BarSize
+from constant.discord.discord_channel import DiscordChannel
+
+idx = pd.IndexSlice
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pattern_benchmark_baseline.json')
+SESSION_START_DATETIME = datetime.datetime(2024, 3, 15, 4, 0, 0)
+TOP_GAINER_CONTINUATION_PCT = 10
+FINANCIAL_DATA_KEY_LIST = ['quarterly_cash_flow_df', 'quarterly_balance_sheet_df', 'quarterly_income_stmt_df', 'annual_cashflow_df', 'annual_balance_sheet_df', 'annual_income_stmt_df', 'major_holders_df', 'institutional_holders_df']
+CHART_SUBMIT_PATCH_TARGET_LIST = ['pattern.initial_pop.submit_candlestick_chart',
+                                  'pattern.initial_dip.submit_candlestick_chart',
+                                  'pattern.intra_day_breakout.submit_candlestick_chart',
+                                  'pattern.previous_days_top_gainer_support.submit_candlestick_chart',
+                                  'pattern.previous_days_top_gainer_continuation.submit_candlestick_chart',
+                                  'pattern.yesterday_bullish_daily_candle.submit_candlestick_chart']
+
+class BenchmarkDiscordClient:
+    def __init__(self):
+        # (ticker, hit scanner datetime) of every message sent, an alert sent twice appears twice
+        self.__sent_alert_list = []
+
+    @property
+    def sent_alert_list(self):
+        return self.__sent_alert_list
+
+    def send_message(self, message, channel_type: DiscordChannel, with_text_to_speech: bool = False):
+        pass
+
+    def send_message_by_list_with_response(self, message_list: list, channel_type: DiscordChannel, with_text_to_speech: bool = False):
+        response_list = []
+
+        for message in message_list:
+            embed = getattr(message, 'embed', None)
+
+            if embed is not None:
+                self.__sent_alert_list.append((getattr(message, 'ticker', None), str(getattr(message, 'hit_scanner_datetime', None))))
+
+            response_list.append(types.SimpleNamespace(embeds=[embed], jump_url=''))
+
+        return response_list
+
+def submit_chart_stub(**chart_param) -> Future:
+    chart_future = Future()
+    chart_future.set_result(None)
+    return chart_future
+
+def stub_pattern_side_effect(exit_stack: ExitStack) -> None:
+    # Charts, Discord, message records and external searches are left out, only the analysis itself is timed
+    for target in CHART_SUBMIT_PATCH_TARGET_LIST:
+        exit_stack.enter_context(patch(target, submit_chart_stub))
+
+    exit_stack.enter_context(patch('pattern.pattern_analyser.check_if_pattern_analysis_message_sent', lambda *args, **kwargs: False))
+    exit_stack.enter_context(patch('pattern.pattern_analyser.add_sent_pattern_analysis_message_record', lambda param_list: None))
+    exit_stack.enter_context(patch('pattern.yesterday_bullish_daily_candle.get_sent_pattern_analysis_message_key_set', lambda key_list: set()))
+    exit_stack.enter_context(patch('pattern.yesterday_bullish_daily_candle.get_financial_data', lambda contract_list: {contract['symbol']: {key: pd.DataFrame() for key in FINANCIAL_DATA_KEY_LIST} for contract in contract_list}))
+    exit_stack.enter_context(patch.object(google_search_util, 'search_offering_news', lambda contract_list, discord_client: {}))
+
+def get_df_digest(src_df: pd.DataFrame) -> str:
+    return hashlib.sha1(src_df.to_csv(float_format='%.6g').encode()).hexdigest()[:16]
+
+def get_result_digest(result) -> str:
+    if isinstance(result, pd.DataFrame):
+        return get_df_digest(result)
+
+    if isinstance(result, tuple):
+        return hashlib.sha1(''.join(get_result_digest(element) for element in result).encode()).hexdigest()[:16]
+
+    if isinstance(result, dict):
+        result = {str(key): value for key, value in result.items()}
+
+    return hashlib.sha1(json.dumps(result, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def get_occurrence_df(minute_df: pd.DataFrame) -> pd.DataFrame:
+    close_change_df = minute_df.loc[:, idx[:, CustomisedIndicator.CLOSE_CHANGE.value]].rename(columns={CustomisedIndicator.CLOSE_CHANGE.value: RuntimeIndicator.COMPARE.value})
+    return close_change_df >= 1
+
+def get_top_gainer_target_price_np(raw_daily_df: pd.DataFrame) -> np.ndarray:
+    # Ramp up day has the most volume, half of the top gainers gap up over its close and the other half fall back to its open as support
+    daily_open_np = raw_daily_df.loc[:, idx[:, Indicator.OPEN.value]].to_numpy()
+    daily_close_np = raw_daily_df.loc[:, idx[:, Indicator.CLOSE.value]].to_numpy()
+    ramp_up_day_position_np = raw_daily_df.loc[:, idx[:, Indicator.VOLUME.value]].to_numpy().argmax(axis=0)
+    ticker_position_np = np.arange(daily_close_np.shape[1])
+
+    # Close change is against the previous close, a ramp up on the first day is not a top gainer to the analysers
+    close_change_pct_np = np.vstack([np.full((1, daily_close_np.shape[1]), np.nan), (daily_close_np[1:] - daily_close_np[:-1]) / daily_close_np[:-1] * 100])
+    ramp_up_open_np = daily_open_np[ramp_up_day_position_np, ticker_position_np]
+    ramp_up_close_np = daily_close_np[ramp_up_day_position_np, ticker_position_np]
+    top_gainer_position_np = np.flatnonzero(close_change_pct_np[ramp_up_day_position_np, ticker_position_np] >= MIN_MULTI_DAYS_CLOSE_CHANGE_PCT)
+
+    target_price_np = np.full(len(ticker_position_np), np.nan)
+    target_price_np[top_gainer_position_np[::2]] = ramp_up_close_np[top_gainer_position_np[::2]] * (1 + TOP_GAINER_CONTINUATION_PCT / 100)
+    target_price_np[top_gainer_position_np[1::2]] = ramp_up_open_np[top_gainer_position_np[1::2]]
+    return target_price_np
+
+def get_benchmark_case_list(no_of_ticker: int, no_of_bar: int, no_of_day: int, seed: int) -> list:
+    ticker_list = get_ticker_list(no_of_ticker)
+    raw_daily_df = generate_daily_candle_df(no_of_ticker, no_of_day, (SESSION_START_DATETIME - datetime.timedelta(days=1)).date(), seed=seed)
+    raw_minute_df = generate_minute_candle_df(raw_daily_df.loc[:, idx[:, Indicator.CLOSE.value]].iloc[-1].to_numpy(), no_of_bar, SESSION_START_DATETIME, seed=seed, mover_target_price_np=get_top_gainer_target_price_np(raw_daily_df))
+    daily_df = append_customised_indicator(raw_daily_df)
+    minute_df = append_customised_indicator(raw_minute_df)
+    occurrence_df = get_occurrence_df(minute_df)
+    ticker_to_contract_info_dict = {ticker: None for ticker in ticker_list}
+    yesterday_top_gainer_contract_list = [types.SimpleNamespace(symbol=ticker, con_id=position, company_name=ticker) for position, ticker in enumerate(ticker_list)]
+
+    # Analysers are evaluated right after the last minute bar, the clock does not move during the benchmark
+    set_simulated_clock(SimulatedClock(minute_df.index[-1].to_pydatetime() + datetime.timedelta(minutes=1), speed=0))
+
+    def get_incremental_indicator_engine() -> tuple:
+        indicator_engine = CustomisedIndicatorEngine()
+        indicator_engine.append_customised_indicator(raw_minute_df.iloc[:-1])
+        return indicator_engine, raw_minute_df
+
+    def analyse(analyser_class, **analyser_param) -> list:
+        discord_client = BenchmarkDiscordClient()
+        analyser_class(**analyser_param, discord_client=discord_client).analyse()
+        return discord_client.sent_alert_list
+
+    # Name, setup returning the call arguments (not timed) and the timed call
+    return [
+        ('append_customised_indicator_minute', lambda: (raw_minute_df,), append_customised_indicator),
+        ('append_customised_indicator_daily', lambda: (raw_daily_df,), append_customised_indicator),
+        ('customised_indicator_engine_incremental', get_incremental_indicator_engine, lambda indicator_engine, src_df: indicator_engine.append_customised_indicator(src_df)),
+        ('replace_daily_df_latest_day_with_minute', lambda: (daily_df, minute_df), replace_daily_df_latest_day_with_minute),
+        ('get_ticker_to_occurrence_idx_list', lambda: (occurrence_df,), get_ticker_to_occurrence_idx_list),
+        ('get_ticker_to_occurrence_idx_list_with_limit', lambda: (occurrence_df, 5), get_ticker_to_occurrence_idx_list),
+        ('concat_daily_df_and_minute_df', lambda: (daily_df.loc[:, idx[[ticker_list[0]], :]], minute_df.loc[:, idx[[ticker_list[0]], :]], minute_df.index[no_of_bar // 2]), concat_daily_df_and_minute_df),
+        ('initial_pop_analyse', lambda: (InitialPop,), lambda analyser_class: analyse(analyser_class, bar_size=BarSize.ONE_MINUTE, historical_data_df=minute_df.copy(), daily_df=daily_df, ticker_to_contract_info_dict=ticker_to_contract_info_dict)),
+        ('initial_dip_analyse', lambda: (InitialDip,), lambda analyser_class: analyse(analyser_class, bar_size=BarSize.ONE_MINUTE, historical_data_df=minute_df.copy(), daily_df=daily_df, ticker_to_contract_info_dict=ticker_to_contract_info_dict)),
+        ('intra_day_breakout_analyse', lambda: (IntraDayBreakout,), lambda analyser_class: analyse(analyser_class, bar_size=BarSize.ONE_MINUTE, historical_data_df=minute_df.copy(), daily_df=daily_df, ticker_to_contract_info_dict=ticker_to_contract_info_dict)),
+        ('previous_day_top_gainer_support_analyse', lambda: (PreviousDayTopGainerSupport,), lambda analyser_class: analyse(analyser_class, daily_df=daily_df, minute_df=minute_df, ticker_to_contract_info_dict=ticker_to_contract_info_dict)),
+        ('previous_day_top_gainer_continuation_analyse', lambda: (PreviousDayTopGainerContinuation,), lambda analyser_class: analyse(analyser_class, daily_df=daily_df, minute_df=minute_df, ticker_to_contract_info_dict=ticker_to_contract_info_dict)),
+        ('yesterday_bullish_daily_candle_analyse', lambda: (YesterdayBullishDailyCandle,), lambda analyser_class: analyse(analyser_class, hit_scanner_date=daily_df.index[-1].date(), yesterday_top_gainer_contract_list=yesterday_top_gainer_contract_list, daily_df=daily_df, ticker_to_contract_info_dict=ticker_to_contract_info_dict))
+    ]
+
+def run_benchmark_case(setup, benchmark_func, no_of_repeat: int) -> dict:
+    result = benchmark_func(*setup())
+    elapsed_time_list = []
+
+    for _ in range(no_of_repeat):
+        benchmark_param = setup()
+        start_time = time.perf_counter()
+        benchmark_func(*benchmark_param)
+        elapsed_time_list.append(time.perf_counter() - start_time)
+
+    # Analysers are measured by their distinct alerts, so a repeated send is not taken as another hit
+    no_of_message = None
+    if isinstance(result, list):
+        no_of_message = len(result)
+        result = sorted(set(result))
+
+    return dict(median_time=float(np.median(elapsed_time_list)),
+                min_time=float(np.min(elapsed_time_list)),
+                digest=get_result_digest(result),
+                no_of_hit=len(result) if no_of_message is not None else None,
+                no_of_message=no_of_message)
+
+def get_no_hit_case_list(name_to_result_dict: dict) -> list:
+    # An analyser without any hit only hashes an empty result, the digest would not catch a behaviour change
+    return [name for name, result in name_to_result_dict.items() if result['no_of_hit'] == 0]
+
+def get_duplicate_send_case_list(name_to_result_dict: dict) -> list:
+    return [name for name, result in name_to_result_dict.items() if result['no_of_message'] is not None and result['no_of_message'] > result['no_of_hit']]
+
+def compare_with_baseline(benchmark_param: dict, name_to_result_dict: dict, baseline_path: str, tolerance_pct: float, min_regression_time_in_ms: float) -> list:
+    with open(baseline_path, 'r', encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+
+    if baseline['param'] != benchmark_param:
+        print(f'Baseline parameter {baseline["param"]} is different from {benchmark_param}, re-run with the same parameters or save a new baseline')
+        return []
+
+    regression_list = []
+    for name, result in name_to_result_dict.items():
+        baseline_result = baseline['result'].get(name)
+
+        if baseline_result is None:
+            print(f'{name}: no baseline')
+            continue
+
+        change_pct = (result['median_time'] - baseline_result['median_time']) / baseline_result['median_time'] * 100
+        print(f'{name}: baseline {baseline_result["median_time"] * 1000:.2f} ms, current {result["median_time"] * 1000:.2f} ms, change: {change_pct:+.1f}%')
+
+        # Same input has to give the same output, otherwise an optimisation has changed the behaviour
+        if result['digest'] != baseline_result['digest']:
+            regression_list.append(f'{name} result changed, baseline digest: {baseline_result["digest"]}, current digest: {result["digest"]}')
+
+        if (change_pct > tolerance_pct
+                and (result['median_time'] - baseline_result['median_time']) * 1000 > min_regression_time_in_ms):
+            regression_list.append(f'{name} is {change_pct:.1f}% slower than baseline')
+
+    return regression_list
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark customised indicator, dataframe utilities and pattern analysers on synthetic candles')
+    parser.add_argument('--ticker', type=int, default=20)
+    parser.add_argument('--bar', type=int, default=960)
+    parser.add_argument('--day', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--case', nargs='*', help='Run the named cases only')
+    parser.add_argument('--baseline-path', default=DEFAULT_BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance-pct', type=float, default=20)
+    parser.add_argument('--min-regression-time-in-ms', type=float, default=1)
+    args = parser.parse_args()
+
+    benchmark_param = dict(ticker=args.ticker, bar=args.bar, day=args.day, seed=args.seed)
+    name_to_result_dict = {}
+
+    with ExitStack() as exit_stack:
+        stub_pattern_side_effect(exit_stack)
+
+        for name, setup, benchmark_func in get_benchmark_case_list(args.ticker, args.bar, args.day, args.seed):
+            if args.case and name not in args.case:
+                continue
+
+            result = run_benchmark_case(setup, benchmark_func, args.repeat)
+            name_to_result_dict[name] = result
+            no_of_hit_display = f', no. of hit: {result["no_of_hit"]}' if result['no_of_hit'] is not None else ''
+            print(f'{name}: median {result["median_time"] * 1000:.2f} ms, min {result["min_time"] * 1000:.2f} ms{no_of_hit_display}')
+
+    no_hit_case_list = get_no_hit_case_list(name_to_result_dict)
+    for name in no_hit_case_list:
+        print(f'NO HIT: {name} has no hit on the synthetic candles, tune the generator parameters')
+
+    duplicate_send_case_list = get_duplicate_send_case_list(name_to_result_dict)
+    for name in duplicate_send_case_list:
+        print(f'DUPLICATE SEND: {name} sends {name_to_result_dict[name]["no_of_message"]} messages for {name_to_result_dict[name]["no_of_hit"]} alerts')
+
+    if no_hit_case_list or duplicate_send_case_list:
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(args.baseline_path, 'w', encoding='utf-8') as baseline_file:
+            json.dump(dict(param=benchmark_param, result=name_to_result_dict), baseline_file, indent=2)
+
+        print(f'Baseline saved to {args.baseline_path}')
+    elif os.path.exists(args.baseline_path):
+        regression_list = compare_with_baseline(benchmark_param, name_to_result_dict, args.baseline_path, args.tolerance_pct, args.min_regression_time_in_ms)
+
+        for regression in regression_list:
+            print(f'REGRESSION: {regression}')
+
+        if regression_list:
+            sys.exit(1)
@@ -0,0 +1,117 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+from utils.datetime_util import US_BUSINESS_DAY
+
+from constant.indicator.indicator import Indicator
+
+OHLCV_INDICATOR_LIST = [Indicator.OPEN.value, Indicator.HIGH.value, Indicator.LOW.value, Indicator.CLOSE.value, Indicator.VOLUME.value]
+
+def get_ticker_list(no_of_ticker: int) -> list:
+    return [f'T{ticker_no}' for ticker_no in range(no_of_ticker)]
+
+def generate_ohlcv_np(open_price_np: np.ndarray,
+                      no_of_bar: int,
+                      rng: np.random.Generator,
+                      volatility_pct: float,
+                      median_volume: float,
+                      volume_sigma: float,
+                      flat_candle_pct: float) -> np.ndarray:
+    no_of_ticker = len(open_price_np)
+
+    # Log normal random walk per ticker, the open of each bar is the previous close
+    return_np = rng.normal(0, volatility_pct / 100, (no_of_bar, no_of_ticker))
+    close_np = open_price_np * np.exp(np.cumsum(return_np, axis=0))
+    open_np = np.vstack([open_price_np, close_np[:-1]])
+
+    flat_candle_boolean_np = rng.random((no_of_bar, no_of_ticker)) < flat_candle_pct / 100
+    close_np = np.where(flat_candle_boolean_np, open_np, close_np)
+
+    wick_np = np.abs(rng.normal(0, volatility_pct / 200, (2, no_of_bar, no_of_ticker)))
+    high_np = np.maximum(open_np, close_np) * (1 + wick_np[0])
+    low_np = np.minimum(open_np, close_np) * (1 - wick_np[1])
+    volume_np = np.floor(rng.lognormal(np.log(median_volume), volume_sigma, (no_of_bar, no_of_ticker)))
+
+    return np.stack([np.round(open_np, 4), np.round(high_np, 4), np.round(low_np, 4), np.round(close_np, 4), volume_np], axis=2)
+
+def convert_ohlcv_np_to_df(ohlcv_np: np.ndarray, datetime_index: pd.DatetimeIndex, ticker_list: list) -> pd.DataFrame:
+    # Same layout as convert_historical_candle_response_to_df, ticker then OHLCV columns in float64
+    return pd.DataFrame(ohlcv_np.reshape(len(datetime_index), -1),
+                        index=datetime_index,
+                        columns=pd.MultiIndex.from_product([ticker_list, OHLCV_INDICATOR_LIST]))
+
+def generate_daily_candle_df(no_of_ticker: int,
+                             no_of_day: int,
+                             end_date: datetime.date,
+                             seed: int = 0,
+                             min_price: float = 0.5,
+                             max_price: float = 20,
+                             volatility_pct: float = 8,
+                             median_volume: float = 2000000,
+                             volume_sigma: float = 1,
+                             flat_candle_pct: float = 1,
+                             ramp_up_ticker_pct: float = 30,
+                             ramp_up_pct: float = 60) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    datetime_index = pd.date_range(end=pd.Timestamp(end_date), periods=no_of_day, freq=US_BUSINESS_DAY)
+    open_price_np = rng.uniform(min_price, max_price, no_of_ticker)
+    ohlcv_np = generate_ohlcv_np(open_price_np, no_of_day, rng, volatility_pct, median_volume, volume_sigma, flat_candle_pct)
+
+    # Top gainers have one green ramp up day with the highest volume, the last day is yesterday's top gainer
+    ramp_up_ticker_position_np = np.flatnonzero(rng.random(no_of_ticker) < ramp_up_ticker_pct / 100)
+    ramp_up_day_position_np = rng.integers(0, no_of_day, len(ramp_up_ticker_position_np))
+    ramp_up_day_position_np[::2] = no_of_day - 1
+
+    for ticker_position, day_position in zip(ramp_up_ticker_position_np, ramp_up_day_position_np):
+        previous_close = ohlcv_np[day_position - 1, ticker_position, 3] if day_position > 0 else ohlcv_np[day_position, ticker_position, 0]
+        ramp_up_close = np.round(previous_close * (1 + ramp_up_pct / 100), 4)
+        ohlcv_np[day_position, ticker_position, :4] = [previous_close, ramp_up_close * 1.05, previous_close * 0.98, ramp_up_close]
+        ohlcv_np[day_position, ticker_position, 4] = ohlcv_np[:, ticker_position, 4].max() * 10
+
+    return convert_ohlcv_np_to_df(ohlcv_np, datetime_index, get_ticker_list(no_of_ticker))
+
+def generate_minute_candle_df(yesterday_close_np: np.ndarray,
+                              no_of_bar: int,
+                              start_datetime: datetime.datetime,
+                              seed: int = 0,
+                              gap_pct_mean: float = 5,
+                              gap_pct_std: float = 15,
+                              volatility_pct: float = 0.2,
+                              median_volume: float = 5000,
+                              volume_sigma: float = 1.5,
+                              flat_candle_pct: float = 5,
+                              missing_bar_pct: float = 10,
+                              mover_ticker_pct: float = 40,
+                              mover_open_gap_pct: float = 10,
+                              mover_pct: float = 20,
+                              mover_bar_from_end: int = 6,
+                              mover_target_price_np: np.ndarray = None) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    no_of_ticker = len(yesterday_close_np)
+    datetime_index = pd.date_range(start=pd.Timestamp(start_datetime), periods=no_of_bar, freq='1min')
+
+    # Movers jump to their target price shortly before the last bar, pop, dip, support and continuation alerts only look back a few minutes or hours
+    is_mover_np = rng.random(no_of_ticker) < mover_ticker_pct / 100
+    # Every other mover moves down, random movers are split evenly between pops and dips
+    random_target_price_np = yesterday_close_np * (1 + np.where(np.cumsum(is_mover_np) % 2 == 1, 1, -1) * mover_pct / 100)
+    target_price_np = np.where(is_mover_np, random_target_price_np, np.nan)
+    if mover_target_price_np is not None:
+        target_price_np = np.where(np.isnan(mover_target_price_np), target_price_np, mover_target_price_np)
+
+    # Opening gap against yesterday's close decides which tickers can pop up or dip, movers open against their move
+    mover_direction_np = np.sign(np.nan_to_num(target_price_np - yesterday_close_np))
+    gap_pct_np = np.where(np.isnan(target_price_np), rng.normal(gap_pct_mean, gap_pct_std, no_of_ticker), -mover_direction_np * mover_open_gap_pct)
+    open_price_np = yesterday_close_np * np.clip(1 + gap_pct_np / 100, 0.1, None)
+    ohlcv_np = generate_ohlcv_np(open_price_np, no_of_bar, rng, volatility_pct, median_volume, volume_sigma, flat_candle_pct)
+
+    mover_bar_position = max(no_of_bar - mover_bar_from_end, 0)
+    mover_scale_np = np.nan_to_num(target_price_np / ohlcv_np[mover_bar_position, :, 0], nan=1)
+    ohlcv_np[mover_bar_position:, :, :4] = np.round(ohlcv_np[mover_bar_position:, :, :4] * mover_scale_np[np.newaxis, :, np.newaxis], 4)
+
+    # Minutes without trade are missing in the history response and reindexed to NaN rows, the first bar is always kept
+    missing_bar_boolean_np = rng.random((no_of_bar, no_of_ticker)) < missing_bar_pct / 100
+    missing_bar_boolean_np[0] = False
+    ohlcv_np[missing_bar_boolean_np] = np.nan
+
+    return convert_ohlcv_np_to_df(ohlcv_np, datetime_index, get_ticker_list(no_of_ticker))
@@ -0,0 +1,5 @@
+from enum import Enum
+
+class DatabaseBackend(str, Enum):
+    ORACLE = 'ORACLE'
+    SQLITE = 'SQLITE'
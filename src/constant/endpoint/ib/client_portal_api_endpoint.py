@@ -26,8 +26,10 @@ class ClientPortalApiEndpoint(str, Enum):
     PORTFOLIO_ACCOUNTS = '/portfolio/accounts'
     PORTFOLIO_SUB_ACCOUNTS = '/portfolio/subaccounts'
     TRADES = '/iserver/account/trades'
-    
-    
-    
+    TICKLE = '/tickle'
 
-    
\ No newline at end of file
+# Endpoint -> (bucket capacity, refill rate per second)
+CLIENT_PORTAL_API_ENDPOINT_TO_RATE_LIMIT_DICT = {
+    ClientPortalApiEndpoint.RUN_SCANNER: (1, 1),
+    ClientPortalApiEndpoint.SNAPSHOT: (10, 10)
+}
@@ -7,11 +7,12 @@ class OracleQuery(str, Enum):
     #For Pattern Analysis
     ADD_PATTERN_ANALYSIS_QUERY = "INSERT INTO PATTERN_ANALYSIS (TICKER, HIT_SCANNER_DATETIME, SCAN_PATTERN, BAR_SIZE) VALUES (:1, :2, :3, :4)"
     COUNT_PATTERN_ANALYSIS_MESSAGE_QUERY = "SELECT COUNT(*) FROM PATTERN_ANALYSIS WHERE TICKER = :ticker AND HIT_SCANNER_DATETIME = :hit_scanner_datetime AND SCAN_PATTERN = :scan_pattern AND BAR_SIZE = :bar_size"
+    GET_PATTERN_ANALYSIS_MESSAGE_QUERY = "SELECT TICKER, HIT_SCANNER_DATETIME, SCAN_PATTERN, BAR_SIZE FROM PATTERN_ANALYSIS WHERE HIT_SCANNER_DATETIME >= :start_datetime"
     CLEAN_PATTERN_ANALYSIS_QUERY = "DELETE FROM PATTERN_ANALYSIS"
     
     #Profit and Loss
-    COUNT_TRADE_SUMMARY_MESSAGE_QUERY = "SELECT COUNT(*) FROM TRADE_SUMMARY WHERE SYMBOL = :symbol AND ACQUIRED_DATE = :acquired_date AND SOLD_DATE = sold_date AND TRADING_PLATFORM = :trading_platform"
-    ADD_TRADE_SUMMARY_MESSAGE_QUERY = "INSERT INTO TRADE_SUMMARY (TICKER, ACQUIRED_DATE, SOLD_DATE, AVG_ENTRY_PRICE, AVG_EXIT_PRICE, REALISED_PL, REALISED_PL_PERCENT, COMPANY_NAME, SECTOR, MARKET_CAP, SHORTABLE, SHORTABLE_SHARES, REBATE_RATE, TRADING_PLATFORM) VALUES(:1, :2, :3, :4, ;5, :6, :7, :8, :9, :10, :11, :12, :13, :14)"
+    COUNT_TRADE_SUMMARY_MESSAGE_QUERY = "SELECT COUNT(*) FROM TRADE_SUMMARY WHERE TICKER = :ticker AND ACQUIRED_DATE = :acquired_date AND SOLD_DATE = :sold_date AND TRADING_PLATFORM = :trading_platform"
+    ADD_TRADE_SUMMARY_MESSAGE_QUERY = "INSERT INTO TRADE_SUMMARY (TICKER, ACQUIRED_DATE, SOLD_DATE, AVG_ENTRY_PRICE, AVG_EXIT_PRICE, REALISED_PL, REALISED_PL_PERCENT, COMPANY_NAME, SECTOR, MARKET_CAP, SHORTABLE, SHORTABLE_SHARES, REBATE_RATE, TRADING_PLATFORM) VALUES(:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14)"
     CLEAN_TRADE_SUMMARY_MESSAGE_QUERY = "DELETE FROM TRADE_SUMMARY"
     
     CHECK_INTEREST_HISTORY_MESSAGE_EXIST_QUERY = "SELECT * FROM interest_history WHERE EXISTS (SELECT 1 FROM interest_history WHERE settle_date = ? AND trading_platform = ?)"
@@ -1,10 +1,30 @@
 from enum import Enum
 
 class SqliteQuery(str, Enum):
+    #Schema
+    CREATE_PATTERN_ANALYSIS_TABLE_QUERY = "CREATE TABLE IF NOT EXISTS pattern_analysis (ticker TEXT NOT NULL, hit_scanner_datetime TIMESTAMP NOT NULL, scan_pattern TEXT NOT NULL, bar_size TEXT NOT NULL)"
+    CREATE_PATTERN_ANALYSIS_KEY_INDEX_QUERY = "CREATE INDEX IF NOT EXISTS pattern_analysis_key_idx ON pattern_analysis (ticker, hit_scanner_datetime, scan_pattern, bar_size)"
+    CREATE_PATTERN_ANALYSIS_DATETIME_INDEX_QUERY = "CREATE INDEX IF NOT EXISTS pattern_analysis_datetime_idx ON pattern_analysis (hit_scanner_datetime)"
+    CREATE_TOP_GAINER_HISTORY_TABLE_QUERY = "CREATE TABLE IF NOT EXISTS top_gainer_history (ticker TEXT NOT NULL, company TEXT NOT NULL, sector TEXT, industry TEXT, scan_date TIMESTAMP NOT NULL, price REAL NOT NULL, volume INTEGER NOT NULL, percentage REAL NOT NULL, market_cap INTEGER, country TEXT)"
+    CREATE_TOP_GAINER_HISTORY_INDEX_QUERY = "CREATE INDEX IF NOT EXISTS top_gainer_history_scan_date_idx ON top_gainer_history (scan_date, percentage)"
+    CREATE_TRADE_SUMMARY_TABLE_QUERY = "CREATE TABLE IF NOT EXISTS trade_summary (ticker TEXT NOT NULL, acquired_date TIMESTAMP NOT NULL, sold_date TIMESTAMP, avg_entry_price REAL, avg_exit_price REAL, realised_pl REAL NOT NULL, realised_pl_percent REAL NOT NULL, company_name TEXT, sector TEXT, market_cap INTEGER, shortable TEXT, shortable_shares INTEGER, rebate_rate REAL, trading_platform TEXT NOT NULL)"
+    
+    #For Top Gainer History
+    GET_TOP_GAINER_QUERY = "SELECT * FROM top_gainer_history WHERE percentage >= :percentage AND scan_date >= date(:start_datetime) AND scan_date < date(:end_datetime, '+1 day') ORDER BY scan_date DESC, percentage DESC"
+    
+    #For Pattern Analysis
+    GET_PATTERN_ANALYSIS_MESSAGE_QUERY = "SELECT ticker, hit_scanner_datetime, scan_pattern, bar_size FROM pattern_analysis WHERE hit_scanner_datetime >= :start_datetime"
+    COUNT_PATTERN_ANALYSIS_MESSAGE_QUERY = "SELECT COUNT(*) FROM pattern_analysis WHERE ticker = :ticker AND hit_scanner_datetime = :hit_scanner_datetime AND scan_pattern = :scan_pattern AND bar_size = :bar_size"
+    CLEAN_PATTERN_ANALYSIS_QUERY = "DELETE FROM pattern_analysis"
+    
+    #Profit and Loss
+    COUNT_TRADE_SUMMARY_MESSAGE_QUERY = "SELECT COUNT(*) FROM trade_summary WHERE ticker = :ticker AND acquired_date = :acquired_date AND sold_date = :sold_date AND trading_platform = :trading_platform"
+    ADD_TRADE_SUMMARY_MESSAGE_QUERY = "INSERT INTO trade_summary (ticker, acquired_date, sold_date, avg_entry_price, avg_exit_price, realised_pl, realised_pl_percent, company_name, sector, market_cap, shortable, shortable_shares, rebate_rate, trading_platform) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    CLEAN_TRADE_SUMMARY_MESSAGE_QUERY = "DELETE FROM trade_summary"
+    
     CHECK_PATTERN_ANALYSIS_MESSAGE_EXIST_QUERY = "SELECT * FROM pattern_analysis WHERE EXISTS (SELECT 1 FROM pattern_analysis WHERE ticker = ? AND hit_scanner_datetime = ? AND scan_pattern = ? AND bar_size = ?)"
     ADD_PATTERN_ANALYSIS_QUERY = "INSERT INTO pattern_analysis VALUES(?, ?, ?, ?)"
     DELETE_ALL_PATTERN_ANALYSIS_MESSAGE_QUERY = "DELETE FROM pattern_analysis"
-    ADD_TRADE_SUMMARY_MESSAGE_QUERY = "INSERT INTO trade_summary VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
     DELETE_ALL_TRADE_SUMMARY_MESSAGE_QUERY = "DELETE FROM trade_summary"
     CHECK_TRADE_SUMMARY_MESSAGE_EXIST_QUERY = "SELECT * FROM trade_summary WHERE EXISTS (SELECT 1 FROM trade_summary WHERE symbol = ? AND acquired_date = ? AND sold_date = ? AND trading_platform = ?)"
     CHECK_INTEREST_HISTORY_MESSAGE_EXIST_QUERY = "SELECT * FROM interest_history WHERE EXISTS (SELECT 1 FROM interest_history WHERE settle_date = ? AND trading_platform = ?)"
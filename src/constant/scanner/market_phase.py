@@ -0,0 +1,7 @@
+from enum import Enum
+
+class MarketPhase(str, Enum):
+    CLOSED = 'CLOSED'
+    PRE_MARKET = 'PRE_MARKET'
+    REGULAR_HOURS = 'REGULAR_HOURS'
+    AFTER_HOURS = 'AFTER_HOURS'
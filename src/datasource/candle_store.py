@@ -0,0 +1,123 @@
+import datetime
+import math
+import time
+import pandas as pd
+
+from datasource.ib_connector import IBConnector
+from datasource.ib_market_data_stream import IBMarketDataStream
+
+from constant.candle.bar_size import BarSize
+
+from utils.logger import Logger
+
+idx = pd.IndexSlice
+logger = Logger()
+
+class CandleStore:
+    def __init__(self, market_data_stream: IBMarketDataStream = None) -> None:
+        self.__bar_size_to_ticker_to_candle_df_dict = {}
+        self.__market_data_stream = market_data_stream
+
+    def get_ticker_list(self, bar_size: BarSize) -> list:
+        return list(self.__bar_size_to_ticker_to_candle_df_dict.get(bar_size, {}).keys())
+
+    def evict(self, bar_size: BarSize, ticker_list: list) -> None:
+        ticker_to_candle_df_dict = self.__bar_size_to_ticker_to_candle_df_dict.get(bar_size, {})
+
+        for ticker in ticker_list:
+            ticker_to_candle_df_dict.pop(ticker, None)
+
+    def __is_stream_covered(self, market_data_stream: IBMarketDataStream, ticker: str, last_stored_datetime: datetime.datetime) -> bool:
+        stream_start_datetime = market_data_stream.get_stream_start_datetime(ticker)
+        return stream_start_datetime is not None and stream_start_datetime <= last_stored_datetime
+
+    def __merge_tail_candle_df(self, ticker_to_candle_df_dict: dict, ticker: str, tail_candle_df: pd.DataFrame, range_start_datetime: datetime.datetime, is_full_period: bool) -> None:
+        stored_candle_df = ticker_to_candle_df_dict.get(ticker)
+
+        if stored_candle_df is None or stored_candle_df.empty or is_full_period:
+            ticker_to_candle_df_dict[ticker] = tail_candle_df
+        else:
+            merged_candle_df = pd.concat([stored_candle_df.loc[~stored_candle_df.index.isin(tail_candle_df.index)], tail_candle_df]).sort_index()
+            ticker_to_candle_df_dict[ticker] = merged_candle_df.loc[range_start_datetime:]
+
+    def get_candle_df(self, ib_connector: IBConnector,
+                            contract_list: list,
+                            bar_size: BarSize,
+                            range_start_datetime: datetime.datetime,
+                            range_end_datetime: datetime.datetime) -> pd.DataFrame:
+        ticker_to_candle_df_dict = self.__bar_size_to_ticker_to_candle_df_dict.setdefault(bar_size, {})
+        range_start_datetime = range_start_datetime.replace(second=0, microsecond=0, tzinfo=None)
+        range_end_datetime = range_end_datetime.replace(second=0, microsecond=0, tzinfo=None)
+
+        contract_ticker_list = [contract['symbol'] for contract in contract_list]
+        evict_ticker_list = [ticker for ticker in ticker_to_candle_df_dict if ticker not in contract_ticker_list]
+
+        if evict_ticker_list:
+            logger.log_debug_msg(f'Evict {evict_ticker_list} from {bar_size.value} candle store')
+            self.evict(bar_size, evict_ticker_list)
+
+        # Only one minute bars are built from the stream, other bar sizes keep polling history
+        market_data_stream = self.__market_data_stream if bar_size == BarSize.ONE_MINUTE else None
+        if market_data_stream:
+            market_data_stream.update_subscription(self, contract_list)
+
+        full_period_in_minute = math.floor((range_end_datetime - range_start_datetime).total_seconds() / 60)
+        period_to_contract_list_dict = {}
+        stream_ticker_to_start_datetime_dict = {}
+
+        for contract in contract_list:
+            candle_df = ticker_to_candle_df_dict.get(contract['symbol'])
+
+            if candle_df is None or candle_df.empty or candle_df.index[-1] < range_start_datetime:
+                period_in_minute = full_period_in_minute
+            elif market_data_stream and self.__is_stream_covered(market_data_stream, contract['symbol'], candle_df.index[-1]):
+                # Every tick since the last stored bar is observed, history is only needed to backfill
+                stream_ticker_to_start_datetime_dict[contract['symbol']] = candle_df.index[-1]
+                continue
+            else:
+                # Start from the last stored bar so that the still-forming bar is replaced by its final value
+                period_in_minute = max(1, math.floor((range_end_datetime - candle_df.index[-1]).total_seconds() / 60))
+
+            period_to_contract_list_dict.setdefault(period_in_minute, []).append(contract)
+
+        logger.log_debug_msg(f'{bar_size.value} candle store retrieval period to ticker list: { {period: [contract["symbol"] for contract in request_contract_list] for period, request_contract_list in period_to_contract_list_dict.items()} }')
+
+        for period_in_minute, request_contract_list in period_to_contract_list_dict.items():
+            if period_in_minute < 1:
+                continue
+
+            candle_df = ib_connector.get_historical_candle_df(contract_list=request_contract_list,
+                                                              period=f'{period_in_minute}min',
+                                                              bar_size=bar_size,
+                                                              outside_rth='true')
+
+            if candle_df is None or candle_df.empty:
+                continue
+
+            merge_start_time = time.time()
+            for ticker in candle_df.columns.get_level_values(0).unique():
+                tail_candle_df = candle_df.loc[:, idx[[ticker], :]].dropna(how='all')
+                self.__merge_tail_candle_df(ticker_to_candle_df_dict, ticker, tail_candle_df, range_start_datetime, period_in_minute == full_period_in_minute)
+
+            logger.log_debug_msg(f'Merge {bar_size.value} candle tail into candle store time: {time.time() - merge_start_time} seconds')
+
+        if stream_ticker_to_start_datetime_dict:
+            merge_start_time = time.time()
+            stream_candle_df = market_data_stream.get_candle_df(ticker_list=list(stream_ticker_to_start_datetime_dict.keys()),
+                                                                range_start_datetime=min(stream_ticker_to_start_datetime_dict.values()),
+                                                                range_end_datetime=range_end_datetime)
+
+            if stream_candle_df is not None:
+                for ticker in stream_candle_df.columns.get_level_values(0).unique():
+                    tail_candle_df = stream_candle_df.loc[stream_ticker_to_start_datetime_dict[ticker]:, idx[[ticker], :]].dropna(how='all')
+                    self.__merge_tail_candle_df(ticker_to_candle_df_dict, ticker, tail_candle_df, range_start_datetime, False)
+
+            logger.log_debug_msg(f'Merge {list(stream_ticker_to_start_datetime_dict.keys())} streamed candle tail into candle store time: {time.time() - merge_start_time} seconds')
+
+        select_ticker_list = [ticker for ticker in contract_ticker_list if ticker in ticker_to_candle_df_dict]
+
+        if not select_ticker_list:
+            return None
+
+        datetime_range_index = pd.date_range(start=range_start_datetime, end=range_end_datetime, freq=bar_size.value)
+        return pd.concat([ticker_to_candle_df_dict[ticker].reindex(datetime_range_index) for ticker in select_ticker_list], axis=1)
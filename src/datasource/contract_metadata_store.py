@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+
+from utils.config_util import get_config
+from utils.datetime_util import get_current_us_datetime
+from utils.file_util import get_root_relative_path, write_file_atomically
+from utils.logger import Logger
+
+logger = Logger()
+
+CONTRACT_METADATA_CACHE_FILE_PATH = get_config('CONTRACT_METADATA_CACHE', 'FILE_PATH')
+STATIC_FIELD_TTL_IN_SECOND = get_config('CONTRACT_METADATA_CACHE', 'STATIC_FIELD_TTL_IN_SECOND')
+VOLATILE_FIELD_TTL_IN_SECOND = get_config('CONTRACT_METADATA_CACHE', 'VOLATILE_FIELD_TTL_IN_SECOND')
+
+# Company profile rarely changes, short interest and prices have to be refreshed during the day
+STATIC_FIELD_LIST = ['exchange', 'company_name', 'sector']
+VOLATILE_FIELD_LIST = ['market_cap', 'shortable', 'shortable_shares', 'rebate_rate', 'market_data_availability', 'last', 'previous_close']
+CONTRACT_METADATA_FIELD_LIST = STATIC_FIELD_LIST + VOLATILE_FIELD_LIST
+
+class ContractMetadataStore:
+    def __init__(self, file_path: str = CONTRACT_METADATA_CACHE_FILE_PATH,
+                       static_field_ttl_in_second: float = STATIC_FIELD_TTL_IN_SECOND,
+                       volatile_field_ttl_in_second: float = VOLATILE_FIELD_TTL_IN_SECOND):
+        # Without a file path the metadata is only kept for the lifetime of the connector
+        self.__file_path = get_root_relative_path(file_path)
+        self.__field_to_ttl_dict = {**{field: static_field_ttl_in_second for field in STATIC_FIELD_LIST},
+                                    **{field: volatile_field_ttl_in_second for field in VOLATILE_FIELD_LIST}}
+        self.__lock = threading.Lock()
+        self.__con_id_to_metadata_dict = {}
+        self.__is_dirty = False
+
+        self.__load()
+
+    @property
+    def file_path(self):
+        return self.__file_path
+
+    def __len__(self):
+        return len(self.__con_id_to_metadata_dict)
+
+    def __load(self) -> None:
+        if not self.__file_path or not os.path.exists(self.__file_path):
+            return
+
+        try:
+            with open(self.__file_path, 'r', encoding='utf-8') as cache_file:
+                con_id_to_metadata_dict = json.load(cache_file)
+        except (OSError, ValueError) as load_exception:
+            logger.log_error_msg(f'Failed to load contract metadata cache from {self.__file_path}, {load_exception}')
+            return
+
+        current_time = get_current_us_datetime().timestamp()
+        max_ttl = max(self.__field_to_ttl_dict.values())
+
+        for con_id, metadata in con_id_to_metadata_dict.items():
+            # Contracts not seen for longer than every TTL would be fetched in full anyway
+            if current_time - max(metadata['field_to_fetched_time_dict'].values(), default=0) <= max_ttl:
+                self.__con_id_to_metadata_dict[str(con_id)] = metadata
+
+        logger.log_debug_msg(f'Load {len(self.__con_id_to_metadata_dict)}/{len(con_id_to_metadata_dict)} contract metadata from {self.__file_path}', with_std_out=True)
+
+    def save(self) -> None:
+        if not self.__file_path:
+            return
+
+        with self.__lock:
+            if not self.__is_dirty:
+                return
+
+            cache_json = json.dumps(self.__con_id_to_metadata_dict)
+            self.__is_dirty = False
+
+        try:
+            write_file_atomically(self.__file_path, cache_json)
+        except OSError as save_exception:
+            logger.log_error_msg(f'Failed to save contract metadata cache to {self.__file_path}, {save_exception}')
+
+    def get_stale_field_list(self, con_id, symbol: str) -> list:
+        with self.__lock:
+            metadata = self.__con_id_to_metadata_dict.get(str(con_id))
+
+            # A contract id reused by another symbol is a symbol change, nothing cached belongs to it
+            if metadata is None or metadata['symbol'] != symbol:
+                return list(CONTRACT_METADATA_FIELD_LIST)
+
+            current_time = get_current_us_datetime().timestamp()
+            field_to_fetched_time_dict = metadata['field_to_fetched_time_dict']
+
+            return [field for field in CONTRACT_METADATA_FIELD_LIST
+                        if field not in field_to_fetched_time_dict
+                            or current_time - field_to_fetched_time_dict[field] > self.__field_to_ttl_dict[field]]
+
+    def get_field_to_value_dict(self, con_id) -> dict:
+        with self.__lock:
+            metadata = self.__con_id_to_metadata_dict.get(str(con_id))
+            return dict(metadata['field_to_value_dict']) if metadata else {}
+
+    def update(self, con_id, symbol: str, field_to_value_dict: dict) -> dict:
+        fetched_time = get_current_us_datetime().timestamp()
+
+        with self.__lock:
+            metadata = self.__con_id_to_metadata_dict.get(str(con_id))
+
+            if metadata is None or metadata['symbol'] != symbol:
+                metadata = dict(symbol=symbol, field_to_value_dict={}, field_to_fetched_time_dict={})
+                self.__con_id_to_metadata_dict[str(con_id)] = metadata
+
+            for field, value in field_to_value_dict.items():
+                metadata['field_to_value_dict'][field] = value
+
+                # A field missing from the response is not timestamped, it is fetched again on the next cycle instead of being cached until its TTL
+                if value is None:
+                    metadata['field_to_fetched_time_dict'].pop(field, None)
+                else:
+                    metadata['field_to_fetched_time_dict'][field] = fetched_time
+
+            self.__is_dirty = True
+            return dict(metadata['field_to_value_dict'])
@@ -1,7 +1,7 @@
-from asyncio import AbstractEventLoop
 import re
 import threading
 import time
+from typing import Callable
 from datetime import datetime, timedelta
 from datetime import time as dt_time
 import html
@@ -14,14 +14,20 @@ import urllib3
 from model.ib.contract_info import ContractInfo
 from model.ib.snapshot import Snapshot
 
+from datasource.ib_response_recorder import IBResponseRecorder
+from datasource.contract_metadata_store import CONTRACT_METADATA_FIELD_LIST, ContractMetadataStore
+from datasource.symbol_con_id_index import SymbolConIdIndex
+
 from utils.http_util import send_async_request
+from utils.rate_limiter import get_rate_limiter, get_rate_limiter_metrics
 from utils.collection_util import get_chunk_list
+from utils.dataframe_util import convert_historical_candle_response_to_df
+from utils.profiler import profile_span
 from utils.datetime_util import  US_BUSINESS_DAY, get_us_business_day, get_current_us_datetime
 from utils.logger import Logger
 
 from constant.endpoint.ib.client_portal_api_endpoint import ClientPortalApiEndpoint
 from constant.candle.bar_size import BarSize
-from constant.indicator.indicator import Indicator
 
 from exception.reauthentication_request_error import ReauthenticationRequestError
 from exception.sso_vaildation_error import SSOValidationError
@@ -61,25 +67,67 @@ idx = pd.IndexSlice
 # 83	    string	      Change % - The difference between the last price and the close on the previous trading day in percentage.
 # 7284	    string	      Historic Volume (30d)
 # 7672	    string	      Dividends TTM	- This value is the total of the expected dividend payments over the last twelve months per share.
-SNAPSHOT_FIELD_LIST_STR = '55,7221,7051,7289,7644,7636,7637,6509,31,7741'
+SNAPSHOT_FIELD_TO_CONTRACT_METADATA_FIELD_DICT = {
+    '7221': 'exchange',
+    '7051': 'company_name',
+    '7289': 'market_cap',
+    '7644': 'shortable',
+    '7636': 'shortable_shares',
+    '7637': 'rebate_rate',
+    '6509': 'market_data_availability',
+    '31': 'last',
+    '7741': 'previous_close'
+}
 CONCAT_TICKER_CHUNK_SIZE = 300
-
-SCANNER_RATE_LIMIT_WAIT_PERIOD = 1
-SNAPSHOT_RATE_LIMIT_WAIT_PERIOD = 10
+# History error of a conid the gateway no longer knows, the symbol is delisted or moved to another conid
+NOT_FOUND_ERROR_PATTERN = re.compile(r'no security definition|contract not found|invalid conid', re.IGNORECASE)
 
 class IBConnector:
-    def __init__(self, loop: AbstractEventLoop = None) -> None:
+    def __init__(self, response_recorder: IBResponseRecorder = None, contract_metadata_store: ContractMetadataStore = None, symbol_con_id_index: SymbolConIdIndex = None) -> None:
+        self.__response_recorder = response_recorder
+        self.__contract_metadata_store = contract_metadata_store if contract_metadata_store is not None else ContractMetadataStore()
+        self.__symbol_con_id_index = symbol_con_id_index if symbol_con_id_index is not None else SymbolConIdIndex()
         self.__ticker_to_contract_info_dict = {}
-        self.__loop = loop
         
-        #self.__scanner_lock = threading.Lock()
-        #self.__snapshot_info_lock = threading.Lock()
-        #self.__historical_data_lock = threading.Lock()
+        self.__scanner_lock = threading.Lock()
+        self.__snapshot_info_lock = threading.Lock()
+        self.__historical_data_lock = threading.Lock()
+        self.__contract_info_lock = threading.Lock()
+    
+    # All Client Portal traffic goes through these two methods, replay connector overrides them to serve recorded responses
+    def _send_request(self, method: str, endpoint: str, payload: dict = None) -> requests.Response:
+        rate_limiter = get_rate_limiter(endpoint)
+        if rate_limiter:
+            rate_limiter.acquire()
+        
+        if method == 'GET':
+            response = session.get(endpoint, params=payload, verify=False)
+        else:
+            response = session.post(endpoint, json=payload, verify=False)
+        
+        if self.__response_recorder:
+            self.__response_recorder.record_response(method, endpoint, payload, response)
+        
+        return response
+    
+    def _send_async_request(self, method: str, endpoint: str, payload_list: list, chunk_size: int, on_response: Callable = None) -> list:
+        def on_recorded_response(payload, status_code, json_response):
+            if self.__response_recorder:
+                self.__response_recorder.record(method, endpoint, payload, status_code, json_response)
+
+            if on_response:
+                on_response(payload, status_code, json_response)
+        
+        return send_async_request(method=method, 
+                                  endpoint=endpoint, 
+                                  payload_list=payload_list, 
+                                  chunk_size=chunk_size,
+                                  on_response=on_recorded_response if self.__response_recorder or on_response else None)
     
     def receive_brokerage_account(self):
         try:
             receive_brokerage_account_time = time.time()
-            brokerage_account_response = session.get(f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.ACCOUNT}', verify=False)
+            brokerage_account_response = self._send_request('GET', f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.ACCOUNT}')
             logger.log_debug_msg(f'Receive brokerage account response time: {time.time() - receive_brokerage_account_time} seconds')
             brokerage_account_response.raise_for_status()
         except requests.exceptions.HTTPError as brokerage_account_request_exception:
@@ -96,8 +144,8 @@ class IBConnector:
         reauthenticate_time = time.time()
         
         try:
-            sso_validate_response = session.get(f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.SSO_VALIDATE}', verify=False)
-            reauthenticate_response = session.post(f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.REAUTHENTICATE}', verify=False)
+            sso_validate_response = self._send_request('GET', f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.SSO_VALIDATE}')
+            reauthenticate_response = self._send_request('POST', f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.REAUTHENTICATE}')
             logger.log_debug_msg(f'Session re-authentication response time: {time.time() - reauthenticate_time} seconds')
 
             reauthenticate_response.raise_for_status()
@@ -117,12 +165,17 @@ class IBConnector:
             logger.log_error_msg(f'Reauthentication and SSO validation fatal error, {exception}')
             raise Exception(f'Reauthentication and SSO validation fatal error, {exception}')
     
+    def tickle(self) -> dict:
+        tickle_response = self._send_request('POST', f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.TICKLE}')
+        tickle_response.raise_for_status()
+        return tickle_response.json()
+    
     def check_auth_status(self):
         is_connection_success = True
 
         try:
             check_status_start_time = time.time()
-            status_response = session.post(f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.AUTH_STATUS}', verify=False)
+            status_response = self._send_request('POST', f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.AUTH_STATUS}')
             logger.log_debug_msg(f'Check authentication status response time: {time.time() - check_status_start_time} seconds')
             status_response.raise_for_status()
         except requests.exceptions.HTTPError as check_status_request_exception:
@@ -161,14 +214,16 @@ class IBConnector:
                 raise requests.RequestException(error_msg)
     
     def get_ticker_to_contract_dict(self):
-        return self.__ticker_to_contract_info_dict
+        with self.__contract_info_lock:
+            return dict(self.__ticker_to_contract_info_dict)
     
     def get_screener_results(self, max_no_of_scanner_result: int, scanner_filter_payload: dict) -> list:
-        #with self.__scanner_lock:
+        with self.__scanner_lock:
             try:
                 scanner_type = scanner_filter_payload.get("type")
                 scanner_request_start_time = time.time()
-                scanner_response = session.post(f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.RUN_SCANNER}', json=scanner_filter_payload, verify=False)
+                with profile_span('ib_scanner_request'):
+                    scanner_response = self._send_request('POST', f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.RUN_SCANNER}', scanner_filter_payload)
                 logger.log_debug_msg(f'{scanner_type} scanner result response time: {time.time() - scanner_request_start_time} seconds')
                 scanner_response.raise_for_status()
             except requests.exceptions.HTTPError as scanner_request_exception:
@@ -191,12 +246,28 @@ class IBConnector:
                     else:
                         logger.log_debug_msg(f'Exclude unknown contract from scanner result, {result}', with_std_out=True)
                 
-                time.sleep(SCANNER_RATE_LIMIT_WAIT_PERIOD)
-                #logger.log_debug_msg('Release scanner result retrieval lock')
+                logger.log_debug_msg('Release scanner result retrieval lock')
                 
                 return scanner_result_without_otc_stock[:max_no_of_scanner_result]
     
     def get_security_by_tickers(self, ticker_list: list) -> list:
+        cached_contract_list, unresolved_ticker_list = self.__symbol_con_id_index.resolve(ticker_list)
+        logger.log_debug_msg(f'Resolve {len(ticker_list) - len(unresolved_ticker_list)}/{len(ticker_list)} ticker by symbol to conid index')
+
+        if not unresolved_ticker_list:
+            return cached_contract_list
+
+        fetched_contract_list, not_found_ticker_list = self.__request_security_by_tickers(unresolved_ticker_list)
+        self.__symbol_con_id_index.update(fetched_contract_list, not_found_ticker_list)
+        self.__symbol_con_id_index.save()
+
+        ticker_to_contract_dict = {contract['symbol']: contract for contract in cached_contract_list + fetched_contract_list}
+        return [ticker_to_contract_dict[ticker] for ticker in ticker_list if ticker in ticker_to_contract_dict]
+
+    def get_not_found_ticker_list(self, ticker_list: list) -> list:
+        return self.__symbol_con_id_index.get_not_found_symbol_list(ticker_list)
+
+    def __request_security_by_tickers(self, ticker_list: list) -> tuple:
         result_list = []
         get_security_payload_list = []
         temp_list = []
@@ -214,11 +285,10 @@ class IBConnector:
 
         try:
             get_security_by_ticker_start_time = time.time()
-            security_response = send_async_request(method='GET', 
-                                                   endpoint=f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.SECURITY_STOCKS_BY_SYMBOL}', 
-                                                   payload_list=get_security_payload_list, 
-                                                   chunk_size=10,
-                                                   loop=self.__loop)
+            security_response = self._send_async_request(method='GET', 
+                                                         endpoint=f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.SECURITY_STOCKS_BY_SYMBOL}', 
+                                                         payload_list=get_security_payload_list, 
+                                                         chunk_size=10)
             logger.log_debug_msg(f'Get security by ticker response time: {time.time() - get_security_by_ticker_start_time}')
         except Exception as security_request_exception:
             logger.log_error_msg(f'Error occurred while requesting security by ticker, Cause: {security_request_exception}')
@@ -252,36 +322,69 @@ class IBConnector:
                             temp_list.append(ticker)
                             logger.log_debug_msg(f'Test Can\'t find security for ticker of "{ticker}"')
                     else:
+                        # Empty security list is not cached as not found, the symbol is looked up again on the next request
                         logger.log_debug_msg(f'Can\'t find security for ticker of "{ticker}"')
 
-            return result_list
+            return result_list, temp_list
     
     def update_contract_info(self, contract_list: list) -> None:
         update_contract_info_start_time = time.time()
-        snapshot_data_con_id_list = []
-        
-        for contract in contract_list:
-            con_id = contract['con_id']
-            ticker_symbol = contract['symbol']
-
-            if ticker_symbol not in self.__ticker_to_contract_info_dict:
-                snapshot_data_con_id_list.append(con_id)
         
-        if snapshot_data_con_id_list:
-            #with self.__snapshot_info_lock:
-                self.update_snapshot(snapshot_data_con_id_list)
-                self.update_sec_def(snapshot_data_con_id_list)
-                time.sleep(SNAPSHOT_RATE_LIMIT_WAIT_PERIOD)
-                #logger.log_debug_msg('Release snapshot retrieval lock')
-        else:
-            logger.log_debug_msg(f'No snapshot data is required to update for the contracts: {contract_list}')
+        with self.__snapshot_info_lock:
+            snapshot_field_tuple_to_con_id_list_dict = {}
+            sec_def_con_id_list = []
+            
+            for contract in contract_list:
+                con_id = contract['con_id']
+                ticker_symbol = contract['symbol']
+                stale_field_list = self.__contract_metadata_store.get_stale_field_list(con_id, ticker_symbol)
+                
+                # Fields still fresh in the metadata cache are used as is, only the stale ones are requested
+                if ticker_symbol not in self.__ticker_to_contract_info_dict and len(stale_field_list) < len(CONTRACT_METADATA_FIELD_LIST):
+                    self.__set_contract_info(con_id, ticker_symbol, self.__contract_metadata_store.get_field_to_value_dict(con_id))
+                
+                snapshot_field_tuple = tuple(field for field in SNAPSHOT_FIELD_TO_CONTRACT_METADATA_FIELD_DICT.values() if field in stale_field_list)
+                if snapshot_field_tuple:
+                    snapshot_field_tuple_to_con_id_list_dict.setdefault(snapshot_field_tuple, []).append(con_id)
+                
+                if 'sector' in stale_field_list:
+                    sec_def_con_id_list.append(con_id)
+            
+            if snapshot_field_tuple_to_con_id_list_dict or sec_def_con_id_list:
+                for snapshot_field_tuple, snapshot_data_con_id_list in snapshot_field_tuple_to_con_id_list_dict.items():
+                    self.update_snapshot(snapshot_data_con_id_list, list(snapshot_field_tuple))
+                
+                self.update_sec_def(sec_def_con_id_list)
+                self.__contract_metadata_store.save()
+                logger.log_debug_msg(f'Rate limiter metrics: {get_rate_limiter_metrics()}')
+                logger.log_debug_msg('Release snapshot retrieval lock')
+            else:
+                logger.log_debug_msg(f'No snapshot data is required to update for the contracts: {contract_list}')
         
         logger.log_debug_msg(f'update contract info completed time: {time.time() - update_contract_info_start_time} seconds')
     
-    def update_snapshot(self, con_id_list: list) -> None:
+    def __set_contract_info(self, con_id, symbol: str, field_to_value_dict: dict) -> None:
+        snapshot = Snapshot(field_to_value_dict.get('market_data_availability'), field_to_value_dict.get('last'), field_to_value_dict.get('previous_close'))
+        contract_info = ContractInfo(con_id, symbol, 
+                                     field_to_value_dict.get('exchange'), 
+                                     field_to_value_dict.get('company_name'), 
+                                     field_to_value_dict.get('sector'), 
+                                     field_to_value_dict.get('market_cap'), 
+                                     field_to_value_dict.get('shortable'), 
+                                     field_to_value_dict.get('shortable_shares'), 
+                                     field_to_value_dict.get('rebate_rate'), 
+                                     snapshot)
+        
+        with self.__contract_info_lock:
+            self.__ticker_to_contract_info_dict[symbol] = contract_info
+    
+    def update_snapshot(self, con_id_list: list, contract_metadata_field_list: list = CONTRACT_METADATA_FIELD_LIST) -> None:
         if not con_id_list:
             return
         
+        # Symbol is always requested, the response is keyed by it
+        snapshot_field_list_str = ','.join(['55'] + [snapshot_field for snapshot_field, contract_metadata_field in SNAPSHOT_FIELD_TO_CONTRACT_METADATA_FIELD_DICT.items() if contract_metadata_field in contract_metadata_field_list])
+        
         logger.log_debug_msg(f'Getting market cap, is shortable, shortable shares, and rebate rate data, conId list: {con_id_list}')
         snapshot_payload_list = []
 
@@ -290,7 +393,7 @@ class IBConnector:
         for chunk in chunk_list:
             get_snapshot_payload = {
                 'conids': ','.join(str(con_id) for con_id in chunk),
-                'fields' : SNAPSHOT_FIELD_LIST_STR
+                'fields' : snapshot_field_list_str
             }
             snapshot_payload_list.append(get_snapshot_payload)
 
@@ -300,12 +403,11 @@ class IBConnector:
             
             while not snapshot_retrieval_success:
                 get_contract_snapshot_start_time = time.time()
-                snapshot_response_list = send_async_request(method='GET', 
-                                                            endpoint=f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.SNAPSHOT}', 
-                                                            payload_list=snapshot_payload_list, 
-                                                            chunk_size=10,
-                                                            no_of_request_per_sec=SNAPSHOT_RATE_LIMIT_WAIT_PERIOD,
-                                                            loop=self.__loop)
+                with profile_span('ib_snapshot_request'):
+                    snapshot_response_list = self._send_async_request(method='GET', 
+                                                                      endpoint=f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.SNAPSHOT}', 
+                                                                      payload_list=snapshot_payload_list, 
+                                                                      chunk_size=10)
                 logger.log_debug_msg(f'Get market cap, is shortable, shortable shares, and rebate rate data response time: {time.time() - get_contract_snapshot_start_time}')
                 
                 for snapshot_list in snapshot_response_list:
@@ -341,72 +443,21 @@ class IBConnector:
                     else:
                         symbol = None
                         logger.log_debug_msg(f'No ticker symbol data is available for {snapshot_data}')
-
-                    if '7051' in snapshot_data:
-                        company_name = snapshot_data['7051']
-                    else:
-                        company_name = None
-                        logger.log_debug_msg(f'No company name data is available for {snapshot_data}')
-
-                    if '7289' in snapshot_data:
-                        market_cap = snapshot_data['7289']
-                    else:
-                        market_cap = None
-                        logger.log_debug_msg(f'No market cap data is available for {snapshot_data}')
-
-                    if '7221' in snapshot_data:
-                        exchange = snapshot_data['7221']
-                    else:
-                        exchange = None
-                        logger.log_debug_msg(f'No exchange cap data is available for {snapshot_data}')
-
-                    if '7644' in snapshot_data:
-                        shortable = snapshot_data['7644']
-                    else:
-                        shortable = None
-                        logger.log_debug_msg(f'No shortable cap data is available for {snapshot_data}')
-
-                    if '7636' in snapshot_data:
-                        shortable_shares = snapshot_data['7636']
-                    else:
-                        shortable_shares = None
-                        logger.log_debug_msg(f'No shortable shares data is available for {snapshot_data}')
-
-                    if '7637' in snapshot_data:
-                        rebate_rate = snapshot_data['7637']
-                    else:
-                        rebate_rate = None
-                        logger.log_debug_msg(f'No rebate rate data is available for {snapshot_data}')
-
-                    if '6509' in snapshot_data:
-                        market_data_availability = snapshot_data['6509']
-                    else:
-                        market_data_availability = None
-                        logger.log_debug_msg(f'No market data availability data is available for {snapshot_data}')
-                    
-                    if '31' in snapshot_data:
-                        last = snapshot_data['31']
-                    else:
-                        last = None
-                        logger.log_debug_msg(f'No last price data is available for {snapshot_data}')
                     
-                    if '31' in snapshot_data:
-                        last = snapshot_data['31']
-                    else:
-                        last = None
-                        logger.log_debug_msg(f'No last price data is available for {snapshot_data}')
+                    field_to_value_dict = {}
+                    for snapshot_field, contract_metadata_field in SNAPSHOT_FIELD_TO_CONTRACT_METADATA_FIELD_DICT.items():
+                        if contract_metadata_field not in contract_metadata_field_list:
+                            continue
                         
-                    if '7741' in snapshot_data:
-                        previous_close = snapshot_data['7741']
-                    else:
-                        previous_close = None
-                        logger.log_debug_msg(f'No previous close data is available for {snapshot_data}')
-                    
-                    snapshot = Snapshot(market_data_availability, last, previous_close)
+                        if snapshot_field in snapshot_data:
+                            field_to_value_dict[contract_metadata_field] = snapshot_data[snapshot_field]
+                        else:
+                            field_to_value_dict[contract_metadata_field] = None
+                            logger.log_debug_msg(f'No {contract_metadata_field} data is available for {snapshot_data}')
 
                     if symbol:
-                        contract_info = ContractInfo(con_id, symbol, exchange, company_name, None, market_cap, shortable, shortable_shares, rebate_rate, snapshot)
-                        self.__ticker_to_contract_info_dict[symbol] = contract_info
+                        self.__symbol_con_id_index.on_symbol_observed(con_id, symbol)
+                        self.__set_contract_info(con_id, symbol, self.__contract_metadata_store.update(con_id, symbol, field_to_value_dict))
 
     def update_sec_def(self, con_id_list: list) -> None:
         if not con_id_list:
@@ -425,11 +476,10 @@ class IBConnector:
 
         try:
             get_security_definitions_start_time = time.time()
-            sec_def_response_list = send_async_request(method='GET', 
-                                                       endpoint=f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.SECURITY_DEFINITIONS}', 
-                                                       payload_list=sec_def_payload_list, 
-                                                       chunk_size=100,
-                                                       loop=self.__loop)
+            sec_def_response_list = self._send_async_request(method='GET', 
+                                                             endpoint=f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.SECURITY_DEFINITIONS}', 
+                                                             payload_list=sec_def_payload_list, 
+                                                             chunk_size=100)
             logger.log_debug_msg(f'Get sector data response time: {time.time() - get_security_definitions_start_time}')
         except Exception as snapshot_request_exception:
             logger.log_error_msg(f'Error occurred while requesting sector data, Cause: {snapshot_request_exception}')
@@ -457,7 +507,8 @@ class IBConnector:
                         logger.log_debug_msg(f'{ticker} has no sector group')
 
                     if ticker in self.__ticker_to_contract_info_dict:
-                        self.__ticker_to_contract_info_dict[ticker].sector = f'{sector_group}, {group}'
+                        sector = f'{sector_group}, {group}' if sector_group or group else None
+                        self.__set_contract_info(sec_df['conid'], ticker, self.__contract_metadata_store.update(sec_df['conid'], ticker, dict(sector=sector)))
                     else:
                         logger.log_debug_msg(f'{ticker} does not exist in ticker to contract dict')
 
@@ -521,75 +572,42 @@ class IBConnector:
             
             candle_payload_list.append(candle_payload)
 
+        not_found_con_id_list = []
+        def on_candle_response(payload, status_code, json_response):
+            if isinstance(json_response, dict) and NOT_FOUND_ERROR_PATTERN.search(str(json_response.get('error', ''))):
+                not_found_con_id_list.append(payload['conid'])
+
         try:
-            #with self.__historical_data_lock:
+            with self.__historical_data_lock:
                 logger.log_debug_msg(f'Getting {bar_size.value} historical candle data, paylaod list: {candle_payload_list}')
                 get_one_minute_candle_start_time = time.time()
-                candle_response_list = send_async_request(method='GET', 
-                                                          endpoint=f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.MARKET_DATA_HISTORY}', 
-                                                          payload_list=candle_payload_list, 
-                                                          chunk_size=5,
-                                                          loop=self.__loop)
+                with profile_span('ib_historical_candle_request'):
+                    candle_response_list = self._send_async_request(method='GET', 
+                                                                    endpoint=f'{ClientPortalApiEndpoint.HOSTNAME + ClientPortalApiEndpoint.MARKET_DATA_HISTORY}', 
+                                                                    payload_list=candle_payload_list, 
+                                                                    chunk_size=5,
+                                                                    on_response=on_candle_response)
                 logger.log_debug_msg(f'Get {bar_size.value} historical candle data time: {time.time() - get_one_minute_candle_start_time}')
-                #logger.log_debug_msg('Release historical data retrieval lock')
+                logger.log_debug_msg('Release historical data retrieval lock')
         except Exception as historical_data_request_exception:
             logger.log_error_msg(f'An error occurred while requesting {bar_size.value} historical data, Cause: {historical_data_request_exception}')
             raise historical_data_request_exception
         else:
+            # Only an explicit not found error invalidates the conid, a failed chunk or a ticker without bars keeps it
+            if not_found_con_id_list:
+                self.__symbol_con_id_index.invalidate([contract['symbol'] for contract in contract_list if str(contract['con_id']) in not_found_con_id_list])
+                self.__symbol_con_id_index.save()
+
             construct_dataframe_start_time = time.time()
 
             logger.log_debug_msg(f'Create datetime range index, start datetime: {datetime_idx_range_start_datetime}, end datetime: {datetime_idx_range_end_datetime}')
             datetime_range_index = pd.date_range(start=datetime_idx_range_start_datetime, end=datetime_idx_range_end_datetime, freq=interval)
 
-            ticker_candle_df_list = []
-
-            for historical_data in candle_response_list:
-                if 'error' in historical_data:
-                    continue
-                
-                if 'symbol' not in historical_data:
-                    continue
-                
-                ticker = historical_data['symbol']
-                historical_ohlcv_list = historical_data['data']
-
-                ohlcv_list = []
-                datetime_idx_list = []
-
-                for historical_ohlcv in historical_ohlcv_list:
-                    open = historical_ohlcv['o']
-                    high = historical_ohlcv['h']
-                    low = historical_ohlcv['l']
-                    close = historical_ohlcv['c']
-                    volume = int(historical_ohlcv['v'] * 100)
-                    dt = historical_ohlcv['t']
-                    ohlcv_list.append([open, high, low, close, volume])
-                    datetime_idx_list.append(dt)
-
-                if bar_size.value.endswith('d'):
-                    datetime_index = (pd.DatetimeIndex(pd.to_datetime(datetime_idx_list, unit='ms', utc=False)
-                                                         .tz_localize('UTC')
-                                                         .tz_convert('US/Eastern')).tz_localize(None).date)
-                else:
-                    datetime_index = (pd.DatetimeIndex(pd.to_datetime(datetime_idx_list, unit='ms', utc=False)
-                                                         .tz_localize('UTC')
-                                                         .tz_convert('US/Eastern')).tz_localize(None)
-                                                                                   .floor('T'))
-
-                ticker_to_indicator_column = pd.MultiIndex.from_product([[ticker], [Indicator.OPEN.value, Indicator.HIGH.value, Indicator.LOW.value, Indicator.CLOSE.value, Indicator.VOLUME.value]])
-                single_ticker_candle_df = pd.DataFrame(ohlcv_list, columns=ticker_to_indicator_column, index=datetime_index)
-
-                if single_ticker_candle_df.index.duplicated().any():
-                    single_ticker_candle_df = single_ticker_candle_df.loc[~single_ticker_candle_df.index.duplicated(keep='first')]
-
-                single_ticker_candle_df = single_ticker_candle_df.reindex(datetime_range_index) # may need ffill() and bfill()
-                ticker_candle_df_list.append(single_ticker_candle_df)
-
+            with profile_span('historical_candle_decode'):
+                complete_df = convert_historical_candle_response_to_df(candle_response_list, datetime_range_index, bar_size.value.endswith('d'))
             logger.log_debug_msg(f'Construct ohlcv dataframe time: {time.time() - construct_dataframe_start_time}')
 
-            if ticker_candle_df_list:
-                complete_df = pd.concat(ticker_candle_df_list, axis=1)
-            else:
+            if complete_df is None:
                 return None
             
             if bar_size.value.endswith('d'):
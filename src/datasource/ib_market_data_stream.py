@@ -0,0 +1,283 @@
+import asyncio
+import datetime
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+import aiohttp
+import pandas as pd
+
+from model.candle.minute_bar_builder import MinuteBarBuilder
+
+from utils.http_util import get_event_loop_and_session
+from utils.datetime_util import get_current_us_datetime
+from utils.config_util import get_config
+from utils.logger import Logger
+
+logger = Logger()
+
+WEBSOCKET_URL = get_config('IB_MARKET_DATA_STREAM', 'WEBSOCKET_URL')
+HEARTBEAT_INTERVAL_IN_SECOND = get_config('IB_MARKET_DATA_STREAM', 'HEARTBEAT_INTERVAL_IN_SECOND')
+RECONNECT_INTERVAL_IN_SECOND = get_config('IB_MARKET_DATA_STREAM', 'RECONNECT_INTERVAL_IN_SECOND')
+MAX_NO_OF_BAR = get_config('IB_MARKET_DATA_STREAM', 'MAX_NO_OF_BAR')
+MAX_NO_OF_SUBSCRIPTION = get_config('IB_MARKET_DATA_STREAM', 'MAX_NO_OF_SUBSCRIPTION')
+
+# Field     Return Type   Description
+# 31        string        Last Price, prefixed with C for prior close and H for trading halt
+# 7762      string        Volume Long - Day volume in shares without K/M formatting
+LAST_PRICE_FIELD = '31'
+DAY_VOLUME_FIELD = '7762'
+MARKET_DATA_FIELD_LIST = [LAST_PRICE_FIELD, DAY_VOLUME_FIELD]
+PRIOR_CLOSE_PREFIX = 'C'
+
+NUMERIC_VALUE_PATTERN = re.compile(r'-?\d+(\.\d+)?')
+
+def parse_market_data_value(value) -> float:
+    if value is None:
+        return None
+
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    matched_value = NUMERIC_VALUE_PATTERN.search(str(value).replace(',', ''))
+    return float(matched_value.group()) if matched_value else None
+
+def parse_last_price(value) -> float:
+    # Prior close is quoted until the first trade of the session, it is not a trade of the current minute
+    if isinstance(value, str) and value.strip().startswith(PRIOR_CLOSE_PREFIX):
+        return None
+
+    return parse_market_data_value(value)
+
+def convert_updated_time_to_us_datetime(updated_time_in_ms: int) -> datetime.datetime:
+    if updated_time_in_ms is None:
+        return get_current_us_datetime().replace(tzinfo=None)
+
+    return (pd.Timestamp(int(updated_time_in_ms), unit='ms', tz='UTC')
+              .tz_convert('US/Eastern')
+              .tz_localize(None)
+              .to_pydatetime())
+
+class IBMarketDataStream:
+    def __init__(self, websocket_url: str = WEBSOCKET_URL, session_provider: Callable = None, max_no_of_subscription: int = MAX_NO_OF_SUBSCRIPTION):
+        self.__websocket_url = websocket_url
+        # Market data lines are limited per account, subscriptions over the limit are rejected by the gateway
+        self.__max_no_of_subscription = max_no_of_subscription
+        # Client Portal authenticates the websocket by the session returned from /tickle
+        self.__session_provider = session_provider
+        self.__lock = threading.Lock()
+
+        # Least recently updated subscriber first
+        self.__subscriber_to_contract_dict = OrderedDict()
+        self.__con_id_to_ticker_dict = {}
+        self.__ticker_to_bar_builder_dict = {}
+        self.__subscribed_con_id_set = set()
+
+        self.__loop = None
+        self.__websocket = None
+        self.__stream_future = None
+        self.__is_running = False
+        self.__is_connected = False
+
+        self.__no_of_message = 0
+        self.__no_of_connection = 0
+        self.__last_message_time = None
+
+    @property
+    def is_connected(self):
+        return self.__is_connected
+
+    def start(self) -> None:
+        with self.__lock:
+            if self.__is_running:
+                return
+
+            self.__is_running = True
+
+        # The socket shares the http client event loop and connector, so no extra thread is started
+        self.__loop, client_session = get_event_loop_and_session()
+        self.__stream_future = asyncio.run_coroutine_threadsafe(self.__run(client_session), self.__loop)
+        logger.log_debug_msg(f'Start market data stream on {self.__websocket_url}', with_std_out=True)
+
+    def stop(self) -> None:
+        with self.__lock:
+            if not self.__is_running:
+                return
+
+            self.__is_running = False
+
+        if self.__websocket is not None:
+            asyncio.run_coroutine_threadsafe(self.__websocket.close(), self.__loop).result()
+
+        self.__stream_future.result()
+        logger.log_debug_msg(f'Stop market data stream, stats: {self.get_stats()}')
+
+    def update_subscription(self, subscriber, contract_list: list) -> None:
+        # Each candle store keeps its own scanner result, the socket subscribes to the union of them up to the market data line limit
+        with self.__lock:
+            self.__subscriber_to_contract_dict[subscriber] = {int(contract['con_id']): contract['symbol'] for contract in contract_list}
+            self.__subscriber_to_contract_dict.move_to_end(subscriber)
+
+            # The most recent scanner result goes first, contracts of a result are in scanner rank order
+            con_id_to_ticker_dict = {}
+            for contract_dict in reversed(self.__subscriber_to_contract_dict.values()):
+                for con_id, ticker in contract_dict.items():
+                    if len(con_id_to_ticker_dict) >= self.__max_no_of_subscription:
+                        break
+
+                    con_id_to_ticker_dict.setdefault(con_id, ticker)
+
+            no_of_dropped_con_id = len(set().union(*self.__subscriber_to_contract_dict.values()) - con_id_to_ticker_dict.keys())
+            if no_of_dropped_con_id:
+                logger.log_debug_msg(f'Market data stream subscription is capped at {self.__max_no_of_subscription}, {no_of_dropped_con_id} contracts are left to history polling')
+
+            self.__con_id_to_ticker_dict = con_id_to_ticker_dict
+
+            for ticker in [ticker for ticker in self.__ticker_to_bar_builder_dict if ticker not in con_id_to_ticker_dict.values()]:
+                del self.__ticker_to_bar_builder_dict[ticker]
+
+        if self.__is_running and self.__loop is not None:
+            asyncio.run_coroutine_threadsafe(self.__sync_subscription(), self.__loop)
+
+    def get_stream_start_datetime(self, ticker: str) -> datetime.datetime:
+        with self.__lock:
+            bar_builder = self.__ticker_to_bar_builder_dict.get(ticker)
+
+            if not self.__is_connected or bar_builder is None:
+                return None
+
+            return bar_builder.stream_start_datetime
+
+    def get_candle_df(self, ticker_list: list, range_start_datetime: datetime.datetime, range_end_datetime: datetime.datetime) -> pd.DataFrame:
+        datetime_range_index = pd.date_range(start=range_start_datetime, end=range_end_datetime, freq='1min')
+
+        with self.__lock:
+            candle_df_list = [self.__ticker_to_bar_builder_dict[ticker].get_candle_df(datetime_range_index) for ticker in ticker_list if ticker in self.__ticker_to_bar_builder_dict]
+
+        if not candle_df_list:
+            return None
+
+        return pd.concat(candle_df_list, axis=1)
+
+    def get_stats(self) -> dict:
+        with self.__lock:
+            ticker_to_bar_dict = {ticker: dict(no_of_tick=bar_builder.no_of_tick, no_of_bar=bar_builder.no_of_bar, stream_start_datetime=bar_builder.stream_start_datetime)
+                                    for ticker, bar_builder in self.__ticker_to_bar_builder_dict.items()}
+
+            return dict(is_connected=self.__is_connected,
+                        no_of_connection=self.__no_of_connection,
+                        no_of_message=self.__no_of_message,
+                        last_message_time=self.__last_message_time,
+                        no_of_subscription=len(self.__subscribed_con_id_set),
+                        ticker=ticker_to_bar_dict)
+
+    async def __run(self, client_session: aiohttp.ClientSession) -> None:
+        while self.__is_running:
+            heartbeat_task = None
+
+            try:
+                headers = None
+                if self.__session_provider:
+                    session_id = await asyncio.get_running_loop().run_in_executor(None, self.__session_provider)
+                    headers = {'Cookie': f'api={session_id}'} if session_id else None
+
+                async with client_session.ws_connect(self.__websocket_url, ssl=False, headers=headers, heartbeat=None) as websocket:
+                    self.__websocket = websocket
+                    self.__subscribed_con_id_set = set()
+                    self.__is_connected = True
+                    self.__no_of_connection += 1
+                    logger.log_debug_msg(f'Market data stream connected, no. of connection: {self.__no_of_connection}')
+
+                    await self.__sync_subscription()
+                    heartbeat_task = asyncio.create_task(self.__send_heartbeat(websocket))
+
+                    async for message in websocket:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            self.__on_message(message.data)
+                        elif message.type == aiohttp.WSMsgType.BINARY:
+                            self.__on_message(message.data.decode('utf-8'))
+                        elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except Exception as stream_exception:
+                logger.log_error_msg(f'Market data stream error, Cause: {stream_exception}')
+            finally:
+                if heartbeat_task:
+                    heartbeat_task.cancel()
+
+                self.__websocket = None
+                self.__is_connected = False
+
+                with self.__lock:
+                    for bar_builder in self.__ticker_to_bar_builder_dict.values():
+                        bar_builder.reset()
+
+            if self.__is_running:
+                logger.log_debug_msg(f'Market data stream disconnected, reconnect after {RECONNECT_INTERVAL_IN_SECOND} seconds')
+                await asyncio.sleep(RECONNECT_INTERVAL_IN_SECOND)
+
+    async def __send_heartbeat(self, websocket) -> None:
+        while not websocket.closed:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_IN_SECOND)
+            await websocket.send_str('tic')
+
+    async def __sync_subscription(self) -> None:
+        websocket = self.__websocket
+
+        if websocket is None or websocket.closed:
+            return
+
+        with self.__lock:
+            con_id_set = set(self.__con_id_to_ticker_dict.keys())
+
+        subscribe_con_id_list = sorted(con_id_set - self.__subscribed_con_id_set)
+        unsubscribe_con_id_list = sorted(self.__subscribed_con_id_set - con_id_set)
+
+        for con_id in subscribe_con_id_list:
+            await websocket.send_str(f'smd+{con_id}+{json.dumps(dict(fields=MARKET_DATA_FIELD_LIST))}')
+            self.__subscribed_con_id_set.add(con_id)
+
+        for con_id in unsubscribe_con_id_list:
+            await websocket.send_str(f'umd+{con_id}+{{}}')
+            self.__subscribed_con_id_set.discard(con_id)
+
+        if subscribe_con_id_list or unsubscribe_con_id_list:
+            logger.log_debug_msg(f'Market data stream subscribe: {subscribe_con_id_list}, unsubscribe: {unsubscribe_con_id_list}')
+
+    def __on_message(self, message_str: str) -> None:
+        self.__no_of_message += 1
+        self.__last_message_time = time.time()
+
+        try:
+            message = json.loads(message_str)
+        except ValueError:
+            return
+
+        if not isinstance(message, dict) or not str(message.get('topic', '')).startswith('smd+'):
+            return
+
+        con_id = message.get('conid')
+        if con_id is None:
+            con_id = message['topic'].split('+')[1]
+
+        price = parse_last_price(message.get(LAST_PRICE_FIELD))
+        cumulative_volume = parse_market_data_value(message.get(DAY_VOLUME_FIELD))
+
+        if price is None and cumulative_volume is None:
+            return
+
+        tick_datetime = convert_updated_time_to_us_datetime(message.get('_updated'))
+
+        with self.__lock:
+            ticker = self.__con_id_to_ticker_dict.get(int(con_id))
+
+            if ticker is None:
+                return
+
+            bar_builder = self.__ticker_to_bar_builder_dict.get(ticker)
+            if bar_builder is None:
+                bar_builder = MinuteBarBuilder(ticker, MAX_NO_OF_BAR)
+                self.__ticker_to_bar_builder_dict[ticker] = bar_builder
+
+            bar_builder.update(tick_datetime, price, cumulative_volume)
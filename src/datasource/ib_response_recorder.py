@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+import requests
+
+from utils.config_util import ROOT_DIR
+from utils.datetime_util import get_current_us_datetime
+from utils.logger import Logger
+
+from constant.endpoint.ib.client_portal_api_endpoint import ClientPortalApiEndpoint
+
+logger = Logger()
+
+def get_recording_dir(recording_dir: str) -> str:
+    if os.path.isabs(recording_dir):
+        return recording_dir
+
+    return os.path.join(ROOT_DIR, recording_dir)
+
+def get_recording_file_path(recording_dir: str, us_date_str: str) -> str:
+    return os.path.join(get_recording_dir(recording_dir), f'ib_response_{us_date_str}.jsonl')
+
+def get_relative_endpoint(endpoint: str) -> str:
+    # Recording does not depend on the gateway host and port
+    return endpoint[len(ClientPortalApiEndpoint.HOSTNAME.value):] if endpoint.startswith(ClientPortalApiEndpoint.HOSTNAME.value) else endpoint
+
+class IBResponseRecorder:
+    def __init__(self, recording_dir: str):
+        self.__recording_dir = recording_dir
+        self.__lock = threading.Lock()
+        self.__recording_file = None
+        self.__recording_date_str = None
+        self.__no_of_record = 0
+
+        os.makedirs(get_recording_dir(recording_dir), exist_ok=True)
+
+    @property
+    def no_of_record(self):
+        return self.__no_of_record
+
+    def record_response(self, method: str, endpoint: str, payload: dict, response: requests.Response) -> None:
+        try:
+            json_response = response.json()
+        except ValueError:
+            json_response = None
+
+        self.record(method, endpoint, payload, response.status_code, json_response)
+
+    def record(self, method: str, endpoint: str, payload: dict, status_code: int, json_response) -> None:
+        us_current_datetime = get_current_us_datetime()
+        record_dict = dict(recorded_datetime=us_current_datetime.isoformat(),
+                           method=method,
+                           endpoint=get_relative_endpoint(endpoint),
+                           payload=payload,
+                           status_code=status_code,
+                           response=json_response)
+
+        try:
+            with self.__lock:
+                us_date_str = us_current_datetime.strftime('%Y%m%d')
+
+                # One file per US trading day
+                if us_date_str != self.__recording_date_str:
+                    self.__close_recording_file()
+                    self.__recording_file = open(get_recording_file_path(self.__recording_dir, us_date_str), 'a', encoding='utf-8')
+                    self.__recording_date_str = us_date_str
+                    logger.log_debug_msg(f'Record Client Portal responses to {self.__recording_file.name}')
+
+                self.__recording_file.write(json.dumps(record_dict) + '\n')
+                self.__recording_file.flush()
+                self.__no_of_record += 1
+        except (OSError, TypeError) as record_exception:
+            logger.log_error_msg(f'Failed to record {method} {endpoint} response, {record_exception}')
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__close_recording_file()
+
+    def __close_recording_file(self) -> None:
+        if self.__recording_file is not None:
+            self.__recording_file.close()
+            self.__recording_file = None
+            self.__recording_date_str = None
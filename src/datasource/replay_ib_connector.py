@@ -0,0 +1,142 @@
+from bisect import bisect_right
+import datetime
+import json
+from typing import Callable
+import requests
+
+from datasource.ib_connector import IBConnector
+from datasource.contract_metadata_store import ContractMetadataStore
+from datasource.symbol_con_id_index import SymbolConIdIndex
+from datasource.ib_response_recorder import get_relative_endpoint
+
+from utils.datetime_util import get_current_us_datetime
+from utils.logger import Logger
+
+from constant.endpoint.ib.client_portal_api_endpoint import ClientPortalApiEndpoint
+
+logger = Logger()
+
+# Payload fields derived from the request time, a recorded response is still valid when only these differ
+VOLATILE_PAYLOAD_KEY_LIST = ['period', 'startTime']
+
+# Session endpoints are not worth recording, replay answers them as a healthy gateway
+ENDPOINT_TO_DEFAULT_RESPONSE_DICT = {
+    ClientPortalApiEndpoint.ACCOUNT.value: {'accounts': ['REPLAY']},
+    ClientPortalApiEndpoint.AUTH_STATUS.value: {'authenticated': True, 'competing': False, 'connected': True},
+    ClientPortalApiEndpoint.SSO_VALIDATE.value: {},
+    ClientPortalApiEndpoint.REAUTHENTICATE.value: {'message': 'triggered'}
+}
+
+def get_payload_key(payload: dict, exclude_key_list: list = []) -> str:
+    if not payload:
+        return ''
+
+    return json.dumps({key: value for key, value in payload.items() if key not in exclude_key_list}, sort_keys=True, default=str)
+
+class ReplayResponse:
+    def __init__(self, status_code: int, json_response):
+        self.__status_code = status_code
+        self.__json_response = json_response
+
+    @property
+    def status_code(self):
+        return self.__status_code
+
+    def json(self):
+        return self.__json_response
+
+    def raise_for_status(self) -> None:
+        if self.__status_code >= 400:
+            raise requests.exceptions.HTTPError(f'Replay response status code: {self.__status_code}')
+
+class ReplayIBConnector(IBConnector):
+    def __init__(self, recording_file_path: str) -> None:
+        # Metadata and conid cached by live sessions would hide the recorded responses
+        super().__init__(contract_metadata_store=ContractMetadataStore(file_path=None), symbol_con_id_index=SymbolConIdIndex(file_path=None))
+        self.__request_key_to_record_dict = {}
+        self.__no_of_hit = 0
+        self.__no_of_miss = 0
+
+        self.__load_recording(recording_file_path)
+
+    @property
+    def no_of_hit(self):
+        return self.__no_of_hit
+
+    @property
+    def no_of_miss(self):
+        return self.__no_of_miss
+
+    def __load_recording(self, recording_file_path: str) -> None:
+        no_of_record = 0
+
+        with open(recording_file_path, 'r', encoding='utf-8') as recording_file:
+            for line in recording_file:
+                if not line.strip():
+                    continue
+
+                record = json.loads(line)
+                recorded_datetime = datetime.datetime.fromisoformat(record['recorded_datetime'])
+                method, endpoint, payload = record['method'], record['endpoint'], record['payload']
+
+                for request_key in {(method, endpoint, get_payload_key(payload)),
+                                    (method, endpoint, get_payload_key(payload, VOLATILE_PAYLOAD_KEY_LIST))}:
+                    self.__request_key_to_record_dict.setdefault(request_key, []).append((recorded_datetime, record['status_code'], record['response']))
+
+                no_of_record += 1
+
+        # Recorded by concurrent requests, the file is only roughly in time order
+        for request_key, record_list in self.__request_key_to_record_dict.items():
+            record_list.sort(key=lambda record: record[0])
+            self.__request_key_to_record_dict[request_key] = ([record[0] for record in record_list], record_list)
+
+        logger.log_debug_msg(f'Load {no_of_record} recorded Client Portal responses from {recording_file_path}', with_std_out=True)
+
+    def __get_recorded_response(self, method: str, endpoint: str, payload: dict) -> tuple:
+        relative_endpoint = get_relative_endpoint(endpoint)
+        recorded_datetime_and_record_list = (self.__request_key_to_record_dict.get((method, relative_endpoint, get_payload_key(payload)))
+                                                or self.__request_key_to_record_dict.get((method, relative_endpoint, get_payload_key(payload, VOLATILE_PAYLOAD_KEY_LIST))))
+
+        if not recorded_datetime_and_record_list:
+            self.__no_of_miss += 1
+            return None
+
+        # Latest response recorded at or before the simulated time, or the first one if the request comes earlier than the recording
+        recorded_datetime_list, record_list = recorded_datetime_and_record_list
+        position = bisect_right(recorded_datetime_list, get_current_us_datetime())
+        _, status_code, json_response = record_list[max(position - 1, 0)]
+
+        self.__no_of_hit += 1
+        return status_code, json_response
+
+    def _send_request(self, method: str, endpoint: str, payload: dict = None) -> ReplayResponse:
+        recorded_response = self.__get_recorded_response(method, endpoint, payload)
+
+        if recorded_response:
+            return ReplayResponse(*recorded_response)
+
+        default_response = ENDPOINT_TO_DEFAULT_RESPONSE_DICT.get(get_relative_endpoint(endpoint))
+        if default_response is not None:
+            return ReplayResponse(200, default_response)
+
+        logger.log_debug_msg(f'No recorded response for {method} {endpoint}, payload: {payload}')
+        return ReplayResponse(404, None)
+
+    def _send_async_request(self, method: str, endpoint: str, payload_list: list, chunk_size: int, on_response: Callable = None) -> list:
+        response_list = []
+
+        for payload in payload_list:
+            recorded_response = self.__get_recorded_response(method, endpoint, payload)
+
+            if recorded_response is not None and on_response:
+                on_response(payload, *recorded_response)
+
+            # Same as a failed live request, missing responses are left out of the response list
+            if recorded_response is None or recorded_response[0] >= 400:
+                logger.log_debug_msg(f'No recorded response for {method} {endpoint}, payload: {payload}')
+                continue
+
+            response_list.append(recorded_response[1])
+
+        logger.log_debug_msg(f'Replay {len(response_list)}/{len(payload_list)} {method} {endpoint} responses, total hit: {self.__no_of_hit}, miss: {self.__no_of_miss}')
+        return response_list
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+
+from utils.config_util import get_config
+from utils.datetime_util import get_current_us_datetime
+from utils.file_util import get_root_relative_path, write_file_atomically
+from utils.logger import Logger
+
+logger = Logger()
+
+CON_ID_CACHE_FILE_PATH = get_config('CON_ID_CACHE', 'FILE_PATH')
+MAX_CON_ID_AGE_IN_SECOND = get_config('CON_ID_CACHE', 'MAX_CON_ID_AGE_IN_SECOND')
+NOT_FOUND_TTL_IN_SECOND = get_config('CON_ID_CACHE', 'NOT_FOUND_TTL_IN_SECOND')
+
+class SymbolConIdIndex:
+    def __init__(self, file_path: str = CON_ID_CACHE_FILE_PATH,
+                       max_con_id_age_in_second: float = MAX_CON_ID_AGE_IN_SECOND,
+                       not_found_ttl_in_second: float = NOT_FOUND_TTL_IN_SECOND):
+        # Without a file path the index is only kept for the lifetime of the connector
+        self.__file_path = get_root_relative_path(file_path)
+        self.__max_con_id_age_in_second = max_con_id_age_in_second
+        self.__not_found_ttl_in_second = not_found_ttl_in_second
+        self.__lock = threading.Lock()
+        # Symbol -> [con_id, resolved time], con_id is None for a symbol the gateway does not know
+        self.__symbol_to_con_id_dict = {}
+        self.__is_dirty = False
+
+        self.__no_of_hit = 0
+        self.__no_of_miss = 0
+
+        self.__load()
+
+    @property
+    def no_of_hit(self):
+        return self.__no_of_hit
+
+    @property
+    def no_of_miss(self):
+        return self.__no_of_miss
+
+    def __len__(self):
+        return len(self.__symbol_to_con_id_dict)
+
+    def __is_expired(self, con_id, resolved_time: float, current_time: float) -> bool:
+        ttl = self.__max_con_id_age_in_second if con_id is not None else self.__not_found_ttl_in_second
+        return current_time - resolved_time > ttl
+
+    def __load(self) -> None:
+        if not self.__file_path or not os.path.exists(self.__file_path):
+            return
+
+        try:
+            with open(self.__file_path, 'r', encoding='utf-8') as cache_file:
+                symbol_to_con_id_dict = json.load(cache_file)
+        except (OSError, ValueError) as load_exception:
+            logger.log_error_msg(f'Failed to load symbol to conid index from {self.__file_path}, {load_exception}')
+            return
+
+        current_time = get_current_us_datetime().timestamp()
+        self.__symbol_to_con_id_dict = {symbol: con_id_and_resolved_time for symbol, con_id_and_resolved_time in symbol_to_con_id_dict.items()
+                                            if not self.__is_expired(*con_id_and_resolved_time, current_time)}
+
+        logger.log_debug_msg(f'Load {len(self.__symbol_to_con_id_dict)}/{len(symbol_to_con_id_dict)} symbol to conid from {self.__file_path}', with_std_out=True)
+
+    def save(self) -> None:
+        if not self.__file_path:
+            return
+
+        with self.__lock:
+            if not self.__is_dirty:
+                return
+
+            cache_json = json.dumps(self.__symbol_to_con_id_dict)
+            self.__is_dirty = False
+
+        try:
+            write_file_atomically(self.__file_path, cache_json)
+        except OSError as save_exception:
+            logger.log_error_msg(f'Failed to save symbol to conid index to {self.__file_path}, {save_exception}')
+
+    def resolve(self, symbol_list: list) -> tuple:
+        contract_list = []
+        unknown_symbol_list = []
+        current_time = get_current_us_datetime().timestamp()
+
+        with self.__lock:
+            for symbol in symbol_list:
+                con_id_and_resolved_time = self.__symbol_to_con_id_dict.get(symbol)
+
+                if con_id_and_resolved_time is None or self.__is_expired(*con_id_and_resolved_time, current_time):
+                    unknown_symbol_list.append(symbol)
+                    self.__no_of_miss += 1
+                    continue
+
+                self.__no_of_hit += 1
+                con_id = con_id_and_resolved_time[0]
+
+                if con_id is not None:
+                    contract_list.append({
+                        'con_id': con_id,
+                        'symbol': symbol
+                    })
+
+        return contract_list, unknown_symbol_list
+
+    def get_not_found_symbol_list(self, symbol_list: list) -> list:
+        current_time = get_current_us_datetime().timestamp()
+
+        with self.__lock:
+            return [symbol for symbol in symbol_list
+                        if symbol in self.__symbol_to_con_id_dict
+                            and self.__symbol_to_con_id_dict[symbol][0] is None
+                            and not self.__is_expired(*self.__symbol_to_con_id_dict[symbol], current_time)]
+
+    def update(self, contract_list: list, not_found_symbol_list: list = []) -> None:
+        resolved_time = get_current_us_datetime().timestamp()
+
+        with self.__lock:
+            for contract in contract_list:
+                self.__symbol_to_con_id_dict[contract['symbol']] = [contract['con_id'], resolved_time]
+
+            for symbol in not_found_symbol_list:
+                self.__symbol_to_con_id_dict[symbol] = [None, resolved_time]
+
+            self.__is_dirty = self.__is_dirty or bool(contract_list) or bool(not_found_symbol_list)
+
+    def on_symbol_observed(self, con_id, symbol: str) -> None:
+        # A conid quoted under another symbol means the old symbol was renamed, it has to be resolved again
+        with self.__lock:
+            renamed_symbol_list = [indexed_symbol for indexed_symbol, (indexed_con_id, _) in self.__symbol_to_con_id_dict.items()
+                                        if indexed_con_id is not None and str(indexed_con_id) == str(con_id) and indexed_symbol != symbol]
+
+            for renamed_symbol in renamed_symbol_list:
+                del self.__symbol_to_con_id_dict[renamed_symbol]
+
+            if renamed_symbol_list:
+                self.__is_dirty = True
+                logger.log_debug_msg(f'Invalidate renamed symbol {renamed_symbol_list} of conid {con_id}, now {symbol}')
+
+    def invalidate(self, symbol_list: list) -> None:
+        with self.__lock:
+            invalidated_symbol_list = [symbol for symbol in symbol_list if self.__symbol_to_con_id_dict.pop(symbol, None) is not None]
+
+            if invalidated_symbol_list:
+                self.__is_dirty = True
+                logger.log_debug_msg(f'Invalidate symbol to conid index of {invalidated_symbol_list}')
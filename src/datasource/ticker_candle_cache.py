@@ -0,0 +1,102 @@
+import datetime
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+from utils.datetime_util import get_current_us_datetime
+from utils.logger import Logger
+
+idx = pd.IndexSlice
+logger = Logger()
+
+class TickerCandleCache:
+    def __init__(self, name: str, max_no_of_entry: int) -> None:
+        self.__name = name
+        self.__max_no_of_entry = max_no_of_entry
+        self.__lock = threading.Lock()
+        # (ticker, end date, outside rth) -> (no. of period covered, candle df of the ticker, memory in byte), least recently used first
+        self.__cache_entry_dict = OrderedDict()
+        self.__current_date = None
+
+        self.__no_of_hit = 0
+        self.__no_of_miss = 0
+        self.__no_of_eviction = 0
+        self.__no_of_invalidation = 0
+
+    def __len__(self):
+        return len(self.__cache_entry_dict)
+
+    def __roll_over(self) -> None:
+        current_date = get_current_us_datetime().date()
+
+        if self.__current_date == current_date:
+            return
+
+        # Candles ending on a day that was still trading are incomplete once the day is over
+        if self.__current_date is not None:
+            invalidated_key_list = [key for key in self.__cache_entry_dict if key[1] >= self.__current_date]
+
+            for key in invalidated_key_list:
+                del self.__cache_entry_dict[key]
+
+            self.__no_of_invalidation += len(invalidated_key_list)
+            logger.log_debug_msg(f'Invalidate {len(invalidated_key_list)} {self.__name} candle cache entries on date rollover to {current_date}')
+
+        self.__current_date = current_date
+
+    def get(self, ticker_list: list, end_date: datetime.date, no_of_period: int, outside_rth: bool) -> tuple:
+        ticker_to_candle_df_dict = {}
+        missing_ticker_list = []
+
+        with self.__lock:
+            self.__roll_over()
+
+            for ticker in ticker_list:
+                key = (ticker, end_date, outside_rth)
+                cache_entry = self.__cache_entry_dict.get(key)
+
+                # An entry fetched over a longer period also covers a shorter one
+                if cache_entry is None or cache_entry[0] < no_of_period:
+                    missing_ticker_list.append(ticker)
+                    self.__no_of_miss += 1
+                    continue
+
+                self.__cache_entry_dict.move_to_end(key)
+                ticker_to_candle_df_dict[ticker] = cache_entry[1]
+                self.__no_of_hit += 1
+
+        return ticker_to_candle_df_dict, missing_ticker_list
+
+    def put(self, candle_df: pd.DataFrame, end_date: datetime.date, no_of_period: int, outside_rth: bool) -> dict:
+        ticker_to_candle_df_dict = {}
+
+        for ticker in candle_df.columns.get_level_values(0).unique():
+            ticker_to_candle_df_dict[ticker] = candle_df.loc[:, idx[[ticker], :]].dropna(how='all')
+
+        with self.__lock:
+            self.__roll_over()
+
+            for ticker, ticker_candle_df in ticker_to_candle_df_dict.items():
+                key = (ticker, end_date, outside_rth)
+                self.__cache_entry_dict[key] = (no_of_period, ticker_candle_df, int(ticker_candle_df.memory_usage(index=True).sum()))
+                self.__cache_entry_dict.move_to_end(key)
+
+            while len(self.__cache_entry_dict) > self.__max_no_of_entry:
+                self.__cache_entry_dict.popitem(last=False)
+                self.__no_of_eviction += 1
+
+        return ticker_to_candle_df_dict
+
+    def get_stats(self) -> dict:
+        with self.__lock:
+            no_of_lookup = self.__no_of_hit + self.__no_of_miss
+
+            return dict(name=self.__name,
+                        size=len(self.__cache_entry_dict),
+                        max_size=self.__max_no_of_entry,
+                        memory_in_byte=sum(cache_entry[2] for cache_entry in self.__cache_entry_dict.values()),
+                        no_of_hit=self.__no_of_hit,
+                        no_of_miss=self.__no_of_miss,
+                        no_of_eviction=self.__no_of_eviction,
+                        no_of_invalidation=self.__no_of_invalidation,
+                        hit_ratio=self.__no_of_hit / no_of_lookup if no_of_lookup else None)
@@ -0,0 +1,2 @@
+class ConfigurationError(Exception):
+    pass
\ No newline at end of file
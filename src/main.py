@@ -1,18 +1,82 @@
+import datetime
+import multiprocessing
+
+from datasource.ib_connector import IBConnector
+from datasource.ib_market_data_stream import IBMarketDataStream
+from datasource.ib_response_recorder import IBResponseRecorder, get_recording_file_path
+from datasource.replay_ib_connector import ReplayIBConnector
+
 from module.discord_chatbot_client import DiscordChatBotClient
+from module.replay_discord_chatbot_client import ReplayDiscordChatBotClient
 from module.stock_screener import StockScreener
 #from module.pl_report_generator import PLReportGenerator
 
+from utils.config_util import get_config
+from utils.datetime_util import SimulatedClock, set_simulated_clock
+from utils.discord_message_record_util import use_in_memory_message_record
 from utils.logger import Logger
 
+from exception.configuration_error import ConfigurationError
+
 logger = Logger()
 
-discord_client = DiscordChatBotClient()
-stock_screener = StockScreener(discord_client)
-#pl_report_generator = PLReportGenerator(discord_client)
+IB_REPLAY_MODE = get_config('IB_REPLAY', 'MODE')
+RECORDING_DIR = get_config('IB_REPLAY', 'RECORDING_DIR')
+REPLAY_DATE = get_config('IB_REPLAY', 'REPLAY_DATE')
+REPLAY_START_TIME = get_config('IB_REPLAY', 'REPLAY_START_TIME')
+REPLAY_SPEED = get_config('IB_REPLAY', 'REPLAY_SPEED')
+
+IS_MARKET_DATA_STREAM_ENABLED = get_config('IB_MARKET_DATA_STREAM', 'ENABLED')
+
+def get_replay_start_datetime() -> datetime.datetime:
+    if REPLAY_DATE is None or str(REPLAY_DATE).strip() == '':
+        raise ConfigurationError('[IB_REPLAY] REPLAY_DATE is required in REPLAY mode, e.g. REPLAY_DATE = 20240315')
+
+    try:
+        return datetime.datetime.strptime(f'{REPLAY_DATE} {REPLAY_START_TIME}', '%Y%m%d %H:%M:%S')
+    except ValueError as parse_exception:
+        raise ConfigurationError(f'[IB_REPLAY] REPLAY_DATE must be YYYYMMDD and REPLAY_START_TIME must be HH:MM:SS, got {REPLAY_DATE} {REPLAY_START_TIME}, {parse_exception}')
+
+def get_discord_client():
+    # Replay must not post to the live channels or write the live sent message records used for deduplication
+    if IB_REPLAY_MODE == 'REPLAY':
+        use_in_memory_message_record()
+        return ReplayDiscordChatBotClient()
+
+    return DiscordChatBotClient()
+
+def get_ib_connector() -> IBConnector:
+    # LIVE: Client Portal only, RECORD: Client Portal with every response saved, REPLAY: saved responses on a simulated clock
+    if IB_REPLAY_MODE == 'RECORD':
+        logger.log_debug_msg(f'Record Client Portal responses to {RECORDING_DIR}', with_std_out=True)
+        return IBConnector(response_recorder=IBResponseRecorder(RECORDING_DIR))
+    elif IB_REPLAY_MODE == 'REPLAY':
+        replay_start_datetime = get_replay_start_datetime()
+        set_simulated_clock(SimulatedClock(replay_start_datetime, speed=REPLAY_SPEED))
+        logger.log_debug_msg(f'Replay Client Portal responses from {replay_start_datetime} at {REPLAY_SPEED}x speed', with_std_out=True)
+        return ReplayIBConnector(get_recording_file_path(RECORDING_DIR, str(REPLAY_DATE)))
+    
+    return IBConnector()
+
+def get_market_data_stream(ib_connector: IBConnector) -> IBMarketDataStream:
+    # Recorded sessions have no tick stream, replay keeps polling the recorded history responses
+    if not IS_MARKET_DATA_STREAM_ENABLED or IB_REPLAY_MODE == 'REPLAY':
+        return None
+    
+    market_data_stream = IBMarketDataStream(session_provider=lambda: ib_connector.tickle().get('session'))
+    market_data_stream.start()
+    return market_data_stream
 
 def main():  
+    # Clients are created here instead of on import, chart rendering worker processes re-import this module on spawn
+    ib_connector = get_ib_connector()
+    discord_client = get_discord_client()
+    stock_screener = StockScreener(discord_client, ib_connector, get_market_data_stream(ib_connector))
+    #pl_report_generator = PLReportGenerator(discord_client)
+    
     discord_client.run_chatbot()
     stock_screener.scan()
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from model.candle.session_index import SessionIndex, get_session_index
+
+from constant.indicator.customised_indicator import CustomisedIndicator
+from constant.candle.candle_colour import CandleColour
+
+CANDLE_COLOUR_TO_CODE_DICT = {
+    CandleColour.GREEN.value: 1.0,
+    CandleColour.RED.value: -1.0,
+    CandleColour.GREY.value: 0.0
+}
+
+class CandlePanel:
+    def __init__(self, value_np: np.ndarray, datetime_index: pd.Index, ticker_list: list, field_list: list, column_index: pd.MultiIndex = None):
+        self.__value_np = np.ascontiguousarray(value_np, dtype=np.float64)
+        self.__datetime_index = datetime_index
+        self.__ticker_list = list(ticker_list)
+        self.__field_list = list(field_list)
+        self.__ticker_to_position_dict = {ticker: position for position, ticker in enumerate(self.__ticker_list)}
+        self.__field_to_position_dict = {field: position for position, field in enumerate(self.__field_list)}
+        self.__column_index = column_index
+
+    @property
+    def value_np(self):
+        return self.__value_np
+
+    @property
+    def datetime_index(self):
+        return self.__datetime_index
+
+    @property
+    def ticker_list(self):
+        return self.__ticker_list
+
+    @property
+    def field_list(self):
+        return self.__field_list
+
+    @property
+    def session_index(self) -> SessionIndex:
+        return get_session_index(self.__datetime_index)
+
+    def __len__(self):
+        return len(self.__datetime_index)
+
+    def has_ticker(self, ticker: str) -> bool:
+        return ticker in self.__ticker_to_position_dict
+
+    def get_ticker_position(self, ticker: str) -> int:
+        return self.__ticker_to_position_dict[ticker]
+
+    def get_ticker_position_np(self, ticker_list: list) -> np.ndarray:
+        return np.array([self.__ticker_to_position_dict.get(ticker, -1) for ticker in ticker_list], dtype=np.int64)
+
+    def get_field_position(self, field) -> int:
+        return self.__field_to_position_dict[getattr(field, 'value', field)]
+
+    def get_row_position(self, dt) -> int:
+        return self.__datetime_index.get_loc(dt)
+
+    # Views below share memory with the panel
+    def get_field(self, field) -> np.ndarray:
+        return self.__value_np[:, :, self.get_field_position(field)]
+
+    def get_ticker(self, ticker: str) -> np.ndarray:
+        return self.__value_np[:, self.__ticker_to_position_dict[ticker], :]
+
+    def get_value(self, ticker: str, field) -> np.ndarray:
+        return self.__value_np[:, self.__ticker_to_position_dict[ticker], self.get_field_position(field)]
+
+    def get_aligned_field(self, field, ticker_list: list) -> np.ndarray:
+        field_np = self.get_field(field)
+        ticker_position_np = self.get_ticker_position_np(ticker_list)
+        aligned_field_np = field_np[:, ticker_position_np]
+        aligned_field_np[:, ticker_position_np == -1] = np.nan
+        return aligned_field_np
+
+    def get_field_df(self, field, column_name: str = None) -> pd.DataFrame:
+        field_value = getattr(field, 'value', field)
+        return pd.DataFrame(self.get_field(field),
+                            index=self.__datetime_index,
+                            columns=pd.MultiIndex.from_product([self.__ticker_list, [column_name if column_name else field_value]]))
+
+    def to_df(self) -> pd.DataFrame:
+        column_index = self.__column_index
+
+        if column_index is None:
+            column_index = pd.MultiIndex.from_product([self.__ticker_list, self.__field_list])
+
+        ticker_position_np = self.get_ticker_position_np(column_index.get_level_values(0))
+        field_position_np = np.array([self.__field_to_position_dict[field] for field in column_index.get_level_values(1)], dtype=np.int64)
+        candle_df = pd.DataFrame(self.__value_np[:, ticker_position_np, field_position_np], index=self.__datetime_index, columns=column_index)
+
+        colour_column_np = column_index.get_level_values(1) == CustomisedIndicator.CANDLE_COLOUR.value
+        if colour_column_np.any():
+            colour_code_np = candle_df.loc[:, colour_column_np].to_numpy()
+            colour_np = np.full(colour_code_np.shape, np.nan, dtype=object)
+
+            for colour, code in CANDLE_COLOUR_TO_CODE_DICT.items():
+                colour_np[colour_code_np == code] = colour
+
+            for position, column in enumerate(column_index[colour_column_np]):
+                candle_df[column] = colour_np[:, position]
+
+        return candle_df
+
+    @staticmethod
+    def from_df(candle_df: pd.DataFrame) -> 'CandlePanel':
+        column_index = candle_df.columns
+
+        # No candle is retrieved, e.g. the candle store has nothing for the scanner result yet
+        if candle_df.empty or not isinstance(column_index, pd.MultiIndex):
+            return CandlePanel(np.empty((len(candle_df), 0, 0)), candle_df.index, [], [])
+        ticker_list = column_index.get_level_values(0).unique().tolist()
+        field_list = column_index.get_level_values(1).unique().tolist()
+        ticker_position_np = pd.Index(ticker_list).get_indexer(column_index.get_level_values(0))
+        field_position_np = pd.Index(field_list).get_indexer(column_index.get_level_values(1))
+
+        value_np = np.full((len(candle_df), len(ticker_list), len(field_list)), np.nan)
+        colour_column_np = column_index.get_level_values(1) == CustomisedIndicator.CANDLE_COLOUR.value
+        numeric_column_np = ~colour_column_np
+
+        if numeric_column_np.any():
+            value_np[:, ticker_position_np[numeric_column_np], field_position_np[numeric_column_np]] = candle_df.loc[:, numeric_column_np].to_numpy(dtype=np.float64)
+
+        if colour_column_np.any():
+            colour_np = candle_df.loc[:, colour_column_np].to_numpy()
+            colour_code_np = np.full(colour_np.shape, np.nan)
+
+            for colour, code in CANDLE_COLOUR_TO_CODE_DICT.items():
+                colour_code_np[colour_np == colour] = code
+
+            value_np[:, ticker_position_np[colour_column_np], field_position_np[colour_column_np]] = colour_code_np
+
+        return CandlePanel(value_np, candle_df.index, ticker_list, field_list, column_index)
@@ -0,0 +1,31 @@
+from io import BytesIO
+import discord
+
+class CandlestickChart:
+    def __init__(self, filename: str, image_bytes: bytes = None, chart_dir: str = None):
+        self.__filename = filename
+        self.__image_bytes = image_bytes
+        self.__chart_dir = chart_dir
+
+    @property
+    def filename(self):
+        return self.__filename
+
+    @property
+    def image_bytes(self):
+        return self.__image_bytes
+
+    @property
+    def chart_dir(self):
+        return self.__chart_dir
+
+    @chart_dir.setter
+    def chart_dir(self, chart_dir):
+        self.__chart_dir = chart_dir
+
+    def to_discord_file(self) -> discord.File:
+        # discord.File consumes the stream on send, a new buffer is wrapped every time
+        if self.__image_bytes is not None:
+            return discord.File(BytesIO(self.__image_bytes), filename=self.__filename)
+
+        return discord.File(self.__chart_dir, filename=self.__filename)
@@ -0,0 +1,90 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+from constant.indicator.indicator import Indicator
+
+OHLCV_INDICATOR_LIST = [Indicator.OPEN.value, Indicator.HIGH.value, Indicator.LOW.value, Indicator.CLOSE.value, Indicator.VOLUME.value]
+
+class MinuteBarBuilder:
+    def __init__(self, ticker: str, max_no_of_bar: int = None):
+        self.__ticker = ticker
+        self.__max_no_of_bar = max_no_of_bar
+        self.__minute_to_ohlcv_dict = {}
+        self.__last_price = None
+        self.__last_cumulative_volume = None
+        self.__stream_start_datetime = None
+        self.__no_of_tick = 0
+
+    @property
+    def ticker(self):
+        return self.__ticker
+
+    @property
+    def stream_start_datetime(self):
+        return self.__stream_start_datetime
+
+    @property
+    def no_of_tick(self):
+        return self.__no_of_tick
+
+    @property
+    def no_of_bar(self):
+        return len(self.__minute_to_ohlcv_dict)
+
+    def reset(self) -> None:
+        # Ticks missed while disconnected are unknown, bars before the next start have to come from history
+        self.__last_cumulative_volume = None
+        self.__stream_start_datetime = None
+
+    def update(self, tick_datetime: datetime.datetime, price: float = None, cumulative_volume: float = None) -> None:
+        bar_datetime = tick_datetime.replace(second=0, microsecond=0, tzinfo=None)
+        self.__no_of_tick += 1
+
+        if self.__stream_start_datetime is None:
+            # The first minute is only partly observed
+            self.__stream_start_datetime = bar_datetime + datetime.timedelta(minutes=1)
+
+        volume = 0
+        if cumulative_volume is not None:
+            # Day volume restarts from zero on a new session, the new value becomes the reference
+            if self.__last_cumulative_volume is not None and cumulative_volume >= self.__last_cumulative_volume:
+                volume = cumulative_volume - self.__last_cumulative_volume
+
+            self.__last_cumulative_volume = cumulative_volume
+
+        if price is None:
+            # Volume without a last price is booked at the previous last price
+            price = self.__last_price
+
+            if price is None:
+                return
+        else:
+            self.__last_price = price
+
+        ohlcv = self.__minute_to_ohlcv_dict.get(bar_datetime)
+
+        if ohlcv is None:
+            self.__minute_to_ohlcv_dict[bar_datetime] = [price, price, price, price, volume]
+
+            if self.__max_no_of_bar and len(self.__minute_to_ohlcv_dict) > self.__max_no_of_bar:
+                del self.__minute_to_ohlcv_dict[min(self.__minute_to_ohlcv_dict)]
+        else:
+            ohlcv[1] = max(ohlcv[1], price)
+            ohlcv[2] = min(ohlcv[2], price)
+            ohlcv[3] = price
+            ohlcv[4] += volume
+
+    def get_candle_df(self, datetime_range_index: pd.DatetimeIndex) -> pd.DataFrame:
+        candle_np = np.full((len(datetime_range_index), len(OHLCV_INDICATOR_LIST)), np.nan)
+
+        if self.__minute_to_ohlcv_dict:
+            bar_datetime_list = list(self.__minute_to_ohlcv_dict.keys())
+            row_position_np = datetime_range_index.get_indexer(bar_datetime_list)
+            in_range_np = row_position_np >= 0
+            ohlcv_np = np.array(list(self.__minute_to_ohlcv_dict.values()), dtype=np.float64)
+            candle_np[row_position_np[in_range_np]] = ohlcv_np[in_range_np]
+
+        return pd.DataFrame(candle_np,
+                            index=datetime_range_index,
+                            columns=pd.MultiIndex.from_product([[self.__ticker], OHLCV_INDICATOR_LIST]))
@@ -0,0 +1,87 @@
+import threading
+import numpy as np
+import pandas as pd
+
+SESSION_INDEX_CACHE_SIZE = 8
+
+session_index_cache_lock = threading.Lock()
+session_index_cache_list = []
+
+class SessionIndex:
+    def __init__(self, datetime_index: pd.Index):
+        self.__datetime_index = datetime_index
+        self.__datetime_list = datetime_index.tolist()
+
+    @property
+    def datetime_index(self):
+        return self.__datetime_index
+
+    def __len__(self):
+        return len(self.__datetime_list)
+
+    def get_datetime(self, position: int):
+        return self.__datetime_list[position]
+
+    def get_datetime_list(self, position_np: np.ndarray) -> list:
+        return [self.__datetime_list[position] if position >= 0 else None for position in position_np]
+
+    # Boolean masks are (row, ticker) arrays aligned to the index, positions are -1 for tickers without any occurrence
+    def get_first_true_position_np(self, boolean_np: np.ndarray) -> np.ndarray:
+        boolean_np = np.asarray(boolean_np, dtype=bool)
+
+        if len(boolean_np) == 0:
+            return np.full(boolean_np.shape[1], -1, dtype=np.int64)
+
+        return np.where(boolean_np.any(axis=0), boolean_np.argmax(axis=0), -1)
+
+    def get_nth_true_position_np(self, boolean_np: np.ndarray, n: int) -> np.ndarray:
+        boolean_np = np.asarray(boolean_np, dtype=bool)
+
+        if n == 1:
+            return self.get_first_true_position_np(boolean_np)
+
+        return self.get_first_true_position_np(boolean_np & (np.cumsum(boolean_np, axis=0) == n))
+
+    def get_first_true_datetime_list(self, boolean_np: np.ndarray) -> list:
+        return self.get_datetime_list(self.get_first_true_position_np(boolean_np))
+
+    def get_true_position_np_list(self, boolean_np: np.ndarray, occurrence_limit: int = None) -> list:
+        boolean_np = np.asarray(boolean_np, dtype=bool)
+
+        # Transposed, np.nonzero gives the row positions grouped by ticker in ascending order
+        ticker_position_np, row_position_np = np.nonzero(boolean_np.T)
+        split_position_np = np.searchsorted(ticker_position_np, np.arange(1, boolean_np.shape[1]))
+        true_position_np_list = np.split(row_position_np, split_position_np)
+
+        if occurrence_limit:
+            true_position_np_list = [true_position_np[:occurrence_limit] for true_position_np in true_position_np_list]
+
+        return true_position_np_list
+
+    def get_ticker_to_occurrence_datetime_list(self, boolean_np: np.ndarray, ticker_list: list, occurrence_limit: int = None) -> dict:
+        # Same as the sorted index frame it replaces, a ticker with any occurrence has its list padded with None up to the limit or the no. of rows
+        no_of_slot = min(occurrence_limit, len(self)) if occurrence_limit else len(self)
+        ticker_to_occurrence_datetime_list_dict = {}
+
+        for ticker, true_position_np in zip(ticker_list, self.get_true_position_np_list(boolean_np, occurrence_limit)):
+            if len(true_position_np) == 0:
+                ticker_to_occurrence_datetime_list_dict[ticker] = []
+                continue
+
+            occurrence_datetime_list = [self.__datetime_list[position] for position in true_position_np]
+            ticker_to_occurrence_datetime_list_dict[ticker] = occurrence_datetime_list + [None] * (no_of_slot - len(occurrence_datetime_list))
+
+        return ticker_to_occurrence_datetime_list_dict
+
+def get_session_index(datetime_index: pd.Index) -> SessionIndex:
+    # Candle refresh creates a new index, analysers on the same candle frame share one session index
+    with session_index_cache_lock:
+        for cached_datetime_index, session_index in session_index_cache_list:
+            if cached_datetime_index is datetime_index:
+                return session_index
+
+        session_index = SessionIndex(datetime_index)
+        session_index_cache_list.insert(0, (datetime_index, session_index))
+        del session_index_cache_list[SESSION_INDEX_CACHE_SIZE:]
+
+        return session_index
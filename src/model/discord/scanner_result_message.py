@@ -1,7 +1,7 @@
 import datetime
-import os
 import discord
 
+from model.candle.candlestick_chart import CandlestickChart
 from model.ib.contract_info import ContractInfo
 from model.financial_data import FinancialData
 from model.offering_news import OfferingNews
@@ -19,7 +19,7 @@ class ScannerResultMessage(DiscordMessage):
                        contract_info: ContractInfo = None,
                        financial_data: FinancialData = None,
                        offering_news: OfferingNews = None,
-                       chart_dir: str = None, 
+                       chart: CandlestickChart = None, 
                        ticker: str = None,
                        hit_scanner_datetime: datetime = None, 
                        pattern: Pattern = None, 
@@ -41,9 +41,9 @@ class ScannerResultMessage(DiscordMessage):
         
         candle_chart_list = []
         
-        if chart_dir:
-            embed.set_image(url=f"attachment://{os.path.basename(chart_dir)}")
-            candle_chart_list.append(discord.File(chart_dir, filename=os.path.basename(chart_dir)))
+        if chart:
+            embed.set_image(url=f"attachment://{chart.filename}")
+            candle_chart_list.append(chart.to_discord_file())
         
         if contract_info:
             contract_info.add_contract_info_to_embed_msg(embed)
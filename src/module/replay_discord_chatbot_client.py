@@ -0,0 +1,44 @@
+import types
+
+from model.discord.discord_message import DiscordMessage
+
+from utils.logger import Logger
+
+from constant.discord.discord_channel import DiscordChannel
+
+logger = Logger()
+
+# Stands in for DiscordChatBotClient during replay, alerts of a recorded day must never reach the live channels
+class ReplayDiscordChatBotClient:
+    def __init__(self):
+        self.__no_of_message = 0
+
+    @property
+    def no_of_message(self):
+        return self.__no_of_message
+
+    def run_chatbot(self) -> None:
+        logger.log_debug_msg('Replay Discord client is ready, messages are only logged', with_std_out=True)
+
+    def send_message(self, message: DiscordMessage, channel_type: DiscordChannel, with_text_to_speech: bool = False):
+        self.__log_message(message, channel_type)
+
+    def send_message_by_list(self, message_list: list, channel_type: DiscordChannel, with_text_to_speech: bool = False, delay: float = None):
+        for message in message_list:
+            self.__log_message(message, channel_type)
+
+    def send_message_by_list_with_response(self, message_list: list, channel_type: DiscordChannel, with_text_to_speech: bool = False):
+        response_list = []
+
+        # Same shape as a sent discord.Message, the analysers read the embed title and jump url back
+        for message in message_list:
+            self.__log_message(message, channel_type)
+            response_list.append(types.SimpleNamespace(embeds=[getattr(message, 'embed', None)], jump_url=''))
+
+        return response_list
+
+    def __log_message(self, message: DiscordMessage, channel_type: DiscordChannel) -> None:
+        self.__no_of_message += 1
+        embed = getattr(message, 'embed', None)
+        content = embed.title if embed is not None else getattr(message, 'content', None)
+        logger.log_debug_msg(f'Replay message to {channel_type.value}: {content}')
@@ -0,0 +1,76 @@
+from utils.datetime_util import get_clock_speed, get_current_us_datetime, get_market_phase, get_next_market_phase_start_datetime
+
+def get_jaccard_similarity(previous_ticker_set: set, current_ticker_set: set) -> float:
+    union_ticker_set = previous_ticker_set | current_ticker_set
+
+    if not union_ticker_set:
+        return 1
+
+    return len(previous_ticker_set & current_ticker_set) / len(union_ticker_set)
+
+class ScanCadence:
+    def __init__(self, phase_to_min_interval_dict: dict,
+                       max_interval_in_second: float = None,
+                       once_per_phase: bool = False,
+                       stable_similarity: float = None,
+                       backoff_factor: float = 2,
+                       backoff_step_in_second: float = 1):
+        # Interval is measured from the start of one cycle to the start of the next one, a phase missing from the dict is not scanned
+        self.__phase_to_min_interval_dict = phase_to_min_interval_dict
+        self.__max_interval_in_second = max_interval_in_second
+        self.__once_per_phase = once_per_phase
+        # Scanner result at least this similar to the previous one is stable, the interval backs off until the result churns again
+        self.__stable_similarity = stable_similarity
+        self.__backoff_factor = backoff_factor
+        self.__backoff_step_in_second = backoff_step_in_second
+
+        self.__interval_in_second = None
+        self.__previous_ticker_set = None
+        self.__similarity = None
+        self.__last_scan_phase = None
+
+    @property
+    def interval_in_second(self):
+        return self.__interval_in_second
+
+    @property
+    def similarity(self):
+        return self.__similarity
+
+    def get_idle_time(self) -> float:
+        # Time to wait before the next cycle is due, the phase is checked again after waking up
+        current_datetime = get_current_us_datetime()
+        market_phase = get_market_phase(current_datetime)
+
+        if market_phase not in self.__phase_to_min_interval_dict or (self.__once_per_phase and self.__last_scan_phase == (current_datetime.date(), market_phase)):
+            next_phase_start_datetime = get_next_market_phase_start_datetime(current_datetime)
+            return max((next_phase_start_datetime - current_datetime).total_seconds(), 0) / get_clock_speed()
+
+        return 0
+
+    def get_wait_time(self, scan_result, cycle_time: float) -> float:
+        current_datetime = get_current_us_datetime()
+        market_phase = get_market_phase(current_datetime)
+        self.__last_scan_phase = (current_datetime.date(), market_phase)
+
+        if self.__once_per_phase or market_phase not in self.__phase_to_min_interval_dict:
+            return 0
+
+        min_interval = self.__phase_to_min_interval_dict[market_phase]
+
+        if self.__stable_similarity is None or scan_result is None:
+            self.__interval_in_second = min_interval
+        else:
+            current_ticker_set = set(scan_result)
+            self.__similarity = get_jaccard_similarity(self.__previous_ticker_set, current_ticker_set) if self.__previous_ticker_set is not None else 0
+            self.__previous_ticker_set = current_ticker_set
+
+            if self.__similarity < self.__stable_similarity or self.__interval_in_second is None:
+                self.__interval_in_second = min_interval
+            else:
+                self.__interval_in_second = max(self.__interval_in_second * self.__backoff_factor, min_interval + self.__backoff_step_in_second)
+
+            if self.__max_interval_in_second is not None:
+                self.__interval_in_second = max(min(self.__interval_in_second, self.__max_interval_in_second), min_interval)
+
+        return max(self.__interval_in_second - cycle_time, 0) / get_clock_speed()
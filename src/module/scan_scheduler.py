@@ -0,0 +1,100 @@
+import queue
+import threading
+
+from module.scan_cadence import ScanCadence
+from module.scanner_thread_wrapper import ScannerThreadWrapper
+
+from scanner import Scanner
+
+from utils.config_util import get_config
+from utils.logger import Logger
+
+from constant.scanner.market_phase import MarketPhase
+
+logger = Logger()
+
+ADAPTIVE_CADENCE_ENABLED = get_config('SCAN_SCHEDULE', 'ADAPTIVE_CADENCE_ENABLED')
+MULTI_DAYS_TOP_GAINER_SCAN_INTERVAL_IN_SECOND = get_config('SCAN_SCHEDULE', 'MULTI_DAYS_TOP_GAINER_SCAN_INTERVAL_IN_SECOND')
+INTRA_DAY_PRE_MARKET_MIN_INTERVAL_IN_SECOND = get_config('SCAN_SCHEDULE', 'INTRA_DAY_PRE_MARKET_MIN_INTERVAL_IN_SECOND')
+INTRA_DAY_REGULAR_HOURS_MIN_INTERVAL_IN_SECOND = get_config('SCAN_SCHEDULE', 'INTRA_DAY_REGULAR_HOURS_MIN_INTERVAL_IN_SECOND')
+INTRA_DAY_AFTER_HOURS_MIN_INTERVAL_IN_SECOND = get_config('SCAN_SCHEDULE', 'INTRA_DAY_AFTER_HOURS_MIN_INTERVAL_IN_SECOND')
+INTRA_DAY_MAX_INTERVAL_IN_SECOND = get_config('SCAN_SCHEDULE', 'INTRA_DAY_MAX_INTERVAL_IN_SECOND')
+INTRA_DAY_STABLE_SCANNER_RESULT_SIMILARITY = get_config('SCAN_SCHEDULE', 'INTRA_DAY_STABLE_SCANNER_RESULT_SIMILARITY')
+BACKOFF_FACTOR = get_config('SCAN_SCHEDULE', 'BACKOFF_FACTOR')
+BACKOFF_STEP_IN_SECOND = get_config('SCAN_SCHEDULE', 'BACKOFF_STEP_IN_SECOND')
+
+TRADING_PHASE_LIST = [MarketPhase.PRE_MARKET, MarketPhase.REGULAR_HOURS, MarketPhase.AFTER_HOURS]
+
+def get_intra_day_scan_cadence() -> ScanCadence:
+    return ScanCadence(phase_to_min_interval_dict={MarketPhase.PRE_MARKET: INTRA_DAY_PRE_MARKET_MIN_INTERVAL_IN_SECOND,
+                                                   MarketPhase.REGULAR_HOURS: INTRA_DAY_REGULAR_HOURS_MIN_INTERVAL_IN_SECOND,
+                                                   MarketPhase.AFTER_HOURS: INTRA_DAY_AFTER_HOURS_MIN_INTERVAL_IN_SECOND},
+                       max_interval_in_second=INTRA_DAY_MAX_INTERVAL_IN_SECOND,
+                       stable_similarity=INTRA_DAY_STABLE_SCANNER_RESULT_SIMILARITY,
+                       backoff_factor=BACKOFF_FACTOR,
+                       backoff_step_in_second=BACKOFF_STEP_IN_SECOND)
+
+def get_scan_family_to_cadence_dict() -> dict:
+    if not ADAPTIVE_CADENCE_ENABLED:
+        return {}
+
+    # Yesterday top gainers only change when the trading day closes, intra day scanner results decide their own pace
+    return {
+        'yesterday_top_gainer_scan': ScanCadence(phase_to_min_interval_dict={phase: 0 for phase in TRADING_PHASE_LIST}, once_per_phase=True),
+        'intra_day_top_gainer_scan': get_intra_day_scan_cadence(),
+        'multi_days_top_gainer_scan': ScanCadence(phase_to_min_interval_dict={phase: MULTI_DAYS_TOP_GAINER_SCAN_INTERVAL_IN_SECOND for phase in TRADING_PHASE_LIST}),
+        'intra_day_top_loser_scan': get_intra_day_scan_cadence()
+    }
+
+class ScanScheduler:
+    def __init__(self, scanner: Scanner):
+        self.__resume_event = threading.Event()
+        self.__exception_queue = queue.Queue()
+
+        scan_family_list = [
+            ('yesterday_top_gainer_scan', scanner.scan_yesterday_top_gainer),
+            ('intra_day_top_gainer_scan', scanner.scan_intra_day_top_gainer),
+            ('multi_days_top_gainer_scan', scanner.scan_multi_days_top_gainer),
+            ('intra_day_top_loser_scan', scanner.scan_intra_day_top_loser)
+        ]
+
+        scan_family_to_cadence_dict = get_scan_family_to_cadence_dict()
+        self.__scanner_thread_list = [ScannerThreadWrapper(scan=scan,
+                                                           name=name,
+                                                           resume_event=self.__resume_event,
+                                                           exception_queue=self.__exception_queue,
+                                                           cadence=scan_family_to_cadence_dict.get(name)) for name, scan in scan_family_list]
+
+    def start(self) -> None:
+        self.__resume_event.set()
+
+        for scanner_thread in self.__scanner_thread_list:
+            scanner_thread.start()
+
+    def wait_for_failed_scan(self) -> ScannerThreadWrapper:
+        return self.__exception_queue.get()
+
+    def resume(self) -> None:
+        # Errors raised by other scan families during the same outage are already handled by the first one
+        while not self.__exception_queue.empty():
+            failed_scanner_thread = self.__exception_queue.get_nowait()
+            logger.log_error_msg(f'Discard {failed_scanner_thread.name} error raised while scanning is paused, {failed_scanner_thread.exc}')
+
+        for scanner_thread in self.__scanner_thread_list:
+            scanner_thread.exc = None
+
+        self.__resume_event.set()
+        self.wake()
+
+    def wake(self) -> None:
+        # Scan families idling until the next market phase or cycle re-check their cadence immediately
+        for scanner_thread in self.__scanner_thread_list:
+            scanner_thread.wake()
+
+    def get_cycle_time_dict(self) -> dict:
+        return {scanner_thread.name: dict(last=scanner_thread.last_cycle_time,
+                                          average=scanner_thread.average_cycle_time,
+                                          max=scanner_thread.max_cycle_time,
+                                          no_of_cycle=scanner_thread.no_of_cycle,
+                                          no_of_failed_cycle=scanner_thread.no_of_failed_cycle,
+                                          interval=scanner_thread.cadence.interval_in_second if scanner_thread.cadence else None) for scanner_thread in self.__scanner_thread_list}
@@ -1,51 +1,108 @@
+import queue
 import threading
 import time
 from typing import Callable
-from aiohttp import ClientError
-import oracledb
-from requests import HTTPError, RequestException
 
-from datasource.ib_connector import IBConnector
-
-from module.discord_chatbot_client import DiscordChatBotClient
+from module.scan_cadence import ScanCadence
 
+from utils.profiler import profile_scan_cycle
 from utils.logger import Logger
 
 logger = Logger()
-#reauthentication_lock = threading.Lock()
 
-#class ScannerThreadWrapper(threading.Thread):
-class ScannerThreadWrapper():
-    def __init__(self, scan: Callable, 
+class ScannerThreadWrapper(threading.Thread):
+    def __init__(self, scan: Callable,
                  name: str,
-                 ib_connector: IBConnector,
-                 discord_client: DiscordChatBotClient):
+                 resume_event: threading.Event,
+                 exception_queue: queue.Queue,
+                 cadence: ScanCadence = None):
         self.exc = None
-        
+
         self.__scan = scan
-        self.__ib_connector = ib_connector
-        self.__discord_client = discord_client
-        #super().__init__(name=name)
-        self.__name = name
-            
-    #def run(self) -> None:  
-    def start(self) -> None:  
-        try:
-            self.__scan(self.__ib_connector, self.__discord_client)
-            #logger.log_debug_msg(f'{self.__name} scan finished, sleep 10 seconds')
-            #time.sleep(5)
-        except (RequestException, ClientError, HTTPError) as connection_exception:
-            self.exc = connection_exception
-            raise connection_exception
-        except oracledb.Error as oracle_connection_exception:
-            self.exc = oracle_connection_exception
-            raise oracle_connection_exception
-        except Exception as exception:
-            self.exc = exception
-            raise exception
-            
-    # def join(self):
-    #     threading.Thread.join(self)
-        
-    #     if self.exc:
-    #         raise self.exc
\ No newline at end of file
+        self.__cadence = cadence
+        self.__resume_event = resume_event
+        self.__exception_queue = exception_queue
+        # Set to cut an idle or cadence wait short, e.g. when scanning resumes or the screener shuts down
+        self.__wake_event = threading.Event()
+
+        self.__no_of_cycle = 0
+        self.__no_of_failed_cycle = 0
+        self.__last_cycle_time = None
+        self.__max_cycle_time = 0
+        self.__total_cycle_time = 0
+        super().__init__(name=name, daemon=True)
+
+    @property
+    def last_cycle_time(self):
+        return self.__last_cycle_time
+
+    @property
+    def max_cycle_time(self):
+        return self.__max_cycle_time
+
+    @property
+    def average_cycle_time(self):
+        return self.__total_cycle_time / self.__no_of_cycle if self.__no_of_cycle else None
+
+    @property
+    def no_of_cycle(self):
+        return self.__no_of_cycle
+
+    @property
+    def no_of_failed_cycle(self):
+        return self.__no_of_failed_cycle
+
+    @property
+    def cadence(self):
+        return self.__cadence
+
+    def __record_cycle(self, cycle_time: float, is_failed: bool) -> None:
+        self.__no_of_cycle += 1
+        self.__no_of_failed_cycle += is_failed
+        self.__last_cycle_time = cycle_time
+        self.__max_cycle_time = max(self.__max_cycle_time, cycle_time)
+        self.__total_cycle_time += cycle_time
+        logger.log_debug_msg(f'{self.name} {"failed " if is_failed else ""}cycle time: {cycle_time} seconds, average: {self.average_cycle_time} seconds, max: {self.__max_cycle_time} seconds, no. of cycle: {self.__no_of_cycle}, no. of failed cycle: {self.__no_of_failed_cycle}')
+
+    def wake(self) -> None:
+        self.__wake_event.set()
+
+    def __wait(self, wait_time: float) -> None:
+        if self.__wake_event.wait(wait_time):
+            self.__wake_event.clear()
+
+    def run(self) -> None:
+        while True:
+            self.__resume_event.wait()
+
+            if self.__cadence:
+                idle_time = self.__cadence.get_idle_time()
+
+                if idle_time > 0:
+                    logger.log_debug_msg(f'{self.name} is idle for {idle_time} seconds until the next market phase')
+                    self.__wait(idle_time)
+                    continue
+
+            cycle_start_time = time.time()
+
+            try:
+                with profile_scan_cycle(self.name):
+                    scan_result = self.__scan()
+            except Exception as exception:
+                self.__record_cycle(time.time() - cycle_start_time, True)
+                self.exc = exception
+                # Pause every scan family until the screener handles the error, e.g. re-authentication
+                self.__resume_event.clear()
+                self.__exception_queue.put(self)
+                logger.log_error_msg(f'{self.name} scan cycle failed, {exception}')
+                continue
+
+            cycle_time = time.time() - cycle_start_time
+            self.__record_cycle(cycle_time, False)
+
+            if self.__cadence:
+                wait_time = self.__cadence.get_wait_time(scan_result, cycle_time)
+                logger.log_debug_msg(f'{self.name} next cycle after {wait_time} seconds, interval: {self.__cadence.interval_in_second} seconds, scanner result similarity: {self.__cadence.similarity}')
+
+                if wait_time > 0:
+                    self.__wait(wait_time)
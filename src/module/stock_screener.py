@@ -3,12 +3,15 @@ import threading
 import time
 import traceback
 import oracledb
+import sqlite3
 from aiohttp import ClientError
 from requests import HTTPError, RequestException
 
 from datasource.ib_connector import IBConnector
+from datasource.ib_market_data_stream import IBMarketDataStream
 
 from module.discord_chatbot_client import DiscordChatBotClient
+from module.scan_scheduler import ScanScheduler
 
 from scanner import Scanner
 
@@ -29,8 +32,10 @@ SCANNER_IDLE_REFRESH_INTERVAL = get_config('SYS_PARAM', 'SCANNER_IDLE_REFRESH_IN
 SCANNER_REAUTHENTICATION_RETRY_INTERVAL = get_config('SYS_PARAM', 'SCANNER_REAUTHENTICATION_RETRY_INTERVAL')
 
 class StockScreener(threading.Thread):
-    def __init__(self, discord_client: DiscordChatBotClient):
+    def __init__(self, discord_client: DiscordChatBotClient, ib_connector: IBConnector = None, market_data_stream: IBMarketDataStream = None):
         self.__discord_client = discord_client
+        self.__ib_connector = ib_connector
+        self.__market_data_stream = market_data_stream
         self.__reauthentication_retry_times = 0
         super().__init__()
 
@@ -64,7 +69,7 @@ class StockScreener(threading.Thread):
             break 
 
     def scan(self):
-        self.__scanner = Scanner(self.__discord_client)
+        self.__scanner = Scanner(self.__discord_client, self.__ib_connector, self.__market_data_stream)
         start_scan = False
         
         while True: 
@@ -86,17 +91,21 @@ class StockScreener(threading.Thread):
             logger.log_error_msg(f'Client portal API preflight request error, {connection_exception}', with_std_out=True)
             self.__reauthenticate(self.__scanner.ib_connector)
         
+        self.__scan_scheduler = ScanScheduler(self.__scanner)
+        self.__scan_scheduler.start()
+        
         while True:     
+            failed_scanner_thread = self.__scan_scheduler.wait_for_failed_scan()
+            logger.log_debug_msg(f'Scan cycle time: {self.__scan_scheduler.get_cycle_time_dict()}')
+            
             try:
-                self.__scanner.scan_yesterday_top_gainer()
-                self.__scanner.scan_intra_day_top_gainer()
-                self.__scanner.scan_multi_days_top_gainer()
-                self.__scanner.scan_intra_day_top_loser()
+                logger.log_error_msg(f'{failed_scanner_thread.name} error', with_std_out=True)
+                raise failed_scanner_thread.exc
             except (RequestException, ClientError, HTTPError) as connection_exception:
                 logger.log_error_msg(f'Client portal API connection error, {connection_exception}', with_std_out=True)
                 self.__reauthenticate(self.__scanner.ib_connector)
-            except oracledb.Error as oracle_connection_exception:
-                logger.log_error_msg(f'Oracle connection error, {oracle_connection_exception}', with_std_out=True)
+            except (oracledb.Error, sqlite3.Error) as database_exception:
+                logger.log_error_msg(f'Database error, {database_exception}', with_std_out=True)
                 self.__discord_client.send_message(DiscordMessage(content='Database connection error'), channel_type=DiscordChannel.CHATBOT_ERROR_LOG, with_text_to_speech=True)
             except Exception as exception:
                 self.__discord_client.send_message(DiscordMessage(content='Fatal error'), channel_type=DiscordChannel.TEXT_TO_SPEECH, with_text_to_speech=True)   
@@ -134,6 +143,8 @@ class StockScreener(threading.Thread):
                 logger.log_error_msg(f'{traceback.format_exc()}')
                 logger.log_debug_msg(f'Retry scanning due to fatal error after: {SCANNER_FATAL_ERROR_REFRESH_INTERVAL} seconds', with_std_out=True)
                 time.sleep(SCANNER_FATAL_ERROR_REFRESH_INTERVAL)
+            
+            self.__scan_scheduler.resume()
                 
  
     
\ No newline at end of file
@@ -4,8 +4,9 @@ import pandas as pd
 from pandas.core.frame import DataFrame
 
 from pattern.pattern_analyser import PatternAnalyser
+from pattern.pattern_engine import PatternEngine
 
-from model.discord.scanner_result_message import ScannerResultMessage
+from model.candle.candle_panel import CANDLE_COLOUR_TO_CODE_DICT
 
 from constant.indicator.indicator import Indicator
 from constant.indicator.customised_indicator import CustomisedIndicator
@@ -16,8 +17,8 @@ from constant.candle.candle_colour import CandleColour
 from constant.candle.bar_size import BarSize
 from constant.discord.discord_channel import DiscordChannel
 
-from utils.chart_util import get_candlestick_chart
-from utils.dataframe_util import concat_daily_df_and_minute_df, derive_idx_df, get_ticker_to_occurrence_idx_list
+from utils.chart_util import submit_candlestick_chart
+from utils.dataframe_util import concat_daily_df_and_minute_df
 from utils.datetime_util import convert_into_human_readable_time, convert_into_read_out_time, get_current_us_datetime
 from utils.logger import Logger
 from utils.config_util import get_config
@@ -35,7 +36,7 @@ DAILY_AND_MINUTE_CANDLE_GAP = get_config('INITIAL_DIP_PARAM', 'DAILY_AND_MINUTE_
 
 
 class InitialDip(PatternAnalyser):
-    def __init__(self, bar_size: BarSize, historical_data_df: DataFrame, daily_df: DataFrame, ticker_to_contract_info_dict: dict, discord_client):
+    def __init__(self, bar_size: BarSize, historical_data_df: DataFrame, daily_df: DataFrame, ticker_to_contract_info_dict: dict, discord_client, pattern_engine: PatternEngine = None):
         ticker_list = list(historical_data_df.columns.get_level_values(0).unique())
         super().__init__(discord_client)
         self.__bar_size = bar_size
@@ -49,51 +50,45 @@ class InitialDip(PatternAnalyser):
         
         self.__daily_df = daily_df.loc[:, idx[select_daily_df_ticker_list, :]]
         self.__ticker_to_contract_info_dict = ticker_to_contract_info_dict
+        self.__pattern_engine = pattern_engine if pattern_engine else PatternEngine(historical_data_df, daily_df)
 
     def analyse(self) -> None:
-        message_list = []
+        message_param_list = []
         logger.log_debug_msg('Initial dip scan')
         start_time = time.time()
         
-        yesterday_daily_candle_df = self.__daily_df.iloc[[-1]]
-        candle_colour_df = self.__historical_data_df.loc[:, idx[:, CustomisedIndicator.CANDLE_COLOUR.value]]
-        close_df = self.__historical_data_df.loc[:, idx[:, Indicator.CLOSE.value]]
+        pattern_engine = self.__pattern_engine
+        candle_panel = pattern_engine.candle_panel
+        ticker_list = pattern_engine.ticker_list
         
-        yesterday_close_df = yesterday_daily_candle_df.loc[:, idx[:, Indicator.CLOSE.value]]
-        yesterday_close_to_last_pct_df = (close_df.sub(yesterday_close_df.values)
-                                                  .div(yesterday_close_df.values)
-                                                  .mul(100)
-                                                  .rename(columns={Indicator.CLOSE.value: CustomisedIndicator.CLOSE_CHANGE.value}))
-
-        yesterday_lower_body_df = yesterday_daily_candle_df.loc[:, idx[:, CustomisedIndicator.CANDLE_LOWER_BODY.value]]
-        upper_body_df = self.__historical_data_df.loc[:, idx[:, CustomisedIndicator.CANDLE_UPPER_BODY.value]]
-        gap_down_pct_df = (upper_body_df.sub(yesterday_lower_body_df.values)
-                                        .div(yesterday_lower_body_df.values)
-                                        .mul(100)
-                                        .rename(columns={CustomisedIndicator.CANDLE_UPPER_BODY.value: CustomisedIndicator.GAP_PCT_CHANGE.value}))
+        yesterday_close_np = pattern_engine.get_yesterday_field_np(Indicator.CLOSE)
+        yesterday_close_to_last_pct_np = pattern_engine.yesterday_close_to_last_pct_np
+        gap_down_pct_np = pattern_engine.gap_down_pct_np
         
-        self.__historical_data_df.loc[[self.__historical_data_df.index[0]], idx[:, CustomisedIndicator.CLOSE_CHANGE.value]] = yesterday_close_to_last_pct_df.iloc[[0]]
-        self.__historical_data_df.loc[[self.__historical_data_df.index[0]], idx[:, CustomisedIndicator.GAP_PCT_CHANGE.value]] = gap_down_pct_df.iloc[[0]]
+        close_change_column_position_list = self.__historical_data_df.columns.get_indexer([(ticker, CustomisedIndicator.CLOSE_CHANGE.value) for ticker in ticker_list])
+        gap_pct_column_position_list = self.__historical_data_df.columns.get_indexer([(ticker, CustomisedIndicator.GAP_PCT_CHANGE.value) for ticker in ticker_list])
+        self.__historical_data_df.iloc[0, close_change_column_position_list] = yesterday_close_to_last_pct_np[0]
+        self.__historical_data_df.iloc[0, gap_pct_column_position_list] = gap_down_pct_np[0]
         
-        max_gap_down_pct_df = (gap_down_pct_df <= MAX_GAP_DOWN_PCT).rename(columns={CustomisedIndicator.GAP_PCT_CHANGE.value: RuntimeIndicator.COMPARE.value})
-        max_yesterday_close_to_last_pct_boolean_df = (yesterday_close_to_last_pct_df <= MAX_YESTERDAY_CLOSE_TO_LAST_PCT).rename(columns={CustomisedIndicator.CLOSE_CHANGE.value: RuntimeIndicator.COMPARE.value})
-        red_candle_candle_df = (candle_colour_df == CandleColour.RED.value).rename(columns={CustomisedIndicator.CANDLE_COLOUR.value: RuntimeIndicator.COMPARE.value})
+        dip_boolean_np = ((gap_down_pct_np <= MAX_GAP_DOWN_PCT) 
+                            & (yesterday_close_to_last_pct_np <= MAX_YESTERDAY_CLOSE_TO_LAST_PCT) 
+                            & (pattern_engine.get_field(CustomisedIndicator.CANDLE_COLOUR) == CANDLE_COLOUR_TO_CODE_DICT[CandleColour.RED.value]))
+        dip_boolean_df = pd.DataFrame(dip_boolean_np, 
+                                      index=self.__historical_data_df.index, 
+                                      columns=pd.MultiIndex.from_product([ticker_list, [RuntimeIndicator.COMPARE.value]]))
+
+        session_index = pattern_engine.session_index
+        first_dip_position_np = session_index.get_first_true_position_np(dip_boolean_np)
+        loser_ticker_list = [ticker for ticker, is_dip in zip(ticker_list, dip_boolean_np.any(axis=0)) if is_dip]
         
-        dip_boolean_df = (max_gap_down_pct_df) & (max_yesterday_close_to_last_pct_boolean_df) & (red_candle_candle_df)
-
-        datetime_idx_df = derive_idx_df(dip_boolean_df, False)
-        first_dip_occurrence_df = datetime_idx_df.where(dip_boolean_df.values).bfill().iloc[[0]]
-
-        loser_result_series = dip_boolean_df.any()   
-        loser_ticker_list = loser_result_series.index[loser_result_series].get_level_values(0).tolist()
-        
-        ticker_to_occurrence_idx_list_dict = get_ticker_to_occurrence_idx_list(dip_boolean_df, MAX_DIP_OCCURRENCE)
+        ticker_to_occurrence_idx_list_dict = session_index.get_ticker_to_occurrence_datetime_list(dip_boolean_np, ticker_list, MAX_DIP_OCCURRENCE)
         logger.log_debug_msg(f'Initial dip ticker to occurrence idx list: {ticker_to_occurrence_idx_list_dict}')
         logger.log_debug_msg(f'Initial dip analysis time: {time.time() - start_time} seconds')
     
         if len(loser_ticker_list) > 0:
             for ticker in loser_ticker_list:
-                first_dip_datetime = first_dip_occurrence_df.loc[first_dip_occurrence_df.index[0], (ticker, RuntimeIndicator.INDEX.value)]
+                ticker_position = candle_panel.get_ticker_position(ticker)
+                first_dip_datetime = session_index.get_datetime(first_dip_position_np[ticker_position])
                 candle_chart_data_df, daily_date_to_fake_minute_datetime_x_axis_dict = concat_daily_df_and_minute_df(daily_df=self.__daily_df, 
                                                                                                                      minute_df=self.__historical_data_df, 
                                                                                                                      hit_scanner_datetime=first_dip_datetime, 
@@ -132,34 +127,36 @@ class InitialDip(PatternAnalyser):
                         close = self.__historical_data_df.loc[dip_time, (ticker, Indicator.CLOSE.value)]
                         volume = self.__historical_data_df.loc[dip_time, (ticker, Indicator.VOLUME.value)]
                         total_volume = self.__historical_data_df.loc[dip_time, (ticker, CustomisedIndicator.TOTAL_VOLUME.value)]
-                        yesterday_close = yesterday_close_df.loc[yesterday_close_df.index[-1], (ticker, Indicator.CLOSE.value)]
-                        yesterday_close_to_last_pct = yesterday_close_to_last_pct_df.loc[dip_time, (ticker, CustomisedIndicator.CLOSE_CHANGE.value)]
+                        yesterday_close = yesterday_close_np[ticker_position]
+                        yesterday_close_to_last_pct = yesterday_close_to_last_pct_np[candle_panel.get_row_position(dip_time), ticker_position]
 
                         one_minute_chart_start_time = time.time()
                         logger.log_debug_msg(f'Generate {ticker} initial dip one minute chart')
-                        chart_dir = get_candlestick_chart(candle_data_df=candle_chart_data_df,
-                                                          ticker=ticker, pattern=PATTERN_NAME, bar_size=self.__bar_size,
-                                                          daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
-                                                          hit_scanner_datetime=dip_time,
-                                                          positive_offset=0, negative_offset=candle_chart_negative_offset,
-                                                          scatter_symbol=ScatterSymbol.DIP, scatter_colour=ScatterColour.PURPLE)
-                        logger.log_debug_msg(f'Generate {ticker} initial dip one minute chart finished time: {time.time() - one_minute_chart_start_time} seconds')
+                        chart_future = submit_candlestick_chart(candle_data_df=candle_chart_data_df,
+                                                                ticker=ticker, pattern=PATTERN_NAME, bar_size=self.__bar_size,
+                                                                daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
+                                                                hit_scanner_datetime=dip_time,
+                                                                positive_offset=0, negative_offset=candle_chart_negative_offset,
+                                                                scatter_symbol=ScatterSymbol.DIP, scatter_colour=ScatterColour.PURPLE)
+                        logger.log_debug_msg(f'Generate {ticker} initial dip one minute chart submitted time: {time.time() - one_minute_chart_start_time} seconds')
                         
                         hit_scanner_datetime_display = convert_into_human_readable_time(dip_time)
                         read_out_dip_time = convert_into_read_out_time(dip_time)
                         
-                        message = ScannerResultMessage(title=f'{ticker} is dipping {round(yesterday_close_to_last_pct, 2)}% at {hit_scanner_datetime_display}',
-                                                       readout_msg=f'{" ".join(ticker)} is dipping {round(yesterday_close_to_last_pct, 2)}% at {read_out_dip_time}',
-                                                       close=close,
-                                                       yesterday_close=yesterday_close,
-                                                       volume=volume, total_volume=total_volume,
-                                                       contract_info=contract_info,
-                                                       chart_dir=chart_dir,
-                                                       ticker=ticker,
-                                                       hit_scanner_datetime=dip_time.replace(second=0, microsecond=0),
-                                                       pattern=PATTERN_NAME,
-                                                       bar_size=self.__bar_size.value)
-                        message_list.append(message)
+                        message_param = dict(title=f'{ticker} is dipping {round(yesterday_close_to_last_pct, 2)}% at {hit_scanner_datetime_display}',
+                                             readout_msg=f'{" ".join(ticker)} is dipping {round(yesterday_close_to_last_pct, 2)}% at {read_out_dip_time}',
+                                             close=close,
+                                             yesterday_close=yesterday_close,
+                                             volume=volume, total_volume=total_volume,
+                                             contract_info=contract_info,
+                                             chart_future=chart_future,
+                                             ticker=ticker,
+                                             hit_scanner_datetime=dip_time.replace(second=0, microsecond=0),
+                                             pattern=PATTERN_NAME,
+                                             bar_size=self.__bar_size.value)
+                        message_param_list.append(message_param)
+
+        message_list = self.get_scanner_result_message_list(message_param_list)
 
         if message_list:
             send_msg_start_time = time.time()
@@ -4,20 +4,18 @@ import pandas as pd
 from pandas.core.frame import DataFrame
 
 from pattern.pattern_analyser import PatternAnalyser
-
-from model.discord.scanner_result_message import ScannerResultMessage
+from pattern.pattern_engine import PatternEngine
 
 from constant.indicator.indicator import Indicator
 from constant.indicator.customised_indicator import CustomisedIndicator
 from constant.indicator.runtime_indicator import RuntimeIndicator
 from constant.indicator.scatter_symbol import ScatterSymbol
 from constant.indicator.scatter_colour import ScatterColour
-from constant.candle.candle_colour import CandleColour
 from constant.candle.bar_size import BarSize
 from constant.discord.discord_channel import DiscordChannel
 
-from utils.chart_util import get_candlestick_chart
-from utils.dataframe_util import concat_daily_df_and_minute_df, derive_idx_df, get_ticker_to_occurrence_idx_list
+from utils.chart_util import submit_candlestick_chart
+from utils.dataframe_util import concat_daily_df_and_minute_df
 from utils.datetime_util import convert_into_human_readable_time, convert_into_read_out_time, get_current_us_datetime
 from utils.logger import Logger
 from utils.config_util import get_config
@@ -34,7 +32,7 @@ MIN_YESTERDAY_CLOSE_TO_LAST_PCT = get_config('INITIAL_POP_PARAM', 'MIN_YESTERDAY
 DAILY_AND_MINUTE_CANDLE_GAP = get_config('INITIAL_POP_PARAM', 'DAILY_AND_MINUTE_CANDLE_GAP')
 
 class InitialPop(PatternAnalyser):    
-    def __init__(self, bar_size: BarSize, historical_data_df: DataFrame, daily_df: DataFrame, ticker_to_contract_info_dict: dict, discord_client):
+    def __init__(self, bar_size: BarSize, historical_data_df: DataFrame, daily_df: DataFrame, ticker_to_contract_info_dict: dict, discord_client, pattern_engine: PatternEngine = None):
         ticker_list = list(historical_data_df.columns.get_level_values(0).unique())
         super().__init__(discord_client)
         self.__bar_size = bar_size
@@ -48,51 +46,45 @@ class InitialPop(PatternAnalyser):
         
         self.__daily_df = daily_df.loc[:, idx[select_daily_df_ticker_list, :]]
         self.__ticker_to_contract_info_dict = ticker_to_contract_info_dict
+        self.__pattern_engine = pattern_engine if pattern_engine else PatternEngine(historical_data_df, daily_df)
 
     def analyse(self) -> None:
-        message_list = []
+        message_param_list = []
         logger.log_debug_msg('Initial pop scan')
         start_time = time.time()
         
-        yesterday_daily_candle_df = self.__daily_df.iloc[[-1]]
-        candle_colour_df = self.__historical_data_df.loc[:, idx[:, CustomisedIndicator.CANDLE_COLOUR.value]]
-        close_df = self.__historical_data_df.loc[:, idx[:, Indicator.CLOSE.value]]
-        
-        yesterday_close_df = yesterday_daily_candle_df.loc[:, idx[:, Indicator.CLOSE.value]]
-        yesterday_close_to_last_pct_df = (close_df.sub(yesterday_close_df.values)
-                                                  .div(yesterday_close_df.values)
-                                                  .mul(100)
-                                                  .rename(columns={Indicator.CLOSE.value: CustomisedIndicator.CLOSE_CHANGE.value}))
-        
-        yesterday_upper_body_df = yesterday_daily_candle_df.loc[:, idx[:, CustomisedIndicator.CANDLE_UPPER_BODY.value]]
-        candle_lower_body_df = self.__historical_data_df.loc[:, idx[:, CustomisedIndicator.CANDLE_LOWER_BODY.value]]
-        gap_up_pct_df = (candle_lower_body_df.sub(yesterday_upper_body_df.values)
-                                             .div(yesterday_upper_body_df.values)
-                                             .mul(100)
-                                             .rename(columns={CustomisedIndicator.CANDLE_LOWER_BODY.value: CustomisedIndicator.GAP_PCT_CHANGE.value}))
+        pattern_engine = self.__pattern_engine
+        candle_panel = pattern_engine.candle_panel
+        ticker_list = pattern_engine.ticker_list
         
-        self.__historical_data_df.loc[[self.__historical_data_df.index[0]], idx[:, CustomisedIndicator.CLOSE_CHANGE.value]] = yesterday_close_to_last_pct_df.iloc[[0]]
-        self.__historical_data_df.loc[[self.__historical_data_df.index[0]], idx[:, CustomisedIndicator.GAP_PCT_CHANGE.value]] = gap_up_pct_df.iloc[[0]]
+        yesterday_close_np = pattern_engine.get_yesterday_field_np(Indicator.CLOSE)
+        yesterday_close_to_last_pct_np = pattern_engine.yesterday_close_to_last_pct_np
+        gap_up_pct_np = pattern_engine.gap_up_pct_np
         
-        min_gap_up_pct_df = (gap_up_pct_df >= MIN_GAP_UP_PCT).rename(columns={CustomisedIndicator.GAP_PCT_CHANGE.value: RuntimeIndicator.COMPARE.value})
-        min_yesterday_close_to_last_pct_boolean_df = (yesterday_close_to_last_pct_df >= MIN_YESTERDAY_CLOSE_TO_LAST_PCT).rename(columns={CustomisedIndicator.CLOSE_CHANGE.value: RuntimeIndicator.COMPARE.value})
-        non_flat_candle_boolean_df = (candle_colour_df != CandleColour.GREY.value).rename(columns={CustomisedIndicator.CANDLE_COLOUR.value: RuntimeIndicator.COMPARE.value})
+        close_change_column_position_list = self.__historical_data_df.columns.get_indexer([(ticker, CustomisedIndicator.CLOSE_CHANGE.value) for ticker in ticker_list])
+        gap_pct_column_position_list = self.__historical_data_df.columns.get_indexer([(ticker, CustomisedIndicator.GAP_PCT_CHANGE.value) for ticker in ticker_list])
+        self.__historical_data_df.iloc[0, close_change_column_position_list] = yesterday_close_to_last_pct_np[0]
+        self.__historical_data_df.iloc[0, gap_pct_column_position_list] = gap_up_pct_np[0]
         
-        pop_up_boolean_df = (min_gap_up_pct_df) & (min_yesterday_close_to_last_pct_boolean_df) & (non_flat_candle_boolean_df)
+        pop_up_boolean_np = ((gap_up_pct_np >= MIN_GAP_UP_PCT) 
+                                & (yesterday_close_to_last_pct_np >= MIN_YESTERDAY_CLOSE_TO_LAST_PCT) 
+                                & pattern_engine.non_flat_boolean_np)
+        pop_up_boolean_df = pd.DataFrame(pop_up_boolean_np, 
+                                         index=self.__historical_data_df.index, 
+                                         columns=pd.MultiIndex.from_product([ticker_list, [RuntimeIndicator.COMPARE.value]]))
         
-        datetime_idx_df = derive_idx_df(pop_up_boolean_df, False)
-        first_pop_up_occurrence_df = datetime_idx_df.where(pop_up_boolean_df.values).bfill().iloc[[0]]
+        session_index = pattern_engine.session_index
+        first_pop_up_position_np = session_index.get_first_true_position_np(pop_up_boolean_np)
+        top_gainer_ticker_list = [ticker for ticker, is_pop_up in zip(ticker_list, pop_up_boolean_np.any(axis=0)) if is_pop_up]
         
-        top_gainer_result_series = pop_up_boolean_df.any()   
-        top_gainer_ticker_list = top_gainer_result_series.index[top_gainer_result_series].get_level_values(0).tolist()
-        
-        ticker_to_occurrence_idx_list_dict = get_ticker_to_occurrence_idx_list(pop_up_boolean_df, MAX_POP_OCCURRENCE)
+        ticker_to_occurrence_idx_list_dict = session_index.get_ticker_to_occurrence_datetime_list(pop_up_boolean_np, ticker_list, MAX_POP_OCCURRENCE)
         logger.log_debug_msg(f'Initial pop ticker to occurrence idx list: {ticker_to_occurrence_idx_list_dict}')
         logger.log_debug_msg(f'Initial pop analysis time: {time.time() - start_time} seconds')
     
         if len(top_gainer_ticker_list) > 0:
             for ticker in top_gainer_ticker_list:
-                first_pop_up_datetime = first_pop_up_occurrence_df.loc[first_pop_up_occurrence_df.index[0], (ticker, RuntimeIndicator.INDEX.value)]
+                ticker_position = candle_panel.get_ticker_position(ticker)
+                first_pop_up_datetime = session_index.get_datetime(first_pop_up_position_np[ticker_position])
                 candle_chart_data_df, daily_date_to_fake_minute_datetime_x_axis_dict = concat_daily_df_and_minute_df(daily_df=self.__daily_df, 
                                                                                                                      minute_df=self.__historical_data_df, 
                                                                                                                      hit_scanner_datetime=first_pop_up_datetime, 
@@ -131,34 +123,36 @@ class InitialPop(PatternAnalyser):
                         close = self.__historical_data_df.loc[pop_up_time, (ticker, Indicator.CLOSE.value)]
                         volume = self.__historical_data_df.loc[pop_up_time, (ticker, Indicator.VOLUME.value)]
                         total_volume = self.__historical_data_df.loc[pop_up_time, (ticker, CustomisedIndicator.TOTAL_VOLUME.value)]
-                        yesterday_close = yesterday_close_df.loc[yesterday_close_df.index[-1], (ticker, Indicator.CLOSE.value)]
-                        yesterday_close_to_last_pct = yesterday_close_to_last_pct_df.loc[pop_up_time, (ticker, CustomisedIndicator.CLOSE_CHANGE.value)]
+                        yesterday_close = yesterday_close_np[ticker_position]
+                        yesterday_close_to_last_pct = yesterday_close_to_last_pct_np[candle_panel.get_row_position(pop_up_time), ticker_position]
                         
                         one_minute_chart_start_time = time.time()
                         logger.log_debug_msg(f'Generate {ticker} initial pop one minute chart')
-                        chart_dir = get_candlestick_chart(candle_data_df=candle_chart_data_df,
-                                                          ticker=ticker, pattern=PATTERN_NAME, bar_size=self.__bar_size,
-                                                          daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
-                                                          hit_scanner_datetime=pop_up_time,
-                                                          positive_offset=0, negative_offset=candle_chart_negative_offset,
-                                                          scatter_symbol=ScatterSymbol.POP, scatter_colour=ScatterColour.CYAN)
-                        logger.log_debug_msg(f'Generate {ticker} initial pop one minute chart finished time: {time.time() - one_minute_chart_start_time} seconds')
+                        chart_future = submit_candlestick_chart(candle_data_df=candle_chart_data_df,
+                                                                ticker=ticker, pattern=PATTERN_NAME, bar_size=self.__bar_size,
+                                                                daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
+                                                                hit_scanner_datetime=pop_up_time,
+                                                                positive_offset=0, negative_offset=candle_chart_negative_offset,
+                                                                scatter_symbol=ScatterSymbol.POP, scatter_colour=ScatterColour.CYAN)
+                        logger.log_debug_msg(f'Generate {ticker} initial pop one minute chart submitted time: {time.time() - one_minute_chart_start_time} seconds')
 
                         hit_scanner_datetime_display = convert_into_human_readable_time(pop_up_time)
                         read_out_pop_up_time = convert_into_read_out_time(pop_up_time)
                         
-                        message = ScannerResultMessage(title=f'{ticker} is popping up {round(yesterday_close_to_last_pct, 2)}% at {hit_scanner_datetime_display}',
-                                                       readout_msg=f'{" ".join(ticker)} is popping up {round(yesterday_close_to_last_pct, 2)}% at {read_out_pop_up_time}',
-                                                       close=close,
-                                                       yesterday_close=yesterday_close,
-                                                       volume=volume, total_volume=total_volume,
-                                                       contract_info=contract_info,
-                                                       chart_dir=chart_dir,
-                                                       ticker=ticker,
-                                                       hit_scanner_datetime=pop_up_time.replace(second=0, microsecond=0),
-                                                       pattern=PATTERN_NAME,
-                                                       bar_size=self.__bar_size.value)
-                        message_list.append(message)
+                        message_param = dict(title=f'{ticker} is popping up {round(yesterday_close_to_last_pct, 2)}% at {hit_scanner_datetime_display}',
+                                             readout_msg=f'{" ".join(ticker)} is popping up {round(yesterday_close_to_last_pct, 2)}% at {read_out_pop_up_time}',
+                                             close=close,
+                                             yesterday_close=yesterday_close,
+                                             volume=volume, total_volume=total_volume,
+                                             contract_info=contract_info,
+                                             chart_future=chart_future,
+                                             ticker=ticker,
+                                             hit_scanner_datetime=pop_up_time.replace(second=0, microsecond=0),
+                                             pattern=PATTERN_NAME,
+                                             bar_size=self.__bar_size.value)
+                        message_param_list.append(message_param)
+        
+        message_list = self.get_scanner_result_message_list(message_param_list)
         
         if message_list:
             send_msg_start_time = time.time()
@@ -4,8 +4,8 @@ import numpy as np
 from pandas.core.frame import DataFrame
 
 from pattern.pattern_analyser import PatternAnalyser
+from pattern.pattern_engine import PatternEngine
 
-from model.discord.scanner_result_message import ScannerResultMessage
 from model.discord.discord_message import DiscordMessage
 
 from constant.indicator.indicator import Indicator
@@ -16,8 +16,8 @@ from constant.indicator.scatter_colour import ScatterColour
 from constant.candle.bar_size import BarSize
 from constant.discord.discord_channel import DiscordChannel
 
-from utils.chart_util import get_candlestick_chart
-from utils.dataframe_util import concat_daily_df_and_minute_df, derive_idx_df
+from utils.chart_util import submit_candlestick_chart
+from utils.dataframe_util import concat_daily_df_and_minute_df
 from utils.datetime_util import convert_into_human_readable_time, convert_into_read_out_time
 from utils.logger import Logger
 from utils.config_util import get_config
@@ -36,7 +36,7 @@ DAILY_AND_MINUTE_CANDLE_GAP = get_config('INTRA_DAY_BREAKOUT_PARAM', 'DAILY_AND_
 MIN_VALID_CANDLESTICK_CHART_DISPLAY_VOLUME = get_config('INTRA_DAY_BREAKOUT_PARAM', 'MIN_VALID_CANDLESTICK_CHART_DISPLAY_VOLUME')
 
 class IntraDayBreakout(PatternAnalyser):    
-    def __init__(self, bar_size: BarSize, historical_data_df: DataFrame, daily_df: DataFrame, ticker_to_contract_info_dict: dict, discord_client):
+    def __init__(self, bar_size: BarSize, historical_data_df: DataFrame, daily_df: DataFrame, ticker_to_contract_info_dict: dict, discord_client, pattern_engine: PatternEngine = None):
         ticker_list = list(historical_data_df.columns.get_level_values(0).unique())
         super().__init__(discord_client)
         self.__bar_size = bar_size
@@ -51,9 +51,10 @@ class IntraDayBreakout(PatternAnalyser):
         self.__ticker_list = select_daily_df_ticker_list
         self.__daily_df = daily_df.loc[:, idx[select_daily_df_ticker_list, :]]
         self.__ticker_to_contract_info_dict = ticker_to_contract_info_dict
+        self.__pattern_engine = pattern_engine if pattern_engine else PatternEngine(historical_data_df, daily_df)
 
     def analyse(self) -> None:
-        message_list = []
+        message_param_list = []
         logger.log_debug_msg('Intra day breakout scan')
         start_time = time.time()
         
@@ -61,28 +62,27 @@ class IntraDayBreakout(PatternAnalyser):
         if period < MIN_OBSERVE_PERIOD:
             return
         
-        close_df = (self.__historical_data_df.loc[:, idx[:, Indicator.CLOSE.value]]
-                                             .rename(columns={Indicator.CLOSE.value: RuntimeIndicator.COMPARE.value}))
-        high_df = (self.__historical_data_df.loc[:, idx[:, Indicator.HIGH.value]]
-                                            .rename(columns={Indicator.HIGH.value: RuntimeIndicator.COMPARE.value}))
-        volume_df = (self.__historical_data_df.loc[:, idx[:, Indicator.VOLUME.value]]
-                                              .rename(columns={Indicator.VOLUME.value: RuntimeIndicator.COMPARE.value}))
-        trading_volume_df = close_df * volume_df
-        min_breakout_trading_volume_boolean_df = (trading_volume_df >= MIN_BREAKOUT_TRADING_VOLUME_IN_USD)
+        pattern_engine = self.__pattern_engine
+        close_df = pattern_engine.get_compare_field_df(Indicator.CLOSE)
+        high_df = pattern_engine.get_compare_field_df(Indicator.HIGH)
+        volume_df = pattern_engine.get_compare_field_df(Indicator.VOLUME)
+        trading_volume_np = pattern_engine.trading_volume_np
+        min_breakout_trading_volume_boolean_np = (trading_volume_np >= MIN_BREAKOUT_TRADING_VOLUME_IN_USD)
         
-        select_valid_volume_candlestick_display_boolean_df = (trading_volume_df >= MIN_VALID_CANDLESTICK_CHART_DISPLAY_VOLUME)
-        datetime_idx_df = derive_idx_df(select_valid_volume_candlestick_display_boolean_df, False)
-        first_valid_volume_datetime_df = (datetime_idx_df.where(select_valid_volume_candlestick_display_boolean_df.values)
-                                                         .bfill()
-                                                         .iloc[[0]])
+        select_valid_volume_candlestick_display_boolean_np = (trading_volume_np >= MIN_VALID_CANDLESTICK_CHART_DISPLAY_VOLUME)
+        first_valid_volume_datetime_list = pattern_engine.session_index.get_first_true_datetime_list(select_valid_volume_candlestick_display_boolean_np)
+        ticker_to_first_valid_volume_datetime_dict = dict(zip(pattern_engine.ticker_list, first_valid_volume_datetime_list))
+        
+        # Masked and normalised across all tickers once, the loop below only slices its own ticker
+        all_min_breakout_volume_close_df = close_df.where(min_breakout_trading_volume_boolean_np).replace(np.nan, -1)
+        all_min_breakout_volume_high_df = high_df.where(min_breakout_trading_volume_boolean_np).replace(np.nan, -1)
+        all_min_breakout_volume_volume_df = volume_df.where(min_breakout_trading_volume_boolean_np).replace(np.nan, -1)
+        all_normalised_close_df = close_df.replace(np.nan, -1)
+        all_normalised_high_df = high_df.replace(np.nan, -1)
         
         for ticker in self.__ticker_list:
-            min_breakout_volume_close_df = (close_df.where(min_breakout_trading_volume_boolean_df.values)
-                                                    .replace(np.nan, -1)
-                                                    .loc[:, idx[[ticker], :]])
-            min_breakout_volume_high_df = (high_df.where(min_breakout_trading_volume_boolean_df.values)
-                                                  .replace(np.nan, -1)
-                                                  .loc[:, idx[[ticker], :]])
+            min_breakout_volume_close_df = all_min_breakout_volume_close_df.loc[:, idx[[ticker], :]]
+            min_breakout_volume_high_df = all_min_breakout_volume_high_df.loc[:, idx[[ticker], :]]
 
             sorted_breakout_close_idx_np = np.argsort(min_breakout_volume_close_df.values, axis=0)
             sorted_breakout_close_np = min_breakout_volume_close_df.values[sorted_breakout_close_idx_np, np.arange(min_breakout_volume_close_df.shape[1])]
@@ -107,27 +107,22 @@ class IntraDayBreakout(PatternAnalyser):
             breakout_high_datetime = min_breakout_volume_high_df.index[sorted_breakout_high_idx_np[-1][0]]
     
             if breakout_high != -1:
-                normalised_high_df = (high_df.replace(np.nan, -1)
-                                             .loc[:breakout_high_datetime, idx[[ticker], :]])
+                normalised_high_df = all_normalised_high_df.loc[:breakout_high_datetime, idx[[ticker], :]]
                 
                 sorted_high_idx_np = np.argsort(normalised_high_df.values, axis=0)
                 sorted_high_np = normalised_high_df.values[sorted_high_idx_np, np.arange(normalised_high_df.shape[1])]
 
                 # first breakout occurrence (high)
-                for high_idx in sorted_breakout_high_idx_np:
-                    high_idx = high_idx[0]
-                    high_val = min_breakout_volume_high_df.loc[min_breakout_volume_high_df.index[high_idx], (ticker, RuntimeIndicator.COMPARE.value)]
-                
-                    if high_val != -1:
-                        high_datetime = min_breakout_volume_high_df.index[high_idx]
-                        candlestick_chart_display_start_datetime = high_datetime
-                        break
+                valid_sorted_high_position_np = np.flatnonzero(sorted_breakout_high_np[:, 0] != -1)
+                if len(valid_sorted_high_position_np) > 0:
+                    high_idx = sorted_breakout_high_idx_np[valid_sorted_high_position_np[0]][0]
+                    candlestick_chart_display_start_datetime = min_breakout_volume_high_df.index[high_idx]
                 
                 if (candlestick_chart_display_start_datetime is None 
                         or candlestick_chart_display_start_datetime == breakout_high_datetime):
-                    first_valid_volume_datetime = first_valid_volume_datetime_df.loc[first_valid_volume_datetime_df.index[0], (ticker, RuntimeIndicator.INDEX.value)]
+                    first_valid_volume_datetime = ticker_to_first_valid_volume_datetime_dict[ticker]
                     
-                    if candlestick_chart_display_start_datetime > first_valid_volume_datetime:
+                    if first_valid_volume_datetime is not None and candlestick_chart_display_start_datetime > first_valid_volume_datetime:
                         candlestick_chart_display_start_datetime = first_valid_volume_datetime
                 
                 if len(sorted_high_np) >= 2:
@@ -151,27 +146,22 @@ class IntraDayBreakout(PatternAnalyser):
                 
             #Intra Day Breakout Message Precedence, Breakout Close > Breakout High
             if breakout_value is None or previous_high is None:
-                normalised_close_df = (close_df.replace(np.nan, -1)
-                                               .loc[:breakout_close_datetime, idx[[ticker], :]])
+                normalised_close_df = all_normalised_close_df.loc[:breakout_close_datetime, idx[[ticker], :]]
                 
                 sorted_close_idx_np = np.argsort(normalised_close_df.values, axis=0)
                 sorted_close_np = normalised_close_df.values[sorted_close_idx_np, np.arange(normalised_close_df.shape[1])]
                 
                 # first breakout occurrence (close)
-                for close_idx in sorted_breakout_close_idx_np:
-                    close_idx = close_idx[0]
-                    close_val = min_breakout_volume_close_df.loc[min_breakout_volume_close_df.index[close_idx], (ticker, RuntimeIndicator.COMPARE.value)]
-                
-                    if close_val != -1:
-                        close_datetime = min_breakout_volume_close_df.index[close_idx]
-                        candlestick_chart_display_start_datetime = close_datetime
-                        break
+                valid_sorted_close_position_np = np.flatnonzero(sorted_breakout_close_np[:, 0] != -1)
+                if len(valid_sorted_close_position_np) > 0:
+                    close_idx = sorted_breakout_close_idx_np[valid_sorted_close_position_np[0]][0]
+                    candlestick_chart_display_start_datetime = min_breakout_volume_close_df.index[close_idx]
                 
                 if (candlestick_chart_display_start_datetime is None 
                         or candlestick_chart_display_start_datetime == breakout_close_datetime):
-                    first_valid_volume_datetime = first_valid_volume_datetime_df.loc[first_valid_volume_datetime_df.index[0], (ticker, RuntimeIndicator.INDEX.value)]
+                    first_valid_volume_datetime = ticker_to_first_valid_volume_datetime_dict[ticker]
                     
-                    if candlestick_chart_display_start_datetime > first_valid_volume_datetime:
+                    if first_valid_volume_datetime is not None and candlestick_chart_display_start_datetime > first_valid_volume_datetime:
                         candlestick_chart_display_start_datetime = first_valid_volume_datetime
                 
                 if len(sorted_close_np) >= 2:
@@ -196,9 +186,7 @@ class IntraDayBreakout(PatternAnalyser):
             if breakout_value is None:
                 continue
             
-            normalised_volume_df = (volume_df.where(min_breakout_trading_volume_boolean_df.values)
-                                             .replace(np.nan, -1)
-                                             .loc[:breakout_datetime, idx[[ticker], :]])
+            normalised_volume_df = all_min_breakout_volume_volume_df.loc[:breakout_datetime, idx[[ticker], :]]
             sorted_volume_idx_np = np.argsort(normalised_volume_df.values, axis=0)
             sorted_volume_np = normalised_volume_df.values[sorted_volume_idx_np, np.arange(normalised_volume_df.shape[1])]
             breakout_volume = normalised_volume_df.loc[breakout_datetime, (ticker, RuntimeIndicator.COMPARE.value)]
@@ -252,34 +240,36 @@ class IntraDayBreakout(PatternAnalyser):
                 
                 one_minute_chart_start_time = time.time()
                 logger.log_debug_msg(f'Generate {ticker} intra day breakout one minute chart')
-                chart_dir = get_candlestick_chart(candle_data_df=candle_chart_data_df,
-                                                  ticker=ticker, pattern=PATTERN_NAME, bar_size=self.__bar_size,
-                                                  daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
-                                                  hit_scanner_datetime=breakout_datetime,
-                                                  positive_offset=0, negative_offset=0,
-                                                  scatter_symbol=ScatterSymbol.POP, scatter_colour=ScatterColour.GREEN,
-                                                  candle_comment_list=candle_comment_list)
-                logger.log_debug_msg(f'Generate {ticker} intra day breakout one minute chart finished time: {time.time() - one_minute_chart_start_time} seconds')
+                chart_future = submit_candlestick_chart(candle_data_df=candle_chart_data_df,
+                                                        ticker=ticker, pattern=PATTERN_NAME, bar_size=self.__bar_size,
+                                                        daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
+                                                        hit_scanner_datetime=breakout_datetime,
+                                                        positive_offset=0, negative_offset=0,
+                                                        scatter_symbol=ScatterSymbol.POP, scatter_colour=ScatterColour.GREEN,
+                                                        candle_comment_list=candle_comment_list)
+                logger.log_debug_msg(f'Generate {ticker} intra day breakout one minute chart submitted time: {time.time() - one_minute_chart_start_time} seconds')
                 
                 hit_scanner_datetime_display = convert_into_human_readable_time(breakout_datetime)
                 read_out_dip_time = convert_into_read_out_time(breakout_datetime)
                     
                 append_previous_high_display = f'${previous_high}' if previous_high is not None else 'None'
                 append_previous_high_datetime_display = f'at {previous_high_datetime.strftime(("%Y-%m-%d %H:%M"))}' if previous_high_datetime is not None else 'at None'
-                message = ScannerResultMessage(title=f'{ticker} is breaking out {yesterday_close_to_last_pct}% at {hit_scanner_datetime_display}, breaking high: ${breakout_value} at {breakout_datetime.strftime(("%Y-%m-%d %H:%M"))}, previous high: {append_previous_high_display} {append_previous_high_datetime_display}, breakout volume: {"{:,}".format(int(breakout_volume))}',
-                                               readout_msg=f'{" ".join(ticker)} is breaking out {yesterday_close_to_last_pct}% at {read_out_dip_time}',
-                                               close=close,
-                                               yesterday_close=yesterday_close,
-                                               volume=breakout_volume, total_volume=total_volume,
-                                               contract_info=contract_info,
-                                               chart_dir=chart_dir,
-                                               ticker=ticker,
-                                               hit_scanner_datetime=breakout_datetime.replace(second=0, microsecond=0),
-                                               pattern=PATTERN_NAME,
-                                               bar_size=self.__bar_size.value)
-                message_list.append(message)
-            
-            if message_list:
-                send_msg_start_time = time.time()
-                self.send_notification(message_list, DiscordChannel.INTRA_DAY_BREAKOUT)
-                logger.log_debug_msg(f'{PATTERN_NAME} send message time: {time.time() - send_msg_start_time} seconds')
\ No newline at end of file
+                message_param = dict(title=f'{ticker} is breaking out {yesterday_close_to_last_pct}% at {hit_scanner_datetime_display}, breaking high: ${breakout_value} at {breakout_datetime.strftime(("%Y-%m-%d %H:%M"))}, previous high: {append_previous_high_display} {append_previous_high_datetime_display}, breakout volume: {"{:,}".format(int(breakout_volume))}',
+                                     readout_msg=f'{" ".join(ticker)} is breaking out {yesterday_close_to_last_pct}% at {read_out_dip_time}',
+                                     close=close,
+                                     yesterday_close=yesterday_close,
+                                     volume=breakout_volume, total_volume=total_volume,
+                                     contract_info=contract_info,
+                                     chart_future=chart_future,
+                                     ticker=ticker,
+                                     hit_scanner_datetime=breakout_datetime.replace(second=0, microsecond=0),
+                                     pattern=PATTERN_NAME,
+                                     bar_size=self.__bar_size.value)
+                message_param_list.append(message_param)
+        
+        message_list = self.get_scanner_result_message_list(message_param_list)
+        
+        if message_list:
+            send_msg_start_time = time.time()
+            self.send_notification(message_list, DiscordChannel.INTRA_DAY_BREAKOUT)
+            logger.log_debug_msg(f'{PATTERN_NAME} send message time: {time.time() - send_msg_start_time} seconds')
\ No newline at end of file
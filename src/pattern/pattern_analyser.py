@@ -1,9 +1,12 @@
 from abc import ABC
 import datetime
+import time
 
 from model.discord.discord_message import DiscordMessage
+from model.discord.scanner_result_message import ScannerResultMessage
 
 from utils.discord_message_record_util import check_if_pattern_analysis_message_sent, add_sent_pattern_analysis_message_record
+from utils.profiler import profile_span
 from utils.logger import Logger
 
 from constant.discord.discord_channel import DiscordChannel
@@ -23,6 +26,27 @@ class PatternAnalyser(ABC):
     def check_if_pattern_analysis_message_sent(self, ticker: str, hit_scanner_datetime: datetime.datetime, pattern: str, bar_size: BarSize):
         return check_if_pattern_analysis_message_sent(ticker, hit_scanner_datetime, pattern, bar_size.value)
         
+    def get_scanner_result_message_list(self, message_param_list: list) -> list:
+        message_list = []
+        chart_wait_start_time = time.time()
+        
+        for message_param in message_param_list:
+            chart_future = message_param.pop('chart_future', None)
+            
+            try:
+                with profile_span('chart_wait'):
+                    chart = chart_future.result() if chart_future else None
+            except Exception as chart_exception:
+                logger.log_error_msg(f'Failed to generate {message_param.get("ticker")} chart, {chart_exception}')
+                chart = None
+            
+            message_list.append(ScannerResultMessage(**message_param, chart=chart))
+        
+        if message_param_list:
+            logger.log_debug_msg(f'Wait for {len(message_param_list)} chart(s) time: {time.time() - chart_wait_start_time} seconds')
+        
+        return message_list
+    
     def send_notification(self, scanner_result_list: list, discord_channel: DiscordChannel, is_async: bool = True):
         if scanner_result_list:
             save_notification_db_record_param_list = []
@@ -37,13 +61,14 @@ class PatternAnalyser(ABC):
                 notification_db_record_parms = [scanner_result.ticker, scanner_result.hit_scanner_datetime, scanner_result.pattern, scanner_result.bar_size]
                 save_notification_db_record_param_list.append(notification_db_record_parms)
             
-            if is_async:
-                response_list = self._discord_client.send_message_by_list_with_response(message_list=scanner_result_list, channel_type=discord_channel)
-            else:
-                response_list = []
-                for scanner_result in scanner_result_list:
-                    individual_msg_response_list = self._discord_client.send_message_by_list_with_response(message_list=[scanner_result], channel_type=discord_channel)
-                    response_list.append(individual_msg_response_list[0])
+            with profile_span('discord_send'):
+                if is_async:
+                    response_list = self._discord_client.send_message_by_list_with_response(message_list=scanner_result_list, channel_type=discord_channel)
+                else:
+                    response_list = []
+                    for scanner_result in scanner_result_list:
+                        individual_msg_response_list = self._discord_client.send_message_by_list_with_response(message_list=[scanner_result], channel_type=discord_channel)
+                        response_list.append(individual_msg_response_list[0])
 
             notification_message_list = []
             send_notification_ticker_list = []
@@ -0,0 +1,110 @@
+from typing import Callable
+import numpy as np
+import pandas as pd
+
+from model.candle.candle_panel import CANDLE_COLOUR_TO_CODE_DICT, CandlePanel
+from model.candle.session_index import SessionIndex
+
+from utils.profiler import profile_span
+from utils.logger import Logger
+
+from constant.indicator.indicator import Indicator
+from constant.indicator.customised_indicator import CustomisedIndicator
+from constant.indicator.runtime_indicator import RuntimeIndicator
+from constant.candle.candle_colour import CandleColour
+
+logger = Logger()
+
+class PatternEngine:
+    def __init__(self, minute_df: pd.DataFrame, daily_df: pd.DataFrame = None):
+        self.__minute_df = minute_df
+        self.__daily_df = daily_df
+        self.__derived_series_dict = {}
+        self.__name_to_analyser_list = []
+
+    @property
+    def minute_df(self):
+        return self.__minute_df
+
+    @property
+    def daily_df(self):
+        return self.__daily_df
+
+    def __get_or_compute(self, key, compute: Callable):
+        # Derived series are computed on first use and shared by every pattern in the cycle, callers must not modify them
+        if key not in self.__derived_series_dict:
+            self.__derived_series_dict[key] = compute()
+
+        return self.__derived_series_dict[key]
+
+    @property
+    def candle_panel(self) -> CandlePanel:
+        return self.__get_or_compute('candle_panel', lambda: CandlePanel.from_df(self.__minute_df))
+
+    @property
+    def daily_candle_panel(self) -> CandlePanel:
+        return self.__get_or_compute('daily_candle_panel', lambda: CandlePanel.from_df(self.__daily_df))
+
+    @property
+    def ticker_list(self) -> list:
+        return self.candle_panel.ticker_list
+
+    @property
+    def session_index(self) -> SessionIndex:
+        return self.candle_panel.session_index
+
+    def get_field(self, field) -> np.ndarray:
+        return self.candle_panel.get_field(field)
+
+    def get_compare_field_df(self, field) -> pd.DataFrame:
+        return self.__get_or_compute(('compare_field_df', field), lambda: self.candle_panel.get_field_df(field, RuntimeIndicator.COMPARE.value))
+
+    def get_yesterday_field_np(self, field) -> np.ndarray:
+        return self.__get_or_compute(('yesterday_field', field), lambda: self.daily_candle_panel.get_aligned_field(field, self.ticker_list)[-1])
+
+    @property
+    def yesterday_close_to_last_pct_np(self) -> np.ndarray:
+        def compute():
+            yesterday_close_np = self.get_yesterday_field_np(Indicator.CLOSE)
+            return (self.get_field(Indicator.CLOSE) - yesterday_close_np) / yesterday_close_np * 100
+
+        return self.__get_or_compute('yesterday_close_to_last_pct', compute)
+
+    @property
+    def gap_up_pct_np(self) -> np.ndarray:
+        def compute():
+            yesterday_upper_body_np = self.get_yesterday_field_np(CustomisedIndicator.CANDLE_UPPER_BODY)
+            return (self.get_field(CustomisedIndicator.CANDLE_LOWER_BODY) - yesterday_upper_body_np) / yesterday_upper_body_np * 100
+
+        return self.__get_or_compute('gap_up_pct', compute)
+
+    @property
+    def gap_down_pct_np(self) -> np.ndarray:
+        def compute():
+            yesterday_lower_body_np = self.get_yesterday_field_np(CustomisedIndicator.CANDLE_LOWER_BODY)
+            return (self.get_field(CustomisedIndicator.CANDLE_UPPER_BODY) - yesterday_lower_body_np) / yesterday_lower_body_np * 100
+
+        return self.__get_or_compute('gap_down_pct', compute)
+
+    @property
+    def trading_volume_np(self) -> np.ndarray:
+        return self.__get_or_compute('trading_volume', lambda: self.get_field(Indicator.CLOSE) * self.get_field(Indicator.VOLUME))
+
+    @property
+    def non_flat_boolean_np(self) -> np.ndarray:
+        return self.__get_or_compute('non_flat', lambda: self.get_field(CustomisedIndicator.CANDLE_COLOUR) != CANDLE_COLOUR_TO_CODE_DICT[CandleColour.GREY.value])
+
+    @property
+    def traded_non_flat_boolean_np(self) -> np.ndarray:
+        return self.__get_or_compute('traded_non_flat', lambda: self.non_flat_boolean_np & (self.get_field(Indicator.VOLUME) > 0))
+
+    def register(self, name: str, analyser) -> None:
+        self.__name_to_analyser_list.append((name, analyser))
+
+    def analyse(self) -> None:
+        # Registration order is kept, a later pattern sees the minute frame as updated by an earlier one
+        for name, analyser in self.__name_to_analyser_list:
+            with profile_span(name):
+                analyser.analyse()
+
+        logger.log_debug_msg(f'Pattern engine analysed {[name for name, _ in self.__name_to_analyser_list]}, no. of derived series: {len(self.__derived_series_dict)}')
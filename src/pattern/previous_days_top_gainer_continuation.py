@@ -1,16 +1,17 @@
 import math
 import time
+import numpy as np
 import pandas as pd
 
 from pattern.pattern_analyser import PatternAnalyser
+from pattern.pattern_engine import PatternEngine
 
 from utils.datetime_util import convert_into_human_readable_time, convert_into_read_out_time, get_current_us_datetime
-from utils.dataframe_util import concat_daily_df_and_minute_df, get_ticker_to_occurrence_idx_list
-from utils.chart_util import get_candlestick_chart
+from utils.dataframe_util import concat_daily_df_and_minute_df
+from utils.chart_util import submit_candlestick_chart
 from utils.config_util import get_config
 from utils.logger import Logger
 
-from model.discord.scanner_result_message import ScannerResultMessage
 from model.discord.discord_message import DiscordMessage
 
 from constant.indicator.indicator import Indicator
@@ -40,14 +41,15 @@ TOP_N_GAP_UP_OCCURRENCE_TIMES = get_config('PREVIOUS_DAY_TOP_GAINER_CONTINUATION
 DAILY_AND_MINUTE_CANDLE_GAP = get_config('PREVIOUS_DAY_TOP_GAINER_CONTINUATION_PARAM', 'DAILY_AND_MINUTE_CANDLE_GAP')
 
 class PreviousDayTopGainerContinuation(PatternAnalyser): 
-    def __init__(self, daily_df: pd.DataFrame, minute_df: pd.DataFrame, ticker_to_contract_info_dict: dict, discord_client):
+    def __init__(self, daily_df: pd.DataFrame, minute_df: pd.DataFrame, ticker_to_contract_info_dict: dict, discord_client, pattern_engine: PatternEngine = None):
         super().__init__(discord_client)
         self.__daily_df = daily_df
         self.__minute_df = minute_df
         self.__ticker_to_contract_info_dict = ticker_to_contract_info_dict
+        self.__pattern_engine = pattern_engine if pattern_engine else PatternEngine(minute_df, daily_df)
     
     def analyse(self) -> None:
-        message_list = []
+        message_param_list = []
         logger.log_debug_msg('Previous day top gainers continuation scan')
 
         daily_close_df = self.__daily_df.loc[:, idx[:, Indicator.CLOSE.value]].apply(pd.to_numeric, errors='coerce')
@@ -68,6 +70,7 @@ class PreviousDayTopGainerContinuation(PatternAnalyser):
         previous_day_top_gainer_ticker_list = max_daily_close_with_most_volume_ticker_series.index[max_daily_close_with_most_volume_ticker_series].get_level_values(0).tolist()
         
         latest_daily_candle_date = self.__daily_df.index[-1]
+        pattern_engine = self.__pattern_engine
         
         for ticker in previous_day_top_gainer_ticker_list:
             with pd.option_context('display.max_rows', None,
@@ -98,6 +101,8 @@ class PreviousDayTopGainerContinuation(PatternAnalyser):
                     self._discord_client.send_message(DiscordMessage(content=concat_msg), DiscordChannel.PREVIOUS_DAYS_TOP_GAINERS_CONTINUATION_DATA_NOT_FOUND_LOG)
                 continue
             
+            # Only built once a ticker has minute candles, the panel is shared by every ticker
+            candle_panel = pattern_engine.candle_panel
             ramp_up_candle_date = max_daily_volume_dt_index_series[(ticker, RuntimeIndicator.COMPARE.value)]
             candle_colour = daily_candle_colour_df.loc[ramp_up_candle_date, (ticker, CustomisedIndicator.CANDLE_COLOUR.value)]
             yesterday_close = self.__daily_df.loc[latest_daily_candle_date, (ticker, Indicator.CLOSE.value)]
@@ -111,26 +116,24 @@ class PreviousDayTopGainerContinuation(PatternAnalyser):
                 ramp_up_high = self.__daily_df.loc[ramp_up_candle_date, (ticker, Indicator.HIGH.value)]
                 
                 # Minute candle
-                minute_high_df = ticker_minute_candle_df.loc[:, idx[:, Indicator.HIGH.value]].rename(columns={Indicator.HIGH.value: RuntimeIndicator.COMPARE.value})
-                minute_close_df = ticker_minute_candle_df.loc[:, idx[:, Indicator.CLOSE.value]].rename(columns={Indicator.CLOSE.value: RuntimeIndicator.COMPARE.value})
-                minute_lower_body_df = ticker_minute_candle_df.loc[:, idx[:, CustomisedIndicator.CANDLE_LOWER_BODY.value]].rename(columns={CustomisedIndicator.CANDLE_LOWER_BODY.value: RuntimeIndicator.COMPARE.value})
+                minute_high_np = candle_panel.get_value(ticker, Indicator.HIGH)
+                minute_close_np = candle_panel.get_value(ticker, Indicator.CLOSE)
+                minute_lower_body_np = candle_panel.get_value(ticker, CustomisedIndicator.CANDLE_LOWER_BODY)
+                traded_non_flat_np = pattern_engine.traded_non_flat_boolean_np[:, candle_panel.get_ticker_position(ticker)]
                 
-                minute_colour_df = ticker_minute_candle_df.loc[:, idx[:, CustomisedIndicator.CANDLE_COLOUR.value]].rename(columns={CustomisedIndicator.CANDLE_COLOUR.value: RuntimeIndicator.COMPARE.value})
-                minute_volume_df = ticker_minute_candle_df.loc[:, idx[:, Indicator.VOLUME.value]].rename(columns={Indicator.VOLUME.value: RuntimeIndicator.COMPARE.value})
-                
-                gap_up_pct_df = (minute_lower_body_df.sub(ramp_up_close).div(ramp_up_close)).mul(100)
-                gap_up_boolean_df = (gap_up_pct_df >= GAP_UP_PCT) & (minute_colour_df != CandleColour.GREY.value) & (minute_volume_df > 0)
-                gap_up_occurrence_times_df = gap_up_boolean_df.cumsum().ffill().where(gap_up_boolean_df.values)
+                gap_up_pct_np = (minute_lower_body_np - ramp_up_close) / ramp_up_close * 100
+                gap_up_boolean_np = (gap_up_pct_np >= GAP_UP_PCT) & traded_non_flat_np
+                gap_up_occurrence_times_np = np.where(gap_up_boolean_np, np.cumsum(gap_up_boolean_np), np.nan)
                 
                 new_high_test_lower_limit = (1 - (TEST_NEW_HIGH_TOLERANCE / 100)) * ramp_up_high
                 new_high_test_upper_limit = (1 + (TEST_NEW_HIGH_TOLERANCE / 100)) * ramp_up_high
                 
-                minute_close_new_high_test_boolean_df = (minute_close_df >= new_high_test_lower_limit) & (minute_close_df <= new_high_test_upper_limit) & (minute_colour_df != CandleColour.GREY.value) & (minute_volume_df > 0)
-                minute_high_new_high_test_boolean_df = (minute_high_df >= new_high_test_lower_limit) & (minute_high_df <= new_high_test_upper_limit) & (minute_colour_df != CandleColour.GREY.value) & (minute_volume_df > 0)
+                minute_close_new_high_test_boolean_np = (minute_close_np >= new_high_test_lower_limit) & (minute_close_np <= new_high_test_upper_limit) & traded_non_flat_np
+                minute_high_new_high_test_boolean_np = (minute_high_np >= new_high_test_lower_limit) & (minute_high_np <= new_high_test_upper_limit) & traded_non_flat_np
                 
-                continuation_boolean_df = (gap_up_boolean_df) | (minute_close_new_high_test_boolean_df | minute_high_new_high_test_boolean_df)
+                continuation_boolean_np = (gap_up_boolean_np) | (minute_close_new_high_test_boolean_np | minute_high_new_high_test_boolean_np)
                 
-                ticker_to_occurrence_idx_list_dict = get_ticker_to_occurrence_idx_list(continuation_boolean_df)
+                ticker_to_occurrence_idx_list_dict = pattern_engine.session_index.get_ticker_to_occurrence_datetime_list(continuation_boolean_np[:, np.newaxis], [ticker])
                 occurrence_idx_list = ticker_to_occurrence_idx_list_dict[ticker]
                 check_alert_datetime_list = []
                 trigger_alert_datetime_list = []
@@ -196,13 +199,13 @@ class PreviousDayTopGainerContinuation(PatternAnalyser):
                         
                         one_minute_chart_start_time = time.time()
                         logger.log_debug_msg(f'Generate {ticker} previous day top gainer continuation one minute chart')
-                        chart_dir = get_candlestick_chart(candle_data_df=candle_chart_data_df,
-                                                          ticker=ticker, pattern=PATTERN_NAME, bar_size=BarSize.ONE_MINUTE,
-                                                          daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
-                                                          hit_scanner_datetime=trigger_alert_datetime,
-                                                          positive_offset=0, negative_offset=0,
-                                                          scatter_symbol=ScatterSymbol.NEW_HIGH_TEST, scatter_colour=ScatterColour.GREEN)
-                        logger.log_debug_msg(f'Generate {ticker} previous day top gainer continuation one minute chart finished time: {time.time() - one_minute_chart_start_time} seconds')
+                        chart_future = submit_candlestick_chart(candle_data_df=candle_chart_data_df,
+                                                                ticker=ticker, pattern=PATTERN_NAME, bar_size=BarSize.ONE_MINUTE,
+                                                                daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
+                                                                hit_scanner_datetime=trigger_alert_datetime,
+                                                                positive_offset=0, negative_offset=0,
+                                                                scatter_symbol=ScatterSymbol.NEW_HIGH_TEST, scatter_colour=ScatterColour.GREEN)
+                        logger.log_debug_msg(f'Generate {ticker} previous day top gainer continuation one minute chart submitted time: {time.time() - one_minute_chart_start_time} seconds')
 
                         hit_scanner_datetime_display = convert_into_human_readable_time(trigger_alert_datetime)
                         read_out_new_high_test_time = convert_into_read_out_time(trigger_alert_datetime)
@@ -214,7 +217,7 @@ class PreviousDayTopGainerContinuation(PatternAnalyser):
                         total_volume = ticker_minute_candle_df.loc[trigger_alert_datetime, (ticker, CustomisedIndicator.TOTAL_VOLUME.value)]
                         
                         gap_up_pct = round(((lower_body - ramp_up_close) / ramp_up_close) * 100, 2)
-                        gap_up_occurrence_times = gap_up_occurrence_times_df.loc[trigger_alert_datetime, (ticker, RuntimeIndicator.COMPARE.value)]
+                        gap_up_occurrence_times = gap_up_occurrence_times_np[candle_panel.get_row_position(trigger_alert_datetime)]
                         
                         max_high_date = daily_high_df.idxmax()[(ticker, Indicator.HIGH.value)]
                         
@@ -239,18 +242,20 @@ class PreviousDayTopGainerContinuation(PatternAnalyser):
                                 logger.log_df_debug_msg(self.__daily_df)
                                 continue
                             
-                        message = ScannerResultMessage(title=display_msg,
-                                                       readout_msg=readout_msg,
-                                                       close=close,
-                                                       yesterday_close=yesterday_close,
-                                                       volume=volume, total_volume=total_volume,
-                                                       contract_info=contract_info,
-                                                       chart_dir=chart_dir,
-                                                       ticker=ticker,
-                                                       hit_scanner_datetime=trigger_alert_datetime.replace(second=0, microsecond=0),
-                                                       pattern=PATTERN_NAME,
-                                                       bar_size=BarSize.ONE_MINUTE)
-                        message_list.append(message)
+                        message_param = dict(title=display_msg,
+                                             readout_msg=readout_msg,
+                                             close=close,
+                                             yesterday_close=yesterday_close,
+                                             volume=volume, total_volume=total_volume,
+                                             contract_info=contract_info,
+                                             chart_future=chart_future,
+                                             ticker=ticker,
+                                             hit_scanner_datetime=trigger_alert_datetime.replace(second=0, microsecond=0),
+                                             pattern=PATTERN_NAME,
+                                             bar_size=BarSize.ONE_MINUTE)
+                        message_param_list.append(message_param)
+
+        message_list = self.get_scanner_result_message_list(message_param_list)
 
         if message_list:
             send_msg_start_time = time.time()
@@ -1,16 +1,17 @@
 import math
 import time
+import numpy as np
 import pandas as pd
 
 from pattern.pattern_analyser import PatternAnalyser
+from pattern.pattern_engine import PatternEngine
 
 from utils.datetime_util import convert_into_human_readable_time, convert_into_read_out_time, get_current_us_datetime
-from utils.dataframe_util import concat_daily_df_and_minute_df, get_ticker_to_occurrence_idx_list
-from utils.chart_util import get_candlestick_chart
+from utils.dataframe_util import concat_daily_df_and_minute_df
+from utils.chart_util import submit_candlestick_chart
 from utils.config_util import get_config
 from utils.logger import Logger
 
-from model.discord.scanner_result_message import ScannerResultMessage
 from model.discord.discord_message import DiscordMessage
 
 from constant.indicator.indicator import Indicator
@@ -40,14 +41,15 @@ LOWER_RANGE_TOLERANCE_FACTOR = 1 - (RANGE_TOLERANCE / 100)
 UPPER_RANGE_TOLERANCE_FACTOR = 1 + (RANGE_TOLERANCE / 100)
 
 class PreviousDayTopGainerSupport(PatternAnalyser): 
-    def __init__(self, daily_df: pd.DataFrame, minute_df: pd.DataFrame, ticker_to_contract_info_dict: dict, discord_client):
+    def __init__(self, daily_df: pd.DataFrame, minute_df: pd.DataFrame, ticker_to_contract_info_dict: dict, discord_client, pattern_engine: PatternEngine = None):
         super().__init__(discord_client)
         self.__daily_df = daily_df
         self.__minute_df = minute_df
         self.__ticker_to_contract_info_dict = ticker_to_contract_info_dict
+        self.__pattern_engine = pattern_engine if pattern_engine else PatternEngine(minute_df, daily_df)
     
     def analyse(self) -> None:
-        message_list = []
+        message_param_list = []
         logger.log_debug_msg('Previous day top gainers support scan')
 
         daily_close_pct_df = self.__daily_df.loc[:, idx[:, CustomisedIndicator.CLOSE_CHANGE.value]].apply(pd.to_numeric, errors='coerce')
@@ -62,6 +64,7 @@ class PreviousDayTopGainerSupport(PatternAnalyser):
         previous_day_top_gainer_ticker_list = max_daily_close_with_most_volume_ticker_series.index[max_daily_close_with_most_volume_ticker_series].get_level_values(0).tolist()
 
         latest_daily_candle_date = self.__daily_df.index[-1]
+        pattern_engine = self.__pattern_engine
         
         for ticker in previous_day_top_gainer_ticker_list:
             with pd.option_context('display.max_rows', None,
@@ -92,6 +95,8 @@ class PreviousDayTopGainerSupport(PatternAnalyser):
                     self._discord_client.send_message(DiscordMessage(content=concat_msg), DiscordChannel.PREVIOUS_DAYS_TOP_GAINER_SUPPORT_DATA_NOT_FOUND_LOG)
                 continue
                             
+            # Only built once a ticker has minute candles, the panel is shared by every ticker
+            candle_panel = pattern_engine.candle_panel
             ramp_up_candle_date = max_daily_volume_dt_index_series[(ticker, RuntimeIndicator.COMPARE.value)]
             candle_colour = daily_candle_colour_df.loc[ramp_up_candle_date, (ticker, CustomisedIndicator.CANDLE_COLOUR.value)]
             yesterday_close = self.__daily_df.loc[latest_daily_candle_date, (ticker, Indicator.CLOSE.value)]
@@ -109,20 +114,18 @@ class PreviousDayTopGainerSupport(PatternAnalyser):
                 support_open_lower_limit = ramp_up_open * LOWER_RANGE_TOLERANCE_FACTOR
                 support_open_upper_limit = ramp_up_open * UPPER_RANGE_TOLERANCE_FACTOR
                 
-                minute_low_df = ticker_minute_candle_df.loc[:, idx[:, Indicator.LOW.value]].rename(columns={Indicator.LOW.value: RuntimeIndicator.COMPARE.value})
-                minute_close_df = ticker_minute_candle_df.loc[:, idx[:, Indicator.CLOSE.value]].rename(columns={Indicator.CLOSE.value: RuntimeIndicator.COMPARE.value})
+                minute_low_np = candle_panel.get_value(ticker, Indicator.LOW)
+                minute_close_np = candle_panel.get_value(ticker, Indicator.CLOSE)
+                traded_non_flat_np = pattern_engine.traded_non_flat_boolean_np[:, candle_panel.get_ticker_position(ticker)]
                 
-                minute_colour_df = ticker_minute_candle_df.loc[:, idx[:, CustomisedIndicator.CANDLE_COLOUR.value]].rename(columns={CustomisedIndicator.CANDLE_COLOUR.value: RuntimeIndicator.COMPARE.value})
-                minute_volume_df = ticker_minute_candle_df.loc[:, idx[:, Indicator.VOLUME.value]].rename(columns={Indicator.VOLUME.value: RuntimeIndicator.COMPARE.value})
+                low_hit_support_low_boolean_np = (minute_low_np >= support_low_lower_limit) & (minute_low_np <= support_low_upper_limit) & traded_non_flat_np
+                close_hit_support_low_boolean_np = (minute_close_np >= support_low_lower_limit) & (minute_close_np <= support_low_upper_limit) & traded_non_flat_np
+                low_hit_support_open_boolean_np = (minute_low_np >= support_open_lower_limit) & (minute_low_np <= support_open_upper_limit) & traded_non_flat_np
+                close_hit_support_open_boolean_np = (minute_close_np >= support_open_lower_limit) & (minute_close_np <= support_open_upper_limit) & traded_non_flat_np
                 
-                low_hit_support_low_boolean_df = (minute_low_df >= support_low_lower_limit) & (minute_low_df <= support_low_upper_limit) & (minute_colour_df != CandleColour.GREY.value) & (minute_volume_df > 0)
-                close_hit_support_low_boolean_df = (minute_close_df >= support_low_lower_limit) & (minute_close_df <= support_low_upper_limit) & (minute_colour_df != CandleColour.GREY.value) & (minute_volume_df > 0)
-                low_hit_support_open_boolean_df = (minute_low_df >= support_open_lower_limit) & (minute_low_df <= support_open_upper_limit) & (minute_colour_df != CandleColour.GREY.value) & (minute_volume_df > 0)
-                close_hit_support_open_boolean_df = (minute_close_df >= support_open_lower_limit) & (minute_close_df <= support_open_upper_limit) & (minute_colour_df != CandleColour.GREY.value) & (minute_volume_df > 0)
+                hit_support_boolean_np = low_hit_support_low_boolean_np | close_hit_support_low_boolean_np | low_hit_support_open_boolean_np | close_hit_support_open_boolean_np
                 
-                hit_support_boolean_df = low_hit_support_low_boolean_df | close_hit_support_low_boolean_df | low_hit_support_open_boolean_df | close_hit_support_open_boolean_df
-                
-                ticker_to_occurrence_idx_list_dict = get_ticker_to_occurrence_idx_list(hit_support_boolean_df)
+                ticker_to_occurrence_idx_list_dict = pattern_engine.session_index.get_ticker_to_occurrence_datetime_list(hit_support_boolean_np[:, np.newaxis], [ticker])
                 occurrence_idx_list = ticker_to_occurrence_idx_list_dict[ticker]
                 check_alert_datetime_list = []
                 trigger_alert_datetime_list = []
@@ -188,13 +191,13 @@ class PreviousDayTopGainerSupport(PatternAnalyser):
 
                         one_minute_chart_start_time = time.time()
                         logger.log_debug_msg(f'Generate {ticker} previous day top gainer support one minute chart')
-                        chart_dir = get_candlestick_chart(candle_data_df=candle_chart_data_df,
-                                                          ticker=ticker, pattern=PATTERN_NAME, bar_size=BarSize.ONE_MINUTE,
-                                                          daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
-                                                          hit_scanner_datetime=trigger_alert_datetime,
-                                                          positive_offset=0, negative_offset=0,
-                                                          scatter_symbol=ScatterSymbol.SUPPORT, scatter_colour=ScatterColour.RED)
-                        logger.log_debug_msg(f'Generate {ticker} previous day top gainer support one minute chart finished time: {time.time() - one_minute_chart_start_time} seconds')
+                        chart_future = submit_candlestick_chart(candle_data_df=candle_chart_data_df,
+                                                                ticker=ticker, pattern=PATTERN_NAME, bar_size=BarSize.ONE_MINUTE,
+                                                                daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
+                                                                hit_scanner_datetime=trigger_alert_datetime,
+                                                                positive_offset=0, negative_offset=0,
+                                                                scatter_symbol=ScatterSymbol.SUPPORT, scatter_colour=ScatterColour.RED)
+                        logger.log_debug_msg(f'Generate {ticker} previous day top gainer support one minute chart submitted time: {time.time() - one_minute_chart_start_time} seconds')
 
                         hit_scanner_datetime_display = convert_into_human_readable_time(trigger_alert_datetime)
                         read_out_hit_support_time = convert_into_read_out_time(trigger_alert_datetime)
@@ -228,18 +231,20 @@ class PreviousDayTopGainerSupport(PatternAnalyser):
                             support = ramp_up_open
                             last_pct_change = round(((close - yesterday_close)/ yesterday_close) * 100, 2)
                         
-                        message = ScannerResultMessage(title=f'{ticker}\'s {indicator} is hitting previous day support of {support} ({ref_indicator}) ({last_pct_change}%) at {hit_scanner_datetime_display}',
-                                                       readout_msg=f'{" ".join(ticker)}\'s {indicator} is hitting previous day support of {support} at {read_out_hit_support_time}',
-                                                       close=close,
-                                                       yesterday_close=yesterday_close,
-                                                       volume=volume, total_volume=total_volume,
-                                                       contract_info=contract_info,
-                                                       chart_dir=chart_dir,
-                                                       ticker=ticker,
-                                                       hit_scanner_datetime=trigger_alert_datetime.replace(second=0, microsecond=0),
-                                                       pattern=PATTERN_NAME,
-                                                       bar_size=BarSize.ONE_MINUTE)
-                        message_list.append(message)
+                        message_param = dict(title=f'{ticker}\'s {indicator} is hitting previous day support of {support} ({ref_indicator}) ({last_pct_change}%) at {hit_scanner_datetime_display}',
+                                             readout_msg=f'{" ".join(ticker)}\'s {indicator} is hitting previous day support of {support} at {read_out_hit_support_time}',
+                                             close=close,
+                                             yesterday_close=yesterday_close,
+                                             volume=volume, total_volume=total_volume,
+                                             contract_info=contract_info,
+                                             chart_future=chart_future,
+                                             ticker=ticker,
+                                             hit_scanner_datetime=trigger_alert_datetime.replace(second=0, microsecond=0),
+                                             pattern=PATTERN_NAME,
+                                             bar_size=BarSize.ONE_MINUTE)
+                        message_param_list.append(message_param)
+
+        message_list = self.get_scanner_result_message_list(message_param_list)
 
         if message_list:
             send_msg_start_time = time.time()
@@ -2,7 +2,6 @@ import datetime
 import time
 import pandas as pd
 
-from model.discord.scanner_result_message import ScannerResultMessage
 from model.financial_data import FinancialData
 from model.offering_news import OfferingNews
 from model.discord.discord_message import DiscordMessage
@@ -11,8 +10,8 @@ from pattern.pattern_analyser import PatternAnalyser
 
 from utils.google_search_util import GoogleSearchUtil
 from utils.yfinance_util import get_financial_data
-from utils.discord_message_record_util import check_if_pattern_analysis_message_sent
-from utils.chart_util import get_candlestick_chart
+from utils.discord_message_record_util import get_sent_pattern_analysis_message_key_set
+from utils.chart_util import submit_candlestick_chart
 from utils.config_util import get_config
 from utils.logger import Logger
 
@@ -82,25 +81,19 @@ class YesterdayBullishDailyCandle(PatternAnalyser):
         
         sorted_ticker_to_close_pct_dict =  {k: v for k, v in sorted(ticker_to_close_pct_dict.items(), key=lambda item: item[1])}
         filtered_ticker_list = [ticker for ticker in sorted_ticker_to_close_pct_dict]
-        send_msg_ticker_list = []
+        check_start_time = time.time()
+        sent_key_set = get_sent_pattern_analysis_message_key_set([(ticker, self.__hit_scanner_date, PATTERN_NAME, BarSize.ONE_DAY.value) for ticker in filtered_ticker_list])
+        sent_ticker_list = [key[0] for key in sent_key_set]
+        logger.log_debug_msg(f'Check if {filtered_ticker_list} pattern analysis exists finish time: {time.time() - check_start_time} seconds')
         
-        for ticker in filtered_ticker_list:
-            check_start_time = time.time()
-            is_yesterday_bullish_candle_analysis_msg_sent = check_if_pattern_analysis_message_sent(ticker=ticker, 
-                                                                                                   hit_scanner_datetime=self.__hit_scanner_date, 
-                                                                                                   pattern=PATTERN_NAME, 
-                                                                                                   bar_size=BarSize.ONE_DAY.value)
-            logger.log_debug_msg(f'Check if {ticker} pattern analysis exists in db finish time: {time.time() - check_start_time} seconds')
-            
-            if not is_yesterday_bullish_candle_analysis_msg_sent:
-                send_msg_ticker_list.append(ticker)
+        send_msg_ticker_list = [ticker for ticker in filtered_ticker_list if ticker not in sent_ticker_list]
         
         logger.log_debug_msg(f'Send bullish daily candle ticker list: {send_msg_ticker_list}')
         
         return send_msg_ticker_list
     
     def analyse(self) -> None:
-        message_list = []
+        message_param_list = []
         logger.log_debug_msg('Bullish candle scan')
         
         filtered_ticker_list = self.__get_and_update_filtered_result() 
@@ -132,27 +125,29 @@ class YesterdayBullishDailyCandle(PatternAnalyser):
             volume = self.__daily_df.loc[self.__hit_scanner_date.strftime('%Y-%m-%d'), (ticker, Indicator.VOLUME.value)]
             
             chart_start_time = time.time()
-            chart_dir = get_candlestick_chart(candle_data_df=self.__daily_df,
-                                              ticker=ticker, pattern=PATTERN_NAME, bar_size=BarSize.ONE_DAY,
-                                              hit_scanner_datetime=self.__hit_scanner_date,
-                                              scatter_symbol=ScatterSymbol.POP, scatter_colour=ScatterColour.CYAN,
-                                              candle_comment_list=[CustomisedIndicator.CLOSE_CHANGE, CustomisedIndicator.GAP_PCT_CHANGE, Indicator.CLOSE, Indicator.VOLUME])
-            logger.log_debug_msg(f'Generate {ticker} chart time, {time.time() - chart_start_time} seconds')
+            chart_future = submit_candlestick_chart(candle_data_df=self.__daily_df,
+                                                    ticker=ticker, pattern=PATTERN_NAME, bar_size=BarSize.ONE_DAY,
+                                                    hit_scanner_datetime=self.__hit_scanner_date,
+                                                    scatter_symbol=ScatterSymbol.POP, scatter_colour=ScatterColour.CYAN,
+                                                    candle_comment_list=[CustomisedIndicator.CLOSE_CHANGE, CustomisedIndicator.GAP_PCT_CHANGE, Indicator.CLOSE, Indicator.VOLUME])
+            logger.log_debug_msg(f'Generate {ticker} chart submitted time, {time.time() - chart_start_time} seconds')
             
-            message = ScannerResultMessage(title=f'{ticker}\'s yesterday\'s bullish daily candle, up {round(close_pct, 2)}% ({self.__hit_scanner_date})',
-                                           readout_msg=f'{" ".join(ticker)} yesterday\'s bullish daily candle, up {round(close_pct, 2)}%',
-                                           close=close,
-                                           yesterday_close=close,
-                                           total_volume=volume,
-                                           contract_info=contract_info,
-                                           chart_dir=chart_dir,
-                                           financial_data=financial_data,
-                                           offering_news=offering_news,
-                                           ticker=ticker,
-                                           hit_scanner_datetime=self.__hit_scanner_date,
-                                           pattern=PATTERN_NAME,
-                                           bar_size=BarSize.ONE_DAY.value)
-            message_list.append(message)
+            message_param = dict(title=f'{ticker}\'s yesterday\'s bullish daily candle, up {round(close_pct, 2)}% ({self.__hit_scanner_date})',
+                                 readout_msg=f'{" ".join(ticker)} yesterday\'s bullish daily candle, up {round(close_pct, 2)}%',
+                                 close=close,
+                                 yesterday_close=close,
+                                 total_volume=volume,
+                                 contract_info=contract_info,
+                                 chart_future=chart_future,
+                                 financial_data=financial_data,
+                                 offering_news=offering_news,
+                                 ticker=ticker,
+                                 hit_scanner_datetime=self.__hit_scanner_date,
+                                 pattern=PATTERN_NAME,
+                                 bar_size=BarSize.ONE_DAY.value)
+            message_param_list.append(message_param)
+        
+        message_list = self.get_scanner_result_message_list(message_param_list)
         
         if message_list:
             send_msg_start_time = time.time()
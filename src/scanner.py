@@ -1,5 +1,5 @@
 import datetime
-import math
+import threading
 import time
 import pandas as pd
 import requests
@@ -7,6 +7,9 @@ import requests
 from module.discord_chatbot_client import DiscordChatBotClient
 
 from datasource.ib_connector import IBConnector
+from datasource.candle_store import CandleStore
+from datasource.ticker_candle_cache import TickerCandleCache
+from datasource.ib_market_data_stream import IBMarketDataStream
 
 from pattern.initial_pop import InitialPop
 from pattern.initial_dip import InitialDip
@@ -14,14 +17,16 @@ from pattern.previous_days_top_gainer_support import PreviousDayTopGainerSupport
 from pattern.previous_days_top_gainer_continuation import PreviousDayTopGainerContinuation
 from pattern.yesterday_bullish_daily_candle import YesterdayBullishDailyCandle
 from pattern.intra_day_breakout import IntraDayBreakout
+from pattern.pattern_engine import PatternEngine
 
 from model.discord.discord_message import DiscordMessage
-from module.scanner_thread_wrapper import ScannerThreadWrapper
 
 from utils.previous_day_top_gainer_util import get_previous_day_top_gainer_list
 from utils.filter_util import get_ib_scanner_filter
-from utils.datetime_util import PRE_MARKET_START_DATETIME, get_current_us_datetime, get_us_business_day
+from utils.datetime_util import get_current_us_datetime, get_pre_market_start_datetime, get_us_business_day
 from utils.dataframe_util import append_customised_indicator
+from utils.customised_indicator_engine import CustomisedIndicatorEngine
+from utils.profiler import profile_span
 from utils.config_util import get_config
 from utils.logger import Logger
 
@@ -39,18 +44,22 @@ CONNECTION_FAIL_RETRY_INTERVAL = 10
 MAX_MARKET_CAP_FOR_DAY_TRADE_SCANNER = 1e6 * 500
 MIN_PRICE_FOR_DAY_TRADE_SCANNER = 0.3
 MAX_NO_OF_DAY_TRADE_SCANNER_RESULT = 15
-IB_TOP_GAINER_FILTER = get_ib_scanner_filter(ScannerTarget.TOP_GAINER,
-                                       min_price = MIN_PRICE_FOR_DAY_TRADE_SCANNER, 
-                                       percent_change_param = 10, 
-                                       min_usd_volume = 20000, 
-                                       max_market_cap = MAX_MARKET_CAP_FOR_DAY_TRADE_SCANNER, 
-                                       additional_filter_list = [])
-IB_TOP_LOSER_FILTER = get_ib_scanner_filter(ScannerTarget.TOP_LOSER,
-                                      min_price = MIN_PRICE_FOR_DAY_TRADE_SCANNER, 
-                                      percent_change_param = -10, 
-                                      min_usd_volume = 20000, 
-                                      max_market_cap = MAX_MARKET_CAP_FOR_DAY_TRADE_SCANNER, 
-                                      additional_filter_list = [])
+# Built per request, the scan code switches to after hours scan code after 16:00
+def get_ib_top_gainer_filter() -> dict:
+    return get_ib_scanner_filter(ScannerTarget.TOP_GAINER,
+                                 min_price = MIN_PRICE_FOR_DAY_TRADE_SCANNER, 
+                                 percent_change_param = 10, 
+                                 min_usd_volume = 20000, 
+                                 max_market_cap = MAX_MARKET_CAP_FOR_DAY_TRADE_SCANNER, 
+                                 additional_filter_list = [])
+
+def get_ib_top_loser_filter() -> dict:
+    return get_ib_scanner_filter(ScannerTarget.TOP_LOSER,
+                                 min_price = MIN_PRICE_FOR_DAY_TRADE_SCANNER, 
+                                 percent_change_param = -10, 
+                                 min_usd_volume = 20000, 
+                                 max_market_cap = MAX_MARKET_CAP_FOR_DAY_TRADE_SCANNER, 
+                                 additional_filter_list = [])
 
 SHOW_TOP_GAINER_SCANNER_DISCORD_DEBUG_LOG = get_config('TOP_GAINER_SCANNER', 'SHOW_DISCORD_DEBUG_LOG')
 SHOW_TOP_LOSER_SCANNER_DISCORD_DEBUG_LOG = get_config('TOP_LOSER_SCANNER', 'SHOW_DISCORD_DEBUG_LOG')
@@ -64,16 +73,31 @@ YESTERDAY_BULLISH_DAILY_CANDLE_DAYS = get_config('YESTERDAY_BULLISH_DAILY_CANDLE
 MIN_MULTI_DAYS_CLOSE_CHANGE_PCT = get_config('MULTI_DAYS_TOP_GAINER_SCAN_PARAM', 'MIN_MULTI_DAYS_CLOSE_CHANGE_PCT')
 MULTI_DAYS_TOP_GAINER_DAILY_CANDLE_DAYS = get_config('MULTI_DAYS_TOP_GAINER_SCAN_PARAM', 'DAILY_CANDLE_DAYS')
 
+DAILY_CANDLE_CACHE_MAX_NO_OF_TICKER = get_config('CANDLE_CACHE', 'DAILY_CANDLE_MAX_NO_OF_TICKER')
+MINUTE_CANDLE_CACHE_MAX_NO_OF_TICKER = get_config('CANDLE_CACHE', 'MINUTE_CANDLE_MAX_NO_OF_TICKER')
+YESTERDAY_MINUTE_CANDLE_PERIOD_IN_MINUTE = 960
+
 #IB_CLOSEST_TO_HALT_FILTER = get_ib_scanner_filter(ScanCode)
 
 class Scanner:
-    def __init__(self, discord_client: DiscordChatBotClient) -> None:
+    def __init__(self, discord_client: DiscordChatBotClient, ib_connector: IBConnector = None, market_data_stream: IBMarketDataStream = None) -> None:
         self.__discord_client = discord_client
-        self.__ib_connector = IBConnector()
-        
-        self.__daily_canlde_df = pd.DataFrame()
-        self.__yesterday_top_gainier_minute_candle_df_dict = {
-            BarSize.ONE_MINUTE: pd.DataFrame()
+        self.__ib_connector = ib_connector if ib_connector else IBConnector()
+        
+        self.__daily_candle_cache = TickerCandleCache('daily', DAILY_CANDLE_CACHE_MAX_NO_OF_TICKER)
+        self.__daily_candle_lock = threading.Lock()
+        self.__top_gainer_candle_store = CandleStore(market_data_stream)
+        self.__top_loser_candle_store = CandleStore(market_data_stream)
+        self.__multi_days_top_gainer_candle_store = CandleStore(market_data_stream)
+        self.__top_gainer_indicator_engine = CustomisedIndicatorEngine()
+        self.__top_loser_indicator_engine = CustomisedIndicatorEngine()
+        self.__multi_days_top_gainer_indicator_engine = CustomisedIndicatorEngine()
+        # (min pct change, start date, end date) -> (top gainer ticker set, contract list), cleared when the day changes
+        self.__top_gainer_contract_cache_dict = {}
+        self.__top_gainer_contract_cache_date = None
+        self.__top_gainer_contract_cache_lock = threading.Lock()
+        self.__yesterday_top_gainer_minute_candle_cache_dict = {
+            BarSize.ONE_MINUTE: TickerCandleCache('yesterday_top_gainer_one_minute', MINUTE_CANDLE_CACHE_MAX_NO_OF_TICKER)
         }
         
     @property
@@ -84,6 +108,9 @@ class Scanner:
     def ib_connector(self, ib_connector):
         self.__ib_connector = ib_connector
     
+    def get_candle_cache_stats(self) -> list:
+        return [self.__daily_candle_cache.get_stats()] + [minute_candle_cache.get_stats() for minute_candle_cache in self.__yesterday_top_gainer_minute_candle_cache_dict.values()]
+
     def send_ib_preflight_request(self):
         try:
             self.__ib_connector.receive_brokerage_account()
@@ -98,36 +125,16 @@ class Scanner:
             raise check_auth_exception
     
     def scan_multi_days_top_gainer(self):
-        thread = ScannerThreadWrapper(scan=self.__analyse_multi_days_top_gainer,
-                                      name='multi_day_top_gainer_scan',
-                                      ib_connector=self.__ib_connector,
-                                      discord_client=self.__discord_client)
-        thread.start()
-        #thread.join()
+        self.__analyse_multi_days_top_gainer(self.__ib_connector, self.__discord_client)
         
     def scan_yesterday_top_gainer(self):
-        thread = ScannerThreadWrapper(scan=self.__analyse_yesterday_top_gainer, 
-                                      name='yesterday_top_gainer_scan',
-                                      ib_connector=self.__ib_connector,
-                                      discord_client=self.__discord_client)
-        thread.start()
-        #thread.join()
+        self.__analyse_yesterday_top_gainer(self.__ib_connector, self.__discord_client)
     
-    def scan_intra_day_top_gainer(self):
-        thread = ScannerThreadWrapper(scan=self.__analyse_intra_day_top_gainer, 
-                                      name='intra_day_top_gainer_scan',
-                                      ib_connector=self.__ib_connector,
-                                      discord_client=self.__discord_client)
-        thread.start()
-        #thread.join()
+    def scan_intra_day_top_gainer(self) -> list:
+        return self.__analyse_intra_day_top_gainer(self.__ib_connector, self.__discord_client)
     
-    def scan_intra_day_top_loser(self):
-        thread = ScannerThreadWrapper(scan=self.__analyse_intra_day_top_loser, 
-                                      name='intra_day_top_loser_scan',
-                                      ib_connector=self.__ib_connector,
-                                      discord_client=self.__discord_client)
-        thread.start()
-        #thread.join()
+    def scan_intra_day_top_loser(self) -> list:
+        return self.__analyse_intra_day_top_loser(self.__ib_connector, self.__discord_client)
     
     def __analyse_multi_days_top_gainer(self, ib_connector: IBConnector,
                                              discord_client: DiscordChatBotClient):
@@ -154,20 +161,26 @@ class Scanner:
             logger.log_debug_msg(multi_days_top_gainers_df)
 
         intra_day_one_minute_candle_df = self.__retrieve_intra_day_minute_candle(ib_connector=ib_connector,
+                                                                                 candle_store=self.__multi_days_top_gainer_candle_store,
+                                                                                 indicator_engine=self.__multi_days_top_gainer_indicator_engine,
                                                                                  contract_list=request_candle_contract_list, 
                                                                                  bar_size=BarSize.ONE_MINUTE)
     
+        pattern_engine = PatternEngine(minute_df=intra_day_one_minute_candle_df, daily_df=multi_days_top_gainers_df)
         previous_day_top_gainer_support_analyser = PreviousDayTopGainerSupport(daily_df=multi_days_top_gainers_df,
                                                                                minute_df=intra_day_one_minute_candle_df,
                                                                                ticker_to_contract_info_dict=ib_connector.get_ticker_to_contract_dict(), 
-                                                                               discord_client=discord_client)
-        previous_day_top_gainer_support_analyser.analyse()
+                                                                               discord_client=discord_client,
+                                                                               pattern_engine=pattern_engine)
+        pattern_engine.register('previous_day_top_gainer_support_analysis', previous_day_top_gainer_support_analyser)
         
         previous_day_top_gainer_continuation_analyser = PreviousDayTopGainerContinuation(daily_df=multi_days_top_gainers_df,
                                                                                          minute_df=intra_day_one_minute_candle_df,
                                                                                          ticker_to_contract_info_dict=ib_connector.get_ticker_to_contract_dict(), 
-                                                                                         discord_client=discord_client)
-        previous_day_top_gainer_continuation_analyser.analyse()
+                                                                                         discord_client=discord_client,
+                                                                                         pattern_engine=pattern_engine)
+        pattern_engine.register('previous_day_top_gainer_continuation_analysis', previous_day_top_gainer_continuation_analyser)
+        pattern_engine.analyse()
         logger.log_debug_msg('Multi-day top gainer scan completed')
         
     def __analyse_yesterday_top_gainer(self, ib_connector: IBConnector, 
@@ -204,7 +217,8 @@ class Scanner:
                                                                               daily_df=previous_day_top_gainers_df,
                                                                               ticker_to_contract_info_dict=ib_connector.get_ticker_to_contract_dict(), 
                                                                               discord_client=discord_client)
-        yesterday_bullish_daily_candle_analyser.analyse()
+        with profile_span('yesterday_bullish_daily_candle_analysis'):
+            yesterday_bullish_daily_candle_analyser.analyse()
         
         # intra_day_one_minute_candle_df = self.__retrieve_intra_day_minute_candle(ib_connector=ib_connector,
         #                                                                          contract_list=yesterday_top_gainer_contract_list, 
@@ -225,10 +239,10 @@ class Scanner:
         logger.log_debug_msg('Yesterday top gainer scan completed')
         
     def __analyse_intra_day_top_gainer(self, ib_connector: IBConnector,
-                                             discord_client: DiscordChatBotClient) -> None:
+                                             discord_client: DiscordChatBotClient) -> list:
         logger.log_debug_msg('Intra day top gainer scan starts')
 
-        contract_list = self.__ib_connector.get_screener_results(MAX_NO_OF_DAY_TRADE_SCANNER_RESULT, IB_TOP_GAINER_FILTER)
+        contract_list = self.__ib_connector.get_screener_results(MAX_NO_OF_DAY_TRADE_SCANNER_RESULT, get_ib_top_gainer_filter())
         
         logger.log_debug_msg(f'Fetch top gainer snapshot')
         ib_connector.update_contract_info(contract_list)
@@ -239,6 +253,8 @@ class Scanner:
         
         logger.log_debug_msg('Retrieve top gainer one minute candle')
         one_minute_candle_df = self.__retrieve_intra_day_minute_candle(ib_connector=ib_connector,
+                                                                       candle_store=self.__top_gainer_candle_store,
+                                                                       indicator_engine=self.__top_gainer_indicator_engine,
                                                                        contract_list=contract_list, 
                                                                        bar_size=BarSize.ONE_MINUTE)
         logger.log_debug_msg(f'Top gainer one minute candle ticker: {one_minute_candle_df.columns.get_level_values(0).unique().tolist()}')
@@ -263,26 +279,33 @@ class Scanner:
             discord_client.send_message(DiscordMessage(content=f'{[contract["symbol"] for contract in contract_list]}'), DiscordChannel.TOP_GAINER_SCANNER_LIST)
             logger.log_debug_msg(f'Send top gainer scanner result time: {time.time() - send_msg_start_time}')
 
+        pattern_engine = PatternEngine(minute_df=one_minute_candle_df, daily_df=daily_df)
         initial_pop_analyser = InitialPop(bar_size=BarSize.ONE_MINUTE,
                                           historical_data_df=one_minute_candle_df, 
                                           daily_df=daily_df, 
                                           ticker_to_contract_info_dict=ib_connector.get_ticker_to_contract_dict(), 
-                                          discord_client=discord_client)
-        initial_pop_analyser.analyse()
+                                          discord_client=discord_client,
+                                          pattern_engine=pattern_engine)
+        pattern_engine.register('initial_pop_analysis', initial_pop_analyser)
         
         intra_day_breakout_analyser = IntraDayBreakout(bar_size=BarSize.ONE_MINUTE,
                                                        historical_data_df=one_minute_candle_df,
                                                        daily_df=daily_df,
                                                        ticker_to_contract_info_dict=ib_connector.get_ticker_to_contract_dict(),
-                                                       discord_client=discord_client)
-        intra_day_breakout_analyser.analyse()
+                                                       discord_client=discord_client,
+                                                       pattern_engine=pattern_engine)
+        pattern_engine.register('intra_day_breakout_analysis', intra_day_breakout_analyser)
+        pattern_engine.analyse()
+
+        # The scan scheduler paces the next cycle by how much the scanner result changes
+        return [contract['symbol'] for contract in contract_list]
         
     
     def __analyse_intra_day_top_loser(self, ib_connector: IBConnector,
-                                            discord_client: DiscordChatBotClient) -> None:
+                                            discord_client: DiscordChatBotClient) -> list:
         logger.log_debug_msg('Intra day top loser scan starts')
         
-        contract_list = ib_connector.get_screener_results(MAX_NO_OF_DAY_TRADE_SCANNER_RESULT, IB_TOP_LOSER_FILTER)
+        contract_list = ib_connector.get_screener_results(MAX_NO_OF_DAY_TRADE_SCANNER_RESULT, get_ib_top_loser_filter())
         
         logger.log_debug_msg(f'Fetch top loser snapshot')
         ib_connector.update_contract_info(contract_list)
@@ -293,6 +316,8 @@ class Scanner:
         
         logger.log_debug_msg('Retrieve top loser one minute candle')
         one_minute_candle_df = self.__retrieve_intra_day_minute_candle(ib_connector=ib_connector,
+                                                                       candle_store=self.__top_loser_candle_store,
+                                                                       indicator_engine=self.__top_loser_indicator_engine,
                                                                        contract_list=contract_list, 
                                                                        bar_size=BarSize.ONE_MINUTE)
         logger.log_debug_msg(f'Top loser one minute candle ticker: {one_minute_candle_df.columns.get_level_values(0).unique().tolist()}')
@@ -317,14 +342,18 @@ class Scanner:
             discord_client.send_message(DiscordMessage(content=f'{[contract["symbol"] for contract in contract_list]}'), DiscordChannel.TOP_LOSER_SCANNER_LIST)
             logger.log_debug_msg(f'Send top loser scanner result time: {time.time() - send_msg_start_time}')
         
+        pattern_engine = PatternEngine(minute_df=one_minute_candle_df, daily_df=daily_df)
         initial_dip_analyser = InitialDip(bar_size=BarSize.ONE_MINUTE,
                                           historical_data_df=one_minute_candle_df, 
                                           daily_df=daily_df, 
                                           ticker_to_contract_info_dict=ib_connector.get_ticker_to_contract_dict(), 
-                                          discord_client=discord_client)
-        initial_dip_analyser.analyse()
+                                          discord_client=discord_client,
+                                          pattern_engine=pattern_engine)
+        pattern_engine.register('initial_dip_analysis', initial_dip_analyser)
+        pattern_engine.analyse()
         
         logger.log_debug_msg('Intra-day top loser scan completed')
+        return [contract['symbol'] for contract in contract_list]
     
     def scan_closest_to_halt(self):
         pass
@@ -333,23 +362,28 @@ class Scanner:
         pass
 
     def __retrieve_intra_day_minute_candle(self, ib_connector: IBConnector,
+                                                 candle_store: CandleStore,
+                                                 indicator_engine: CustomisedIndicatorEngine,
                                                  contract_list: list, 
                                                  bar_size: BarSize) -> pd.DataFrame:
         us_current_datetime = get_current_us_datetime().replace(microsecond=0, second=0)
-        historical_data_interval_in_minute = (us_current_datetime - PRE_MARKET_START_DATETIME).total_seconds() / 60
+        pre_market_start_datetime = get_pre_market_start_datetime()
+        historical_data_interval_in_minute = (us_current_datetime - pre_market_start_datetime).total_seconds() / 60
         logger.log_debug_msg(f'Historical candle data retrieval period: {historical_data_interval_in_minute} minutes')
 
         if historical_data_interval_in_minute < 1:
             logger.log_debug_msg('Historical candle data retrieval retrieval period is less than 1 minute', with_std_out=True)
             return None
         else:
-            candle_df = ib_connector.get_historical_candle_df(contract_list=contract_list, 
-                                                              period=f'{math.floor(historical_data_interval_in_minute)}min', 
-                                                              bar_size=bar_size, 
-                                                              outside_rth='true')
+            candle_df = candle_store.get_candle_df(ib_connector=ib_connector,
+                                                   contract_list=contract_list,
+                                                   bar_size=bar_size,
+                                                   range_start_datetime=pre_market_start_datetime,
+                                                   range_end_datetime=us_current_datetime)
             
             if candle_df is not None and not candle_df.empty:
-                return append_customised_indicator(candle_df)
+                with profile_span('customised_indicator'):
+                    return indicator_engine.append_customised_indicator(candle_df)
             else:
                 return pd.DataFrame()
     
@@ -357,20 +391,16 @@ class Scanner:
                                                  contract_list: list, 
                                                  bar_size: BarSize, 
                                                  outside_rth: bool = True):
-        candle_request_contract_list = []
         contract_ticker_list = [contract['symbol'] for contract in contract_list]
-        minute_candle_df = self.__yesterday_top_gainier_minute_candle_df_dict[bar_size]
-        yesterday_top_gainer_ticker_list = list(minute_candle_df.columns.get_level_values(0).unique())
-        
-        for contract in contract_list:
-            if contract['symbol'] not in yesterday_top_gainer_ticker_list:
-                candle_request_contract_list.append(contract)
-        
-        select_contract_ticker_list = []
+        candle_retrieval_end_datetime = get_us_business_day(offset_day=-1)
+        minute_candle_cache = self.__yesterday_top_gainer_minute_candle_cache_dict[bar_size]
+        ticker_to_candle_df_dict, missing_ticker_list = minute_candle_cache.get(ticker_list=contract_ticker_list, 
+                                                                                end_date=candle_retrieval_end_datetime.date(), 
+                                                                                no_of_period=YESTERDAY_MINUTE_CANDLE_PERIOD_IN_MINUTE, 
+                                                                                outside_rth=outside_rth)
+        candle_request_contract_list = [contract for contract in contract_list if contract['symbol'] in missing_ticker_list]
 
         if candle_request_contract_list:
-            candle_retrieval_end_datetime = get_us_business_day(offset_day=-1)
-            
             if outside_rth:
                 outside_rth_str = 'true'
                 candle_retrieval_end_datetime = candle_retrieval_end_datetime.replace(hour=20, minute=0, second=0, microsecond=0)
@@ -379,68 +409,79 @@ class Scanner:
                 candle_retrieval_end_datetime = candle_retrieval_end_datetime.replace(hour=16, minute=0, second=0, microsecond=0)
 
             candle_df = ib_connector.get_historical_candle_df(contract_list=candle_request_contract_list, 
-                                                                     period='960min', 
+                                                                     period=f'{YESTERDAY_MINUTE_CANDLE_PERIOD_IN_MINUTE}min', 
                                                                      bar_size=bar_size, 
                                                                      outside_rth=outside_rth_str, 
                                                                      candle_retrieval_end_datetime=candle_retrieval_end_datetime)
             
             if candle_df is not None and not candle_df.empty:
-                complete_df = append_customised_indicator(candle_df)
+                with profile_span('customised_indicator'):
+                    complete_df = append_customised_indicator(candle_df)
             
-                self.__yesterday_top_gainier_minute_candle_df_dict[bar_size] = pd.concat([self.__yesterday_top_gainier_minute_candle_df_dict[bar_size],
-                                                                                          complete_df], axis=1)
+                ticker_to_candle_df_dict.update(minute_candle_cache.put(candle_df=complete_df, 
+                                                                        end_date=candle_retrieval_end_datetime.date(), 
+                                                                        no_of_period=YESTERDAY_MINUTE_CANDLE_PERIOD_IN_MINUTE, 
+                                                                        outside_rth=outside_rth))
         
-        result_df_ticker_list = self.__yesterday_top_gainier_minute_candle_df_dict[bar_size].columns.get_level_values(0).unique()
-        
-        for ticker in contract_ticker_list:
-            if ticker in result_df_ticker_list:
-                select_contract_ticker_list.append(ticker)
-            else:
-                logger.log_debug_msg(f'Exclude ticker {ticker} from yesterday_top_gainer_minute_candle_df[{bar_size}], no historical data found', with_std_out=True)
-        
-        return self.__yesterday_top_gainier_minute_candle_df_dict[bar_size].loc[:, idx[select_contract_ticker_list, :]]
+        return self.__concat_ticker_candle_df(ticker_to_candle_df_dict, contract_ticker_list, f'yesterday_top_gainer_minute_candle_df[{bar_size}]')
     
     def __get_daily_candle(self, ib_connector: IBConnector, 
                                  contract_list: list, 
                                  offset_day: int, 
                                  outside_rth: bool = False, 
                                  candle_retrieval_end_datetime: datetime.datetime = None) -> pd.DataFrame:
-        candle_request_contract_list = []
-        contract_ticker_list = [contract['symbol'] for contract in contract_list]
-        daily_candle_df_ticker_list = list(self.__daily_canlde_df.columns.get_level_values(0).unique())
+        with self.__daily_candle_lock:
+            contract_ticker_list = [contract['symbol'] for contract in contract_list]
+            # Candles up to now and up to a past day are different entries, the one up to now is invalidated on date rollover
+            end_date = candle_retrieval_end_datetime.date() if candle_retrieval_end_datetime else get_current_us_datetime().date()
+            ticker_to_candle_df_dict, missing_ticker_list = self.__daily_candle_cache.get(ticker_list=contract_ticker_list, 
+                                                                                          end_date=end_date, 
+                                                                                          no_of_period=offset_day, 
+                                                                                          outside_rth=outside_rth)
+            candle_request_contract_list = [contract for contract in contract_list if contract['symbol'] in missing_ticker_list]
+
+            if candle_request_contract_list:    
+                if outside_rth:
+                    outside_rth_str = 'true' 
+                else:
+                    outside_rth_str = 'false'
+            
+                candle_df = ib_connector.get_historical_candle_df(contract_list=candle_request_contract_list, 
+                                                                  period=f'{offset_day}d', 
+                                                                  bar_size=BarSize.ONE_DAY, 
+                                                                  outside_rth=outside_rth_str, 
+                                                                  candle_retrieval_end_datetime=candle_retrieval_end_datetime)
+                if candle_df is not None and not candle_df.empty:
+                    with profile_span('customised_indicator'):
+                        complete_df = append_customised_indicator(candle_df)
 
-        for contract in contract_list:
-            if contract['symbol'] not in daily_candle_df_ticker_list:
-                candle_request_contract_list.append(contract)
+                    ticker_to_candle_df_dict.update(self.__daily_candle_cache.put(candle_df=complete_df, 
+                                                                                  end_date=end_date, 
+                                                                                  no_of_period=offset_day, 
+                                                                                  outside_rth=outside_rth))
 
-        if candle_request_contract_list:    
-            if outside_rth:
-                outside_rth_str = 'true' 
-            else:
-                outside_rth_str = 'false'
-            
-            candle_df = ib_connector.get_historical_candle_df(contract_list=candle_request_contract_list, 
-                                                              period=f'{offset_day}d', 
-                                                              bar_size=BarSize.ONE_DAY, 
-                                                              outside_rth=outside_rth_str, 
-                                                              candle_retrieval_end_datetime=candle_retrieval_end_datetime)
-            if candle_df is not None and not candle_df.empty:
-                complete_df = append_customised_indicator(candle_df)
+                logger.log_debug_msg(f'Daily candle cache stats: {self.__daily_candle_cache.get_stats()}')
+
+            daily_candle_df = self.__concat_ticker_candle_df(ticker_to_candle_df_dict, contract_ticker_list, 'daily_df')
+            if daily_candle_df.empty:
+                return daily_candle_df
 
-                self.__daily_canlde_df = pd.concat([self.__daily_canlde_df,
-                                                    complete_df], axis=1)
+            start_date_range = get_us_business_day(-offset_day, candle_retrieval_end_datetime).date()
+            return daily_candle_df.loc[start_date_range:]
 
-        result_df_ticker_list = self.__daily_canlde_df.columns.get_level_values(0).unique()
-        select_contract_ticker_list = []
+    def __concat_ticker_candle_df(self, ticker_to_candle_df_dict: dict, contract_ticker_list: list, candle_df_name: str) -> pd.DataFrame:
+        candle_df_list = []
         
         for ticker in contract_ticker_list:
-            if ticker in result_df_ticker_list:
-                select_contract_ticker_list.append(ticker)
+            if ticker in ticker_to_candle_df_dict:
+                candle_df_list.append(ticker_to_candle_df_dict[ticker])
             else:
-                logger.log_debug_msg(f'Exclude ticker {ticker} from daily_df, no historical data found', with_std_out=True)
-
-        start_date_range = get_us_business_day(-offset_day, candle_retrieval_end_datetime).date()
-        return self.__daily_canlde_df.loc[start_date_range:, idx[select_contract_ticker_list, :]]
+                logger.log_debug_msg(f'Exclude ticker {ticker} from {candle_df_name}, no historical data found', with_std_out=True)
+        
+        if not candle_df_list:
+            return pd.DataFrame()
+        
+        return pd.concat(candle_df_list, axis=1)
 
     def __get_previous_day_top_gainers_contracts(self, ib_connector: IBConnector,
                                                        min_pct_change,
@@ -459,8 +500,28 @@ class Scanner:
             return []
         
         ticker_list = list(set([top_gainer[0] for top_gainer in previous_day_top_gainer_list]))
+        cache_key = (min_pct_change, retrieval_start_datetime.date(), retrieval_end_datetime.date())
+        current_date = get_current_us_datetime().date()
+
+        with self.__top_gainer_contract_cache_lock:
+            if self.__top_gainer_contract_cache_date != current_date:
+                self.__top_gainer_contract_cache_dict.clear()
+                self.__top_gainer_contract_cache_date = current_date
+
+            cached_ticker_set, previous_day_top_gainer_contract_list = self.__top_gainer_contract_cache_dict.get(cache_key, (None, None))
+
+            # Only a new top gainer of the current day needs the contracts to be resolved again
+            if cached_ticker_set != set(ticker_list):
+                previous_day_top_gainer_contract_list = ib_connector.get_security_by_tickers(ticker_list)
+                resolved_ticker_set = {contract['symbol'] for contract in previous_day_top_gainer_contract_list} | set(ib_connector.get_not_found_ticker_list(ticker_list))
+
+                # Tickers dropped by a failed request are resolved again on the next cycle instead of being missed for the day
+                if resolved_ticker_set >= set(ticker_list):
+                    self.__top_gainer_contract_cache_dict[cache_key] = (set(ticker_list), previous_day_top_gainer_contract_list)
+                else:
+                    logger.log_debug_msg(f'Skip caching top gainer contracts, unresolved ticker list: {sorted(set(ticker_list) - resolved_ticker_set)}')
 
-        previous_day_top_gainer_contract_list = ib_connector.get_security_by_tickers(ticker_list)
+        # Snapshot fields are refreshed by their own TTL in the contract metadata store
         ib_connector.update_contract_info(previous_day_top_gainer_contract_list)
         ticker_to_contract_dict = ib_connector.get_ticker_to_contract_dict()
         
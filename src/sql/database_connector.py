@@ -0,0 +1,12 @@
+from utils.config_util import get_config
+
+from constant.database_backend import DatabaseBackend
+
+DATABASE_BACKEND = get_config('DATABASE', 'BACKEND')
+
+if DATABASE_BACKEND == DatabaseBackend.SQLITE.value:
+    from sql.sqlite_connector import execute_in_transaction
+    from constant.query.sqlite_query import SqliteQuery as DatabaseQuery
+else:
+    from sql.oracle_connector import execute_in_transaction
+    from constant.query.oracle_query import OracleQuery as DatabaseQuery
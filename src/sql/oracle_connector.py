@@ -1,8 +1,12 @@
+from contextlib import contextmanager
+import threading
+import time
 import oracledb
 
 from sql.execute_query_impl import ExecuteQueryImpl
 
 from utils.config_util import get_config
+from utils.profiler import profile_span
 from utils.logger import Logger
 
 logger = Logger()
@@ -13,36 +17,101 @@ SID = get_config('ORACLE_DB', 'SID')
 USERNAME = get_config('ORACLE_DB', 'USERNAME')
 PASSWORD = get_config('ORACLE_DB', 'PASSWORD')
 
-LOGIN_CREDENTIALS = dict(host=HOSTNAME, 
-                         port=PORT, 
+POOL_MIN_SIZE = get_config('ORACLE_DB', 'POOL_MIN_SIZE')
+POOL_MAX_SIZE = get_config('ORACLE_DB', 'POOL_MAX_SIZE')
+POOL_INCREMENT = get_config('ORACLE_DB', 'POOL_INCREMENT')
+POOL_PING_INTERVAL = get_config('ORACLE_DB', 'POOL_PING_INTERVAL')
+POOL_WAIT_TIMEOUT = get_config('ORACLE_DB', 'POOL_WAIT_TIMEOUT')
+STATEMENT_CACHE_SIZE = get_config('ORACLE_DB', 'STATEMENT_CACHE_SIZE')
+
+LOGIN_CREDENTIALS = dict(host=HOSTNAME,
+                         port=PORT,
                          sid=SID,
-                         user=USERNAME, 
+                         user=USERNAME,
                          password=PASSWORD)
 
-def execute_in_transaction(execute_query: ExecuteQueryImpl, params):
-    connection = None
-    cursor = None
-    result = None
-        
+connection_pool_lock = threading.Lock()
+connection_pool_stats_lock = threading.Lock()
+connection_pool = None
+
+connection_pool_stats_dict = dict(no_of_acquire=0, no_of_acquire_failure=0, total_wait_time=0, max_wait_time=0)
+
+def get_connection_pool() -> oracledb.ConnectionPool:
+    global connection_pool
+
+    with connection_pool_lock:
+        if connection_pool is None:
+            connection_pool = oracledb.create_pool(**LOGIN_CREDENTIALS,
+                                                   min=POOL_MIN_SIZE,
+                                                   max=POOL_MAX_SIZE,
+                                                   increment=POOL_INCREMENT,
+                                                   ping_interval=POOL_PING_INTERVAL,
+                                                   getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                                                   wait_timeout=POOL_WAIT_TIMEOUT,
+                                                   stmtcachesize=STATEMENT_CACHE_SIZE)
+            logger.log_debug_msg(f'Create Oracle connection pool, min: {POOL_MIN_SIZE}, max: {POOL_MAX_SIZE}, increment: {POOL_INCREMENT}, ping interval: {POOL_PING_INTERVAL}, wait timeout: {POOL_WAIT_TIMEOUT}, statement cache size: {STATEMENT_CACHE_SIZE}')
+
+        return connection_pool
+
+def get_connection_pool_stats() -> dict:
+    with connection_pool_stats_lock:
+        stats_dict = dict(connection_pool_stats_dict)
+
+    stats_dict['average_wait_time'] = stats_dict['total_wait_time'] / stats_dict['no_of_acquire'] if stats_dict['no_of_acquire'] else None
+
+    if connection_pool is not None:
+        stats_dict['no_of_opened_connection'] = connection_pool.opened
+        stats_dict['no_of_busy_connection'] = connection_pool.busy
+
+    return stats_dict
+
+@contextmanager
+def get_connection():
+    pool = get_connection_pool()
+    acquire_start_time = time.time()
+
     try:
-        connection = oracledb.connect(**LOGIN_CREDENTIALS)
-        cursor = connection.cursor()
-        result = execute_query.execute(cursor, params)
-            
-        connection.commit()
+        connection = pool.acquire()
     except oracledb.Error as e:
-        if connection:
+        with connection_pool_stats_lock:
+            connection_pool_stats_dict['no_of_acquire_failure'] += 1
+
+        logger.log_error_msg(f'Failed to acquire Oracle connection from pool, {e}')
+        raise e
+
+    wait_time = time.time() - acquire_start_time
+    with connection_pool_stats_lock:
+        connection_pool_stats_dict['no_of_acquire'] += 1
+        connection_pool_stats_dict['total_wait_time'] += wait_time
+        connection_pool_stats_dict['max_wait_time'] = max(connection_pool_stats_dict['max_wait_time'], wait_time)
+
+    logger.log_debug_msg(f'Acquire Oracle connection wait time: {wait_time} seconds, pool stats: {get_connection_pool_stats()}')
+
+    try:
+        yield connection
+    finally:
+        pool.release(connection)
+
+def execute_in_transaction(execute_query: ExecuteQueryImpl, params = None):
+    result = None
+
+    with get_connection() as connection:
+        cursor = None
+
+        try:
+            cursor = connection.cursor()
+            with profile_span('db_query'):
+                result = execute_query.execute(cursor, params)
+
+            connection.commit()
+        except oracledb.Error as e:
             connection.rollback()
             logger.log_error_msg(f'Rollback due to error, {e}')
-                
+
             logger.log_error_msg(f'Oracle SQL error, {e}')
             raise e
-    finally:
-        if connection is not None:
+        finally:
             if cursor is not None:
                 cursor.close()
-    
-            connection.close()
-            
+
     return result
-    
\ No newline at end of file
@@ -0,0 +1,113 @@
+import datetime
+import os
+import sqlite3
+import threading
+import pandas as pd
+
+from sql.execute_query_impl import ExecuteQueryImpl
+
+from utils.config_util import ROOT_DIR, get_config
+from utils.profiler import profile_span
+from utils.logger import Logger
+
+from constant.query.sqlite_query import SqliteQuery
+
+logger = Logger()
+
+SQLITE_DB_PATH = get_config('DATABASE', 'SQLITE_DB_PATH')
+SQLITE_BUSY_TIMEOUT = get_config('DATABASE', 'SQLITE_BUSY_TIMEOUT')
+STATEMENT_CACHE_SIZE = get_config('DATABASE', 'STATEMENT_CACHE_SIZE')
+
+SCHEMA_QUERY_LIST = [SqliteQuery.CREATE_PATTERN_ANALYSIS_TABLE_QUERY,
+                     SqliteQuery.CREATE_PATTERN_ANALYSIS_KEY_INDEX_QUERY,
+                     SqliteQuery.CREATE_PATTERN_ANALYSIS_DATETIME_INDEX_QUERY,
+                     SqliteQuery.CREATE_TOP_GAINER_HISTORY_TABLE_QUERY,
+                     SqliteQuery.CREATE_TOP_GAINER_HISTORY_INDEX_QUERY,
+                     SqliteQuery.CREATE_TRADE_SUMMARY_TABLE_QUERY]
+
+# Stored as naive US/Eastern wall clock text, same as the Oracle TIMESTAMP columns
+def adapt_datetime(value: datetime.datetime) -> str:
+    return value.replace(tzinfo=None).isoformat(sep=' ')
+
+def adapt_timestamp(value: pd.Timestamp) -> str:
+    return adapt_datetime(value.to_pydatetime())
+
+def adapt_date(value: datetime.date) -> str:
+    return adapt_datetime(datetime.datetime.combine(value, datetime.time()))
+
+def convert_timestamp(value: bytes) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.decode())
+
+sqlite3.register_adapter(datetime.datetime, adapt_datetime)
+sqlite3.register_adapter(pd.Timestamp, adapt_timestamp)
+sqlite3.register_adapter(datetime.date, adapt_date)
+sqlite3.register_converter('TIMESTAMP', convert_timestamp)
+
+thread_local = threading.local()
+schema_lock = threading.Lock()
+is_schema_created = False
+
+def get_db_path() -> str:
+    if os.path.isabs(SQLITE_DB_PATH):
+        return SQLITE_DB_PATH
+
+    return os.path.join(ROOT_DIR, SQLITE_DB_PATH)
+
+def create_schema(connection: sqlite3.Connection) -> None:
+    global is_schema_created
+
+    with schema_lock:
+        if is_schema_created:
+            return
+
+        for schema_query in SCHEMA_QUERY_LIST:
+            connection.execute(schema_query.value)
+
+        connection.commit()
+        is_schema_created = True
+        logger.log_debug_msg(f'Create SQLite schema in {get_db_path()}')
+
+# sqlite3 connections cannot be shared between threads, each scan family thread keeps its own
+def get_connection() -> sqlite3.Connection:
+    connection = getattr(thread_local, 'connection', None)
+
+    if connection is None:
+        connection = sqlite3.connect(get_db_path(),
+                                     timeout=SQLITE_BUSY_TIMEOUT,
+                                     detect_types=sqlite3.PARSE_DECLTYPES,
+                                     cached_statements=STATEMENT_CACHE_SIZE)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        create_schema(connection)
+
+        thread_local.connection = connection
+        logger.log_debug_msg(f'Open SQLite connection for {threading.current_thread().name}')
+
+    return connection
+
+def execute_in_transaction(execute_query: ExecuteQueryImpl, params = None):
+    connection = get_connection()
+    cursor = None
+    result = None
+
+    try:
+        cursor = connection.cursor()
+        with profile_span('db_query'):
+            result = execute_query.execute(cursor, params)
+
+        connection.commit()
+    except sqlite3.Error as e:
+        connection.rollback()
+        logger.log_error_msg(f'Rollback due to error, {e}')
+
+        logger.log_error_msg(f'SQLite error, {e}')
+        raise e
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+    return result
+
+class SqliteConnector:
+    def execute_in_transaction(self, execute_query: ExecuteQueryImpl, params = None):
+        return execute_in_transaction(execute_query, params)
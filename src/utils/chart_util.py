@@ -1,20 +1,33 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+from io import BytesIO
+import atexit
 import datetime
 import math
+import multiprocessing
+import os
+import queue
 import threading
+import time
 import pandas as pd
 import mplfinance as mpf
 from matplotlib import dates, ticker
 import matplotlib as mpl
 mpl.use('Agg')
+import matplotlib.pyplot as plt
+
+from model.candle.candlestick_chart import CandlestickChart
 
 from constant.indicator.scatter_colour import ScatterColour
 from constant.indicator.scatter_symbol import ScatterSymbol
 from constant.indicator.customised_indicator import CustomisedIndicator
 
 from utils.config_util import get_config
-from utils.dataframe_util import get_candle_comments_df, get_scatter_symbol_and_colour_df
+from utils.dataframe_util import get_candle_comments_df, get_sparse_scatter_series
 from utils.datetime_util import get_offsetted_hit_scanner_datetime
 from utils.math_util import get_max_round_decimal_places, round_to_nth_digit, get_first_non_zero_decimal_place_position
+from utils.profiler import profile_span
 from utils.logger import Logger
 
 from constant.candle.bar_size import BarSize
@@ -23,9 +36,13 @@ from constant.indicator.indicator import Indicator
 idx = pd.IndexSlice
 logger = Logger()
 
-#candle_stick_chart_generation_lock = threading.Lock()
-
 CHART_ROOT_DIR = get_config('CHART_SETTING', 'PATH')
+CHART_RENDERING_WORKER_NO = get_config('CHART_SETTING', 'CHART_RENDERING_WORKER_NO')
+IN_MEMORY_CHART_RENDERING = get_config('CHART_SETTING', 'IN_MEMORY_CHART_RENDERING')
+ARCHIVE_CHART = get_config('CHART_SETTING', 'ARCHIVE_CHART')
+ARCHIVE_RETENTION_DAY = get_config('CHART_SETTING', 'ARCHIVE_RETENTION_DAY')
+ARCHIVE_CLEAN_UP_INTERVAL_IN_MINUTE = get_config('CHART_SETTING', 'ARCHIVE_CLEAN_UP_INTERVAL_IN_MINUTE')
+CHART_CACHE_SIZE = get_config('CHART_SETTING', 'CHART_CACHE_SIZE')
 
 CHART_WIDTH_PIXEL = get_config('CHART_SETTING', 'CHART_WIDTH_PIXEL')
 CHART_HEIGHT_PIXEL = get_config('CHART_SETTING', 'CHART_HEIGHT_PIXEL')
@@ -76,12 +93,12 @@ def generate_chart(pattern: str,
                    main_df: pd.DataFrame, 
                    hit_scanner_datetime: pd.Timestamp,
                    daily_date_to_fake_minute_datetime_x_axis_dict:dict, 
-                   scatter_symbol_df = None, 
-                   scatter_colour_df = None, 
-                   description_df = None, 
-                   description_offset: float = DESCRIPTION_X_AXIS_OFFSET) -> str:
+                   scatter_symbol: ScatterSymbol = None, 
+                   scatter_colour: ScatterColour = None, 
+                   candle_comment_list: list = None, 
+                   description_offset: float = DESCRIPTION_X_AXIS_OFFSET) -> CandlestickChart:
     simple_chart = True if len(main_df) > 7 else False
-    chart_setting = COMMON_CHART_SETTING
+    chart_setting = dict(COMMON_CHART_SETTING)
     ticker_name = main_df.columns.get_level_values(0).values[0]
     
     scatter_size = 600
@@ -151,23 +168,6 @@ def generate_chart(pattern: str,
                                   show_nontrading=True,
                                   scale_padding=dict(left=0.5, right=3, bottom=1, top=2)))
 
-    if description_df is not None:
-        row_counter = 0
-        for idx_datetime, description_series in description_df.iterrows():
-            if bar_size == BarSize.ONE_DAY:
-                #https://stackoverflow.com/questions/70341767/how-to-add-a-string-comment-above-every-single-candle-using-mplfinance-plot-or
-                #x_axis_val = dates.date2num((idx_datetime + pd.Timedelta(days=description_offset)).to_pydatetime())
-                x_axis_val = row_counter
-                row_counter += 1
-            elif bar_size == BarSize.ONE_MINUTE:
-                x_axis_val = dates.date2num((idx_datetime + pd.Timedelta(minutes=description_offset)).to_pydatetime())
-
-            description_dict_list.append(
-                dict(x_axis = x_axis_val, 
-                     y_axis = main_df.loc[idx_datetime, (ticker_name, Indicator.HIGH.value)],
-                     description = description_series[0]
-            ))
-            
     if simple_chart and bar_size == BarSize.ONE_MINUTE:
         last_key = list(daily_date_to_fake_minute_datetime_x_axis_dict)[-1]
         last_daily_date = daily_date_to_fake_minute_datetime_x_axis_dict.get(last_key).strftime((DAILY_CANDLE_DISPLAY_FORMAT))
@@ -185,22 +185,45 @@ def generate_chart(pattern: str,
         
         dt_str_list = simpified_dt_str_list
         
-        for i, description_dict in enumerate(description_dict_list):
-            if not dt_str_list[i]:
-                description_dict['description'] = ''
-        
         scatter_size = 200
         description_font_size = 12
 
-    if scatter_symbol_df is not None and scatter_colour_df is not None:
-        indicator_plot = mpf.make_addplot((ticker_level_dropped_df[Indicator.LOW.value] * scatter_symbol_multiplier),
-                                          type='scatter', 
-                                          markersize=scatter_size, 
-                                          marker=scatter_symbol_df.values.flatten(), 
-                                          color=scatter_colour_df.values.flatten())
+    if candle_comment_list:
+        # Simple minute chart only annotates the candles with x axis label, other rows are not formatted at all
+        if simple_chart and bar_size == BarSize.ONE_MINUTE:
+            description_position_list = [i for i, dt_str in enumerate(dt_str_list) if dt_str]
+        else:
+            description_position_list = list(range(len(main_df)))
+        
+        description_df = get_candle_comments_df(main_df.iloc[description_position_list], indicator_list=candle_comment_list)
+        high_np = main_df.loc[:, (ticker_name, Indicator.HIGH.value)].values
+        
+        for position, (idx_datetime, description) in zip(description_position_list, description_df.iloc[:, 0].items()):
+            if bar_size == BarSize.ONE_DAY:
+                #https://stackoverflow.com/questions/70341767/how-to-add-a-string-comment-above-every-single-candle-using-mplfinance-plot-or
+                x_axis_val = position
+            elif bar_size == BarSize.ONE_MINUTE:
+                x_axis_val = dates.date2num((idx_datetime + pd.Timedelta(minutes=description_offset)).to_pydatetime())
 
-        indicator_chart_setting = dict(addplot=indicator_plot)
-        chart_setting.update(indicator_chart_setting)
+            description_dict_list.append(
+                dict(x_axis = x_axis_val, 
+                     y_axis = high_np[position],
+                     description = description
+            ))
+
+    if scatter_symbol is not None and scatter_colour is not None:
+        scatter_series = get_sparse_scatter_series(ticker_level_dropped_df[Indicator.LOW.value] * scatter_symbol_multiplier, 
+                                                   occurrence_idx_list=[hit_scanner_datetime])
+        
+        if scatter_series.notna().any():
+            indicator_plot = mpf.make_addplot(scatter_series,
+                                              type='scatter', 
+                                              markersize=scatter_size, 
+                                              marker=scatter_symbol.value, 
+                                              color=scatter_colour.value)
+
+            indicator_chart_setting = dict(addplot=indicator_plot)
+            chart_setting.update(indicator_chart_setting)
 
     chart, axis_list = mpf.plot(ticker_level_dropped_df,
                                 returnfig=True,
@@ -243,49 +266,269 @@ def generate_chart(pattern: str,
             axis_list[3].xaxis.set_major_locator(x_axis_unit)
 
     current_datetime_str = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
-    output_dir =  f"{CHART_ROOT_DIR}/{pattern}_{ticker_name}_{bar_size.value}_{current_datetime_str}.png"
-    chart.savefig(output_dir)
-    del chart
+    filename = f'{pattern}_{ticker_name}_{bar_size.value}_{current_datetime_str}.png'
     
-    logger.log_debug_msg(f'Chart {output_dir} has been generated', with_std_out=True)
+    if IN_MEMORY_CHART_RENDERING:
+        chart_buffer = BytesIO()
+        chart.savefig(chart_buffer, format='png')
+        plt.close(chart)
+        
+        candlestick_chart = CandlestickChart(filename, image_bytes=chart_buffer.getvalue())
+        logger.log_debug_msg(f'Chart {filename} has been generated in memory, size: {len(candlestick_chart.image_bytes)} bytes', with_std_out=True)
+    else:
+        output_dir =  f"{CHART_ROOT_DIR}/{filename}"
+        chart.savefig(output_dir)
+        plt.close(chart)
+        
+        candlestick_chart = CandlestickChart(filename, chart_dir=output_dir)
+        logger.log_debug_msg(f'Chart {output_dir} has been generated', with_std_out=True)
     
-    return output_dir
+    return candlestick_chart
+
+chart_archive_queue = queue.Queue()
+chart_archive_thread_lock = threading.Lock()
+chart_archive_thread = None
+
+def clean_up_archived_chart() -> None:
+    expiry_time = time.time() - ARCHIVE_RETENTION_DAY * 24 * 60 * 60
+    no_of_removed_chart = 0
+    
+    for filename in os.listdir(CHART_ROOT_DIR):
+        chart_dir = os.path.join(CHART_ROOT_DIR, filename)
+        
+        try:
+            if filename.endswith('.png') and os.path.getmtime(chart_dir) < expiry_time:
+                os.remove(chart_dir)
+                no_of_removed_chart += 1
+        except OSError as os_exception:
+            logger.log_error_msg(f'Failed to remove archived chart {chart_dir}, {os_exception}')
+    
+    logger.log_debug_msg(f'Remove {no_of_removed_chart} archived chart(s) older than {ARCHIVE_RETENTION_DAY} day(s)')
+
+def write_archived_chart(candlestick_chart: CandlestickChart) -> None:
+    chart_dir = os.path.join(CHART_ROOT_DIR, candlestick_chart.filename)
+    temp_chart_dir = f'{chart_dir}.tmp'
+    
+    with open(temp_chart_dir, 'wb') as chart_file:
+        chart_file.write(candlestick_chart.image_bytes)
+    
+    os.replace(temp_chart_dir, chart_dir)
+    logger.log_debug_msg(f'Archive chart {chart_dir}')
+
+def archive_chart_worker() -> None:
+    last_clean_up_time = None
     
+    while True:
+        try:
+            candlestick_chart = chart_archive_queue.get(timeout=ARCHIVE_CLEAN_UP_INTERVAL_IN_MINUTE * 60)
+        except queue.Empty:
+            candlestick_chart = False
+        
+        if candlestick_chart is None:
+            break
+        
+        try:
+            if candlestick_chart:
+                write_archived_chart(candlestick_chart)
+            
+            if last_clean_up_time is None or time.time() - last_clean_up_time >= ARCHIVE_CLEAN_UP_INTERVAL_IN_MINUTE * 60:
+                clean_up_archived_chart()
+                last_clean_up_time = time.time()
+        except OSError as os_exception:
+            logger.log_error_msg(f'Failed to archive chart, {os_exception}')
+
+def archive_chart(candlestick_chart: CandlestickChart) -> None:
+    global chart_archive_thread
+    
+    # No chart is generated for a flat range, and None would also stop the archive thread
+    if not ARCHIVE_CHART or candlestick_chart is None or candlestick_chart.image_bytes is None:
+        return
+    
+    with chart_archive_thread_lock:
+        if chart_archive_thread is None:
+            os.makedirs(CHART_ROOT_DIR, exist_ok=True)
+            chart_archive_thread = threading.Thread(target=archive_chart_worker, name='chart_archive', daemon=True)
+            chart_archive_thread.start()
+            logger.log_debug_msg(f'Start chart archive thread, retention: {ARCHIVE_RETENTION_DAY} day(s)')
+    
+    chart_archive_queue.put(candlestick_chart)
+
+def archive_chart_callback(chart_future: Future) -> None:
+    if not chart_future.cancelled() and chart_future.exception() is None:
+        archive_chart(chart_future.result())
+
+def shutdown_chart_archive_thread() -> None:
+    global chart_archive_thread
+    
+    with chart_archive_thread_lock:
+        if chart_archive_thread is not None:
+            chart_archive_queue.put(None)
+            chart_archive_thread.join()
+            chart_archive_thread = None
+
+# Registered before the rendering pool so that it runs after the pool has been shut down and the last charts are queued
+atexit.register(shutdown_chart_archive_thread)
+
+chart_rendering_executor_lock = threading.Lock()
+chart_rendering_executor = None
+
+def initialise_chart_rendering_worker() -> None:
+    # Style and backend are set up once per worker on import, the first chart then only pays for the plot itself
+    mpl.use('Agg')
+    logger.log_debug_msg(f'Chart rendering worker {os.getpid()} started')
+
+def get_chart_rendering_executor(recreate: bool = False) -> ProcessPoolExecutor:
+    global chart_rendering_executor
+    
+    with chart_rendering_executor_lock:
+        if recreate and chart_rendering_executor is not None:
+            chart_rendering_executor.shutdown(wait=False, cancel_futures=True)
+            chart_rendering_executor = None
+        
+        if chart_rendering_executor is None:
+            # Spawn workers so that the scan threads and open sockets are not forked into them
+            chart_rendering_executor = ProcessPoolExecutor(max_workers=CHART_RENDERING_WORKER_NO, 
+                                                           mp_context=multiprocessing.get_context('spawn'), 
+                                                           initializer=initialise_chart_rendering_worker)
+            logger.log_debug_msg(f'Start chart rendering process pool with {CHART_RENDERING_WORKER_NO} workers')
+        
+        return chart_rendering_executor
+
+def shutdown_chart_rendering_executor() -> None:
+    global chart_rendering_executor
+    
+    with chart_rendering_executor_lock:
+        if chart_rendering_executor is not None:
+            chart_rendering_executor.shutdown(wait=True, cancel_futures=True)
+            chart_rendering_executor = None
+
+atexit.register(shutdown_chart_rendering_executor)
+
+def submit_chart(**chart_param) -> Future:
+    try:
+        chart_future = get_chart_rendering_executor().submit(generate_chart, **chart_param)
+    except BrokenProcessPool as broken_process_pool_exception:
+        logger.log_error_msg(f'Chart rendering process pool is broken, restart process pool, {broken_process_pool_exception}')
+        chart_future = get_chart_rendering_executor(recreate=True).submit(generate_chart, **chart_param)
+    
+    chart_future.add_done_callback(archive_chart_callback)
+    return chart_future
+
+chart_cache_lock = threading.Lock()
+chart_cache_dict = OrderedDict()
+chart_cache_stats_dict = dict(no_of_hit=0, no_of_miss=0, no_of_eviction=0)
+
+def get_chart_cache_key(window_df: pd.DataFrame, 
+                        ticker: str, pattern: str, bar_size: BarSize, 
+                        hit_scanner_datetime: pd.Timestamp, 
+                        scatter_symbol: ScatterSymbol, scatter_colour: ScatterColour, 
+                        candle_comment_list: list) -> tuple:
+    # Bars before the last one are final, the last bar is hashed to detect an update of the forming candle
+    last_bar_hash = int(pd.util.hash_pandas_object(window_df.iloc[[-1]]).iloc[0]) if len(window_df) > 0 else None
+    
+    return (ticker, pattern, bar_size.value, 
+            window_df.index[0] if len(window_df) > 0 else None, 
+            window_df.index[-1] if len(window_df) > 0 else None, 
+            len(window_df), last_bar_hash, 
+            hit_scanner_datetime, scatter_symbol.value, scatter_colour.value,
+            tuple(indicator.value for indicator in candle_comment_list))
+
+def get_cached_chart_future(chart_cache_key: tuple) -> Future:
+    with chart_cache_lock:
+        chart_future = chart_cache_dict.get(chart_cache_key)
+        
+        if chart_future is not None:
+            chart_cache_dict.move_to_end(chart_cache_key)
+            chart_cache_stats_dict['no_of_hit'] += 1
+        else:
+            chart_cache_stats_dict['no_of_miss'] += 1
+        
+        return chart_future
+
+def cache_chart_future(chart_cache_key: tuple, chart_future: Future) -> None:
+    with chart_cache_lock:
+        chart_cache_dict[chart_cache_key] = chart_future
+        chart_cache_dict.move_to_end(chart_cache_key)
+        
+        while len(chart_cache_dict) > CHART_CACHE_SIZE:
+            chart_cache_dict.popitem(last=False)
+            chart_cache_stats_dict['no_of_eviction'] += 1
+    
+    def evict_failed_chart_future(done_chart_future: Future):
+        if done_chart_future.cancelled() or done_chart_future.exception() is not None:
+            with chart_cache_lock:
+                if chart_cache_dict.get(chart_cache_key) is done_chart_future:
+                    del chart_cache_dict[chart_cache_key]
+    
+    chart_future.add_done_callback(evict_failed_chart_future)
+
+def get_chart_cache_stats() -> dict:
+    with chart_cache_lock:
+        stats_dict = dict(chart_cache_stats_dict)
+        stats_dict['size'] = len(chart_cache_dict)
+    
+    no_of_lookup = stats_dict['no_of_hit'] + stats_dict['no_of_miss']
+    stats_dict['hit_ratio'] = stats_dict['no_of_hit'] / no_of_lookup if no_of_lookup else None
+    
+    return stats_dict
+
+def submit_candlestick_chart(candle_data_df: pd.DataFrame, 
+                             ticker: str, pattern: str, bar_size: BarSize,
+                             hit_scanner_datetime: pd.Timestamp, 
+                             scatter_symbol: ScatterSymbol, scatter_colour: ScatterColour,
+                             daily_date_to_fake_minute_datetime_x_axis_dict: dict = None,
+                             positive_offset: int = None, negative_offset: int = None,
+                             candle_comment_list: list = [CustomisedIndicator.CLOSE_CHANGE, CustomisedIndicator.GAP_PCT_CHANGE, Indicator.CLOSE, Indicator.VOLUME]) -> Future:
+    candle_start_range, candle_end_range = get_offsetted_hit_scanner_datetime(hit_scanner_datetime=hit_scanner_datetime, 
+                                                                              indice=candle_data_df.index,
+                                                                              negative_offset=negative_offset, 
+                                                                              positive_offset=positive_offset)
+
+    logger.log_debug_msg(f'{ticker} candle start range: {candle_start_range}, candle end range: {candle_end_range}')
+    
+    main_df = candle_data_df.loc[candle_start_range:candle_end_range, idx[[ticker], :]]
+    chart_cache_key = get_chart_cache_key(window_df=main_df, 
+                                          ticker=ticker, pattern=pattern, bar_size=bar_size, 
+                                          hit_scanner_datetime=hit_scanner_datetime, 
+                                          scatter_symbol=scatter_symbol, scatter_colour=scatter_colour, 
+                                          candle_comment_list=candle_comment_list)
+    
+    cached_chart_future = get_cached_chart_future(chart_cache_key)
+    if cached_chart_future is not None:
+        logger.log_debug_msg(f'Reuse cached {ticker} {pattern} chart, chart cache stats: {get_chart_cache_stats()}')
+        return cached_chart_future
+    
+    with pd.option_context('display.max_rows', None,
+                           'display.max_columns', None,
+                           'display.precision', 3,):
+        logger.log_debug_msg(f'{ticker} candle chart data:')
+        logger.log_debug_msg(main_df)
+
+    with profile_span('chart_submit'):
+        # Only the displayed window is sent to the worker process, comments and markers are built there for the drawn candles
+        chart_future = submit_chart(pattern=pattern, 
+                                    bar_size=bar_size,
+                                    hit_scanner_datetime=hit_scanner_datetime,
+                                    daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
+                                    main_df=main_df,
+                                    scatter_symbol=scatter_symbol,
+                                    scatter_colour=scatter_colour,
+                                    candle_comment_list=candle_comment_list)
+    cache_chart_future(chart_cache_key, chart_future)
+    
+    return chart_future
+
 def get_candlestick_chart(candle_data_df: pd.DataFrame, 
                           ticker: str, pattern: str, bar_size: BarSize,
                           hit_scanner_datetime: pd.Timestamp, 
                           scatter_symbol: ScatterSymbol, scatter_colour: ScatterColour,
                           daily_date_to_fake_minute_datetime_x_axis_dict: dict = None,
                           positive_offset: int = None, negative_offset: int = None,
-                          candle_comment_list: list = [CustomisedIndicator.CLOSE_CHANGE, CustomisedIndicator.GAP_PCT_CHANGE, Indicator.CLOSE, Indicator.VOLUME]) -> str:
-    #with candle_stick_chart_generation_lock:
-        symbol_df, colour_df = get_scatter_symbol_and_colour_df(src_df=candle_data_df.loc[:, idx[[ticker], Indicator.LOW.value]], 
-                                                                occurrence_idx_list=[hit_scanner_datetime], 
-                                                                scatter_symbol=scatter_symbol, 
-                                                                scatter_colour=scatter_colour)
-        description_df = get_candle_comments_df(candle_data_df.loc[:, idx[[ticker], :]], 
-                                                indicator_list=candle_comment_list)
-        candle_start_range, candle_end_range = get_offsetted_hit_scanner_datetime(hit_scanner_datetime=hit_scanner_datetime, 
-                                                                                  indice=candle_data_df.index,
-                                                                                  negative_offset=negative_offset, 
-                                                                                  positive_offset=positive_offset)
-
-        logger.log_debug_msg(f'{ticker} candle start range: {candle_start_range}, candle end range: {candle_end_range}')
-
-        with pd.option_context('display.max_rows', None,
-                               'display.max_columns', None,
-                               'display.precision', 3,):
-            logger.log_debug_msg(f'{ticker} candle chart data:')
-            logger.log_debug_msg(candle_data_df.loc[candle_start_range:candle_end_range, idx[[ticker], :]])
-
-        chart_dir = generate_chart(pattern=pattern, 
-                                   bar_size=bar_size,
-                                   hit_scanner_datetime=hit_scanner_datetime,
-                                   daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
-                                   main_df=candle_data_df.loc[candle_start_range:candle_end_range, idx[[ticker], :]],
-                                   scatter_symbol_df=symbol_df.loc[candle_start_range:candle_end_range, :],
-                                   scatter_colour_df=colour_df.loc[candle_start_range:candle_end_range, :],
-                                   description_df=description_df.loc[candle_start_range:candle_end_range, :])
-
-        return chart_dir
-   
\ No newline at end of file
+                          candle_comment_list: list = [CustomisedIndicator.CLOSE_CHANGE, CustomisedIndicator.GAP_PCT_CHANGE, Indicator.CLOSE, Indicator.VOLUME]) -> CandlestickChart:
+    return submit_candlestick_chart(candle_data_df=candle_data_df,
+                                    ticker=ticker, pattern=pattern, bar_size=bar_size,
+                                    hit_scanner_datetime=hit_scanner_datetime,
+                                    scatter_symbol=scatter_symbol, scatter_colour=scatter_colour,
+                                    daily_date_to_fake_minute_datetime_x_axis_dict=daily_date_to_fake_minute_datetime_x_axis_dict,
+                                    positive_offset=positive_offset, negative_offset=negative_offset,
+                                    candle_comment_list=candle_comment_list).result()
@@ -0,0 +1,204 @@
+import time
+import numpy as np
+import pandas as pd
+
+from constant.indicator.indicator import Indicator
+from constant.indicator.customised_indicator import CustomisedIndicator
+from constant.candle.candle_colour import CandleColour
+
+from utils.dataframe_util import append_customised_indicator, get_candle_colour_df
+from utils.logger import Logger
+
+idx = pd.IndexSlice
+logger = Logger()
+
+class CustomisedIndicatorEngine:
+    def __init__(self) -> None:
+        self.__datetime_index = None
+        self.__ticker_to_indicator_dict = {}
+        self.__colour_category_to_dtype_list_dict = {}
+
+    def reset(self) -> None:
+        self.__datetime_index = None
+        self.__ticker_to_indicator_dict = {}
+
+    def append_customised_indicator(self, src_df: pd.DataFrame) -> pd.DataFrame:
+        construct_dataframe_start_time = time.time()
+        open_df = src_df.loc[:, idx[:, Indicator.OPEN.value]]
+        close_df = src_df.loc[:, idx[:, Indicator.CLOSE.value]]
+        volume_df = src_df.loc[:, idx[:, Indicator.VOLUME.value]]
+        ticker_list = close_df.columns.get_level_values(0).tolist()
+
+        # Integer columns change dtype along the way in the full recomputation, fall back to keep the output identical
+        if (not ticker_list
+                or len(set(ticker_list)) != len(ticker_list)
+                or not src_df.index.is_monotonic_increasing
+                or not all(dtype == np.float64 for dtype in pd.concat([open_df.dtypes, close_df.dtypes, volume_df.dtypes]))
+                or open_df.columns.get_level_values(0).tolist() != ticker_list
+                or volume_df.columns.get_level_values(0).tolist() != ticker_list):
+            logger.log_debug_msg('Fall back to full customised indicator computation')
+            self.reset()
+            return append_customised_indicator(src_df)
+
+        common_row_no = self.__get_common_row_no(src_df.index)
+        open_np = open_df.to_numpy()
+        close_np = close_df.to_numpy()
+        volume_np = volume_df.to_numpy()
+        ticker_to_indicator_dict = {}
+        no_of_computed_row = 0
+
+        for column, ticker in enumerate(ticker_list):
+            indicator_dict = self.__ticker_to_indicator_dict.get(ticker)
+            start_row = self.__get_divergence_row(indicator_dict, common_row_no, open_np[:, column], close_np[:, column], volume_np[:, column])
+            ticker_to_indicator_dict[ticker] = self.__compute(indicator_dict, start_row, open_np[:, column], close_np[:, column], volume_np[:, column])
+            no_of_computed_row += len(src_df) - start_row
+
+        self.__datetime_index = src_df.index
+        self.__ticker_to_indicator_dict = ticker_to_indicator_dict
+
+        colour_df = pd.DataFrame(np.column_stack([ticker_to_indicator_dict[ticker]['colour'] for ticker in ticker_list]),
+                                 index=src_df.index,
+                                 columns=pd.MultiIndex.from_product([ticker_list, [CustomisedIndicator.CANDLE_COLOUR.value]]))
+        colour_dtype_list = self.__get_colour_dtype_list([self.__get_colour_category(open_np[:, column], close_np[:, column]) for column in range(len(ticker_list))])
+        float_colour_column_list = [column for column, dtype in zip(colour_df.columns, colour_dtype_list) if dtype != np.object_]
+
+        if float_colour_column_list:
+            colour_df = colour_df.astype({column: np.float64 for column in float_colour_column_list})
+
+        complete_df = pd.concat([src_df,
+                                 self.__get_indicator_df(ticker_to_indicator_dict, ticker_list, 'close_pct', CustomisedIndicator.CLOSE_CHANGE, src_df.index),
+                                 self.__get_indicator_df(ticker_to_indicator_dict, ticker_list, 'gap_pct', CustomisedIndicator.GAP_PCT_CHANGE, src_df.index),
+                                 self.__get_indicator_df(ticker_to_indicator_dict, ticker_list, 'total_volume', CustomisedIndicator.TOTAL_VOLUME, src_df.index),
+                                 colour_df,
+                                 self.__get_indicator_df(ticker_to_indicator_dict, ticker_list, 'lower_body', CustomisedIndicator.CANDLE_LOWER_BODY, src_df.index),
+                                 self.__get_indicator_df(ticker_to_indicator_dict, ticker_list, 'upper_body', CustomisedIndicator.CANDLE_UPPER_BODY, src_df.index)], axis=1)
+
+        logger.log_debug_msg(f'Construct incremental customised statistics dataframe time: {time.time() - construct_dataframe_start_time}, no. of computed row: {no_of_computed_row}')
+        return complete_df
+
+    def __get_common_row_no(self, datetime_index: pd.Index) -> int:
+        if self.__datetime_index is None or len(self.__datetime_index) == 0 or len(datetime_index) == 0:
+            return 0
+
+        common_row_no = min(len(self.__datetime_index), len(datetime_index))
+        mismatch_np = self.__datetime_index[:common_row_no] != datetime_index[:common_row_no]
+
+        if mismatch_np.any():
+            return int(np.argmax(mismatch_np))
+
+        return common_row_no
+
+    def __get_divergence_row(self, indicator_dict: dict, common_row_no: int, open_np: np.ndarray, close_np: np.ndarray, volume_np: np.ndarray) -> int:
+        if indicator_dict is None or common_row_no == 0:
+            return 0
+
+        mismatch_np = np.zeros(common_row_no, dtype=bool)
+        for key, src_np in [('open', open_np), ('close', close_np), ('volume', volume_np)]:
+            cached_np = indicator_dict[key][:common_row_no]
+            current_np = src_np[:common_row_no]
+            mismatch_np |= ~((cached_np == current_np) | (np.isnan(cached_np) & np.isnan(current_np)))
+
+        if mismatch_np.any():
+            return int(np.argmax(mismatch_np))
+
+        return common_row_no
+
+    def __compute(self, indicator_dict: dict, start_row: int, open_np: np.ndarray, close_np: np.ndarray, volume_np: np.ndarray) -> dict:
+        if start_row > 0:
+            previous_ffill_close = indicator_dict['ffill_close'][start_row - 1]
+            previous_running_volume = indicator_dict['running_volume'][start_row - 1]
+            previous_upper_body = indicator_dict['upper_body'][start_row - 1]
+            previous_lower_body = indicator_dict['lower_body'][start_row - 1]
+        else:
+            previous_ffill_close = np.nan
+            previous_running_volume = 0.0
+            previous_upper_body = np.nan
+            previous_lower_body = np.nan
+
+        open_tail_np = open_np[start_row:]
+        close_tail_np = close_np[start_row:]
+        volume_tail_np = volume_np[start_row:]
+
+        # Same as pct_change() with the default pad fill method
+        seeded_close_np = np.concatenate(([previous_ffill_close], close_tail_np))
+        valid_position_np = np.where(~np.isnan(seeded_close_np), np.arange(len(seeded_close_np)), 0)
+        seeded_ffill_close_np = seeded_close_np[np.maximum.accumulate(valid_position_np)]
+        ffill_close_tail_np = seeded_ffill_close_np[1:]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            close_pct_tail_np = (seeded_ffill_close_np[1:] / seeded_ffill_close_np[:-1] - 1) * 100
+
+        # Accumulate from the previous running sum so that the float summation order matches cumsum()
+        volume_nan_np = np.isnan(volume_tail_np)
+        running_volume_tail_np = np.cumsum(np.concatenate(([previous_running_volume], np.where(volume_nan_np, 0.0, volume_tail_np))))[1:]
+        total_volume_tail_np = np.where(volume_nan_np, np.nan, running_volume_tail_np)
+
+        colour_tail_np = np.full(len(close_tail_np), np.nan, dtype=object)
+        colour_tail_np[close_tail_np < open_tail_np] = CandleColour.RED.value
+        colour_tail_np[close_tail_np > open_tail_np] = CandleColour.GREEN.value
+        colour_tail_np[close_tail_np == open_tail_np] = CandleColour.GREY.value
+
+        close_above_open_np = close_tail_np > open_tail_np
+        upper_body_tail_np = np.where(close_above_open_np, close_tail_np, open_tail_np)
+        lower_body_tail_np = np.where(close_above_open_np, open_tail_np, close_tail_np)
+
+        shifted_upper_body_np = np.concatenate(([previous_upper_body], upper_body_tail_np[:-1]))
+        shifted_lower_body_np = np.concatenate(([previous_lower_body], lower_body_tail_np[:-1]))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gap_up_pct_np = ((lower_body_tail_np - shifted_upper_body_np) / shifted_upper_body_np) * 100
+            gap_down_pct_np = ((upper_body_tail_np - shifted_lower_body_np) / upper_body_tail_np) * 100
+
+        gap_pct_tail_np = np.where(lower_body_tail_np > shifted_upper_body_np, gap_up_pct_np,
+                                   np.where(upper_body_tail_np < shifted_lower_body_np, gap_down_pct_np, np.nan))
+
+        tail_dict = dict(open=open_tail_np, close=close_tail_np, volume=volume_tail_np,
+                         ffill_close=ffill_close_tail_np, close_pct=close_pct_tail_np,
+                         running_volume=running_volume_tail_np, total_volume=total_volume_tail_np,
+                         colour=colour_tail_np, upper_body=upper_body_tail_np, lower_body=lower_body_tail_np,
+                         gap_pct=gap_pct_tail_np)
+
+        if start_row == 0:
+            return tail_dict
+
+        return {key: np.concatenate((indicator_dict[key][:start_row], tail_np)) for key, tail_np in tail_dict.items()}
+
+    def __get_colour_category(self, open_np: np.ndarray, close_np: np.ndarray) -> frozenset:
+        flat_np = close_np == open_np
+        green_np = close_np > open_np
+        red_np = close_np < open_np
+        category_list = [category for category, boolean_np in [(CandleColour.GREY.value, flat_np),
+                                                               (CandleColour.GREEN.value, green_np),
+                                                               (CandleColour.RED.value, red_np),
+                                                               (None, ~(flat_np | green_np | red_np))] if boolean_np.any()]
+        return frozenset(category_list)
+
+    def __get_colour_dtype_list(self, colour_category_list: list) -> list:
+        # Colour column dtype of the full recomputation depends on pandas block handling, reproduce it on a tiny frame with the same colours per column
+        colour_category_key = tuple(colour_category_list)
+
+        if colour_category_key not in self.__colour_category_to_dtype_list_dict:
+            category_to_open_and_close_dict = {CandleColour.GREY.value: (1.0, 1.0),
+                                               CandleColour.GREEN.value: (1.0, 2.0),
+                                               CandleColour.RED.value: (2.0, 1.0),
+                                               None: (np.nan, np.nan)}
+            category_order_list = [CandleColour.GREY.value, CandleColour.GREEN.value, CandleColour.RED.value, None]
+            open_list = []
+            close_list = []
+
+            for colour_category in colour_category_list:
+                category_list = [category for category in category_order_list if category in colour_category]
+                category_list = (category_list * len(category_order_list))[:len(category_order_list)]
+                open_list.append([category_to_open_and_close_dict[category][0] for category in category_list])
+                close_list.append([category_to_open_and_close_dict[category][1] for category in category_list])
+
+            column = pd.MultiIndex.from_product([range(len(colour_category_list)), [Indicator.CLOSE.value]])
+            colour_df = get_candle_colour_df(pd.DataFrame(np.array(open_list).T, columns=column), pd.DataFrame(np.array(close_list).T, columns=column))
+            self.__colour_category_to_dtype_list_dict[colour_category_key] = colour_df.dtypes.tolist()
+
+        return self.__colour_category_to_dtype_list_dict[colour_category_key]
+
+    def __get_indicator_df(self, ticker_to_indicator_dict: dict, ticker_list: list, key: str, indicator: CustomisedIndicator, datetime_index: pd.Index) -> pd.DataFrame:
+        return pd.DataFrame(np.column_stack([ticker_to_indicator_dict[ticker][key] for ticker in ticker_list]),
+                            index=datetime_index,
+                            columns=pd.MultiIndex.from_product([ticker_list, [indicator.value]]))
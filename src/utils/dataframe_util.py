@@ -1,18 +1,20 @@
 from datetime import timedelta
 import datetime
+import itertools
+import operator
 import time
 import pandas as pd
 import numpy as np
 from pandas.core.frame import DataFrame
 
+from model.candle.session_index import get_session_index
+
 from utils.logger import Logger
 
 from constant.indicator.indicator import Indicator
 from constant.indicator.customised_indicator import CustomisedIndicator
 from constant.indicator.runtime_indicator import RuntimeIndicator
 from constant.candle.candle_colour import CandleColour
-from constant.indicator.scatter_colour import ScatterColour
-from constant.indicator.scatter_symbol import ScatterSymbol
 from constant.indicator.matplot_finance import MatplotFinance
 
 logger = Logger()
@@ -27,6 +29,14 @@ def derive_idx_df(src_df: DataFrame, numeric_idx: bool = True) -> DataFrame:
     return pd.DataFrame(np.repeat(idx_np, len(src_df.columns), axis=1), 
                         columns=src_df.columns).rename(columns={src_df.columns.get_level_values(1).values[0]: RuntimeIndicator.INDEX.value})
 
+def get_candle_colour_df(open_df: DataFrame, close_df: DataFrame) -> DataFrame:
+    flat_candle_df = (open_df == close_df).replace({True: CandleColour.GREY.value, False: np.nan})
+    green_candle_df = (close_df > open_df).replace({True: CandleColour.GREEN.value, False: np.nan})
+    red_candle_df = (close_df < open_df).replace({True: CandleColour.RED.value, False: np.nan})
+    return ((flat_candle_df.fillna(green_candle_df))
+                           .fillna(red_candle_df)
+                           .rename(columns={RuntimeIndicator.COMPARE.value: CustomisedIndicator.CANDLE_COLOUR.value}))
+
 def append_customised_indicator(src_df: pd.DataFrame) -> pd.DataFrame:
     construct_dataframe_start_time = time.time()
     open_df = src_df.loc[:, idx[:, Indicator.OPEN.value]].rename(columns={Indicator.OPEN.value: RuntimeIndicator.COMPARE.value})
@@ -35,12 +45,7 @@ def append_customised_indicator(src_df: pd.DataFrame) -> pd.DataFrame:
 
     close_pct_df = close_df.pct_change().mul(100).rename(columns={RuntimeIndicator.COMPARE.value: CustomisedIndicator.CLOSE_CHANGE.value})
     
-    flat_candle_df = (open_df == close_df).replace({True: CandleColour.GREY.value, False: np.nan})
-    green_candle_df = (close_df > open_df).replace({True: CandleColour.GREEN.value, False: np.nan})
-    red_candle_df = (close_df < open_df).replace({True: CandleColour.RED.value, False: np.nan})
-    colour_df = ((flat_candle_df.fillna(green_candle_df))
-                                .fillna(red_candle_df)
-                                .rename(columns={RuntimeIndicator.COMPARE.value: CustomisedIndicator.CANDLE_COLOUR.value}))
+    colour_df = get_candle_colour_df(open_df, close_df)
 
     vol_cumsum_df = vol_df.cumsum().rename(columns={Indicator.VOLUME.value: CustomisedIndicator.TOTAL_VOLUME.value})
 
@@ -80,6 +85,47 @@ def append_customised_indicator(src_df: pd.DataFrame) -> pd.DataFrame:
     logger.log_debug_msg(f'Construct customised statistics dataframe time: {time.time() - construct_dataframe_start_time}')
     return complete_df
 
+OHLCV_INDICATOR_LIST = [Indicator.OPEN.value, Indicator.HIGH.value, Indicator.LOW.value, Indicator.CLOSE.value, Indicator.VOLUME.value]
+HISTORICAL_OHLCV_KEY_GETTER = operator.itemgetter('o', 'h', 'l', 'c', 'v', 't')
+
+def convert_historical_candle_response_to_df(candle_response_list: list, datetime_range_index: pd.DatetimeIndex, is_daily_candle: bool) -> DataFrame:
+    response_list = [historical_data for historical_data in candle_response_list if 'error' not in historical_data and 'symbol' in historical_data]
+    
+    if not response_list:
+        return None
+    
+    ticker_list = [historical_data['symbol'] for historical_data in response_list]
+    no_of_bar_np = np.array([len(historical_data['data']) for historical_data in response_list], dtype=np.int64)
+    total_no_of_bar = int(no_of_bar_np.sum())
+    
+    # Timestamps in milliseconds are exact in float64, so all fields are read into one preallocated array
+    bar_value_np = np.fromiter(itertools.chain.from_iterable(map(HISTORICAL_OHLCV_KEY_GETTER, itertools.chain.from_iterable(historical_data['data'] for historical_data in response_list))), 
+                               dtype=np.float64, 
+                               count=total_no_of_bar * 6).reshape(total_no_of_bar, 6)
+    
+    bar_datetime_index = (pd.to_datetime(bar_value_np[:, 5].astype(np.int64), unit='ms', utc=True)
+                            .tz_convert('US/Eastern')
+                            .tz_localize(None))
+    bar_datetime_index = bar_datetime_index.normalize() if is_daily_candle else bar_datetime_index.floor('T')
+    
+    row_position_np = datetime_range_index.get_indexer(bar_datetime_index)
+    ticker_position_np = np.repeat(np.arange(len(ticker_list)), no_of_bar_np)
+    in_range_np = row_position_np >= 0
+    
+    # Keep the first bar of each ticker when several bars fall into the same slot
+    _, first_bar_position_np = np.unique(ticker_position_np[in_range_np] * len(datetime_range_index) + row_position_np[in_range_np], return_index=True)
+    bar_position_np = np.flatnonzero(in_range_np)[first_bar_position_np]
+    
+    ohlcv_np = bar_value_np[bar_position_np, :5]
+    ohlcv_np[:, 4] = np.trunc(ohlcv_np[:, 4] * 100)
+    
+    candle_np = np.full((len(datetime_range_index), len(ticker_list), len(OHLCV_INDICATOR_LIST)), np.nan)
+    candle_np[row_position_np[bar_position_np], ticker_position_np[bar_position_np]] = ohlcv_np
+    
+    return pd.DataFrame(candle_np.reshape(len(datetime_range_index), -1), 
+                        index=datetime_range_index, 
+                        columns=pd.MultiIndex.from_product([ticker_list, OHLCV_INDICATOR_LIST]))
+
 def concat_daily_df_and_minute_df(daily_df: DataFrame, 
                                   minute_df: DataFrame, 
                                   hit_scanner_datetime: datetime.datetime, 
@@ -132,85 +178,43 @@ def replace_daily_df_latest_day_with_minute(daily_df: DataFrame, minute_df: Data
     return pd.concat([concat_daily_df,
                       concat_minute_df], axis=0)
 
-def get_scatter_symbol_and_colour_df(src_df: DataFrame, occurrence_idx_list: list, scatter_symbol: ScatterSymbol, scatter_colour: ScatterColour):
-    symbol_df = src_df.copy()
-    symbol_df.loc[:, :] = np.full(src_df.shape, 'none')
-    symbol_df.loc[occurrence_idx_list, :] = scatter_symbol.value
-    
-    colour_df = src_df.copy()
-    colour_df.loc[:, :] = np.full(src_df.shape, 'none')
-    colour_df.loc[occurrence_idx_list, :] = scatter_colour.value
-    
-    return symbol_df, colour_df
+def get_sparse_scatter_series(src_series: pd.Series, occurrence_idx_list: list) -> pd.Series:
+    # Rows without marker are NaN and skipped by the scatter plot, no per row 'none' marker array is needed
+    return src_series.where(src_series.index.isin(occurrence_idx_list))
 
 def get_candle_comments_df(src_df: DataFrame, indicator_list: list = [CustomisedIndicator.CLOSE_CHANGE, Indicator.VOLUME]):
     ticker_name = src_df.columns.get_level_values(0)[0]
+    max_no_of_indicator_character = max(len(indicator.value) for indicator in indicator_list)
     
-    max_no_of_indicator_character = 0
-    for indicator in indicator_list:
-        no_of_character = len(indicator.value)
-        if no_of_character >= max_no_of_indicator_character:
-            max_no_of_indicator_character = no_of_character
-    
-    indicator_description_np = np.full((src_df.shape[0], 1), '')
+    description_series = pd.Series('', index=src_df.index, dtype=object)
     for indicator in indicator_list:
-        no_of_whitespace_padding = max_no_of_indicator_character - len(indicator.value)
-        whitespace = ''.join(np.repeat(' ', no_of_whitespace_padding))
-        
-        src_indicator_df = src_df.loc[:, idx[[ticker_name], indicator.value]]
-        
-        copied_array = src_indicator_df.values.copy()
-        string_array = copied_array.astype(str)
+        label = f'{indicator.value.ljust(max_no_of_indicator_character)}: '
+        src_indicator_series = src_df.loc[:, (ticker_name, indicator.value)]
         
         if indicator == CustomisedIndicator.CLOSE_CHANGE or indicator == CustomisedIndicator.GAP_PCT_CHANGE:
-            src_df_value_np = np.around(src_indicator_df.values.astype(float), 2)
-            
-            for pos, arry in enumerate(src_df_value_np):
-                if pd.isna(arry[0]):
-                    string_array[pos][0] = ''
-                else:
-                    string_array[pos][0] = f'{indicator.value + whitespace}: {arry[0]}%\n'
+            rounded_series = src_indicator_series.astype(float).round(2)
+            comment_series = (label + rounded_series.astype(str) + '%\n').where(rounded_series.notna(), '')
         elif indicator == Indicator.VOLUME:
-            for pos, arry in enumerate(src_indicator_df.values):
-                if pd.isna(arry[0]):
-                    string_array[pos][0] = f'{indicator.value + whitespace}: NA\n'
-                else:
-                    string_array[pos][0] = f'{indicator.value + whitespace}: {"{:,}".format(int(arry[0]))}\n'
+            volume_series = src_indicator_series.astype(float)
+            comment_series = (label + np.trunc(volume_series).map('{:,.0f}'.format) + '\n').where(volume_series.notna(), f'{label}NA\n')
         elif indicator == Indicator.CLOSE:
-            src_df_value_np = np.around(src_indicator_df.values.astype(float), 3)
-
-            for pos, arry in enumerate(src_df_value_np):
-                string_array[pos][0] = f'{indicator.value + whitespace}: ${arry[0]}\n'
+            comment_series = label + '$' + src_indicator_series.astype(float).round(3).astype(str) + '\n'
+        else:
+            comment_series = src_indicator_series.astype(str)
         
-        indicator_description_np = np.char.add(indicator_description_np, string_array) 
+        description_series = description_series + comment_series
         
-    indicator_description_df = pd.DataFrame(indicator_description_np, 
+    indicator_description_df = pd.DataFrame(description_series.values.reshape(-1, 1), 
                                             columns=pd.MultiIndex.from_product([[ticker_name], [MatplotFinance.DESCRIPTION.value]]),
                                             index=src_df.index)
     
     return indicator_description_df
 
 def get_ticker_to_occurrence_idx_list(occurrence_df: DataFrame, occurrence_limit: int = None) -> dict:
-    result_dict = {}
     ticker_list = occurrence_df.columns.get_level_values(0).unique().tolist()
-    idx_df = derive_idx_df(occurrence_df)
-
-    occurrence_cumsum_df = occurrence_df.cumsum().where(occurrence_df.values) 
+    session_index = get_session_index(occurrence_df.index)
     
-    if occurrence_limit:
-        truncated_occurrence_cumsum_df = occurrence_cumsum_df.where((occurrence_cumsum_df <= occurrence_limit).values)
-        normalised_idx_df = idx_df.where(truncated_occurrence_cumsum_df.notnull().values)
-        normalised_cumsum_idx_np = np.sort(normalised_idx_df.values.T)[:, :occurrence_limit] 
-    else:
-        normalised_idx_df = idx_df.where(occurrence_cumsum_df.notnull().values)
-        normalised_cumsum_idx_np = np.sort(normalised_idx_df.values.T)
-    
-    for index, ticker in enumerate(ticker_list):
-        cumsum_idx_list = normalised_cumsum_idx_np[index] if not np.isnan(normalised_cumsum_idx_np[index]).all() else []
-        datetime_idx_list = [occurrence_df.index[int(cumsum_idx)] if not np.isnan(cumsum_idx) else None for cumsum_idx in cumsum_idx_list]
-        result_dict[ticker] = datetime_idx_list
-        
-    return result_dict
+    return session_index.get_ticker_to_occurrence_datetime_list(occurrence_df.to_numpy(dtype=bool), ticker_list, occurrence_limit)
     
 def get_sorted_value_without_duplicate_df(src_df: DataFrame) -> DataFrame:
     sorted_np = np.sort(src_df.values, axis=0)
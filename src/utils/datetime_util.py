@@ -1,17 +1,45 @@
 import datetime
+import time
 import pandas as pd
 import numpy as np
 import pytz
-from pandas.tseries.holiday import USFederalHolidayCalendar
+from pandas.tseries.holiday import (AbstractHolidayCalendar, GoodFriday, Holiday, USFederalHolidayCalendar, USLaborDay, USMartinLutherKingJr, USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday, sunday_to_monday)
 from pandas.tseries.offsets import CustomBusinessDay
 
+from constant.scanner.market_phase import MarketPhase
+
 US_EASTERN_TIMEZONE = pytz.timezone('US/Eastern')
 HONG_KONG_TIMEZONE = pytz.timezone('Asia/Hong_Kong')
-PRE_MARKET_START_DATETIME = datetime.datetime.now().astimezone(US_EASTERN_TIMEZONE).replace(hour=4, minute=0, second=0, microsecond=0)
 
 US_BUSINESS_DAY = CustomBusinessDay(calendar=USFederalHolidayCalendar())
 US_FEDERAL_HOLIDAYS = US_BUSINESS_DAY.calendar.holidays
 
+# NYSE trades on Columbus Day and Veterans Day but closes on Good Friday, a New Year's Day on Saturday is not observed
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday('New Year\'s Day', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth National Independence Day', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas Day', month=12, day=25, observance=nearest_workday)
+    ]
+
+NYSE_HOLIDAYS = NYSEHolidayCalendar().holidays().values.astype('datetime64[D]')
+
+# Start time of each phase, the phase lasts until the start time of the next one
+MARKET_PHASE_START_TIME_LIST = [
+    (datetime.time(0, 0, 0), MarketPhase.CLOSED),
+    (datetime.time(4, 0, 0), MarketPhase.PRE_MARKET),
+    (datetime.time(9, 30, 0), MarketPhase.REGULAR_HOURS),
+    (datetime.time(16, 0, 0), MarketPhase.AFTER_HOURS),
+    (datetime.time(20, 0, 0), MarketPhase.CLOSED)
+]
+
 def convert_into_human_readable_time(pop_up_datetime):
     pop_up_hour = pd.to_datetime(pop_up_datetime).hour
     pop_up_minute = pd.to_datetime(pop_up_datetime).minute
@@ -45,9 +73,69 @@ def is_within_trading_day_and_hours() -> bool:
     else:
         return False
     
+class SimulatedClock:
+    def __init__(self, start_datetime: datetime.datetime, speed: float = 1):
+        if not start_datetime.tzinfo:
+            start_datetime = US_EASTERN_TIMEZONE.localize(start_datetime)
+        
+        self.__start_datetime = start_datetime.astimezone(US_EASTERN_TIMEZONE)
+        self.__speed = speed
+        self.__start_monotonic_time = time.monotonic()
+    
+    @property
+    def speed(self):
+        return self.__speed
+    
+    def now(self) -> datetime.datetime:
+        elapsed_second = (time.monotonic() - self.__start_monotonic_time) * self.__speed
+        return (self.__start_datetime + datetime.timedelta(seconds=elapsed_second)).astimezone(US_EASTERN_TIMEZONE)
+
+# Replay sets a simulated clock so that every component sees the recorded trading day instead of wall clock time
+simulated_clock = None
+
+def set_simulated_clock(clock: SimulatedClock) -> None:
+    global simulated_clock
+    simulated_clock = clock
+
 def get_current_us_datetime() -> datetime:
+    if simulated_clock is not None:
+        return simulated_clock.now()
+    
     return datetime.datetime.now().astimezone(US_EASTERN_TIMEZONE)
 
+def get_clock_speed() -> float:
+    return simulated_clock.speed if simulated_clock is not None else 1
+
+def get_market_phase(us_datetime: datetime.datetime = None) -> MarketPhase:
+    if not us_datetime:
+        us_datetime = get_current_us_datetime()
+
+    if us_datetime.weekday() > 4 or np.datetime64(us_datetime.date()) in NYSE_HOLIDAYS:
+        return MarketPhase.CLOSED
+
+    market_phase = MarketPhase.CLOSED
+    for phase_start_time, phase in MARKET_PHASE_START_TIME_LIST:
+        if us_datetime.time() >= phase_start_time:
+            market_phase = phase
+
+    return market_phase
+
+def get_next_market_phase_start_datetime(us_datetime: datetime.datetime = None) -> datetime.datetime:
+    if not us_datetime:
+        us_datetime = get_current_us_datetime()
+
+    us_datetime = us_datetime.astimezone(US_EASTERN_TIMEZONE)
+
+    # Localize the wall clock time again, replace() would keep the UTC offset of the other side of a DST switch
+    for phase_start_time, _ in MARKET_PHASE_START_TIME_LIST:
+        if us_datetime.time() < phase_start_time:
+            return US_EASTERN_TIMEZONE.localize(datetime.datetime.combine(us_datetime.date(), phase_start_time))
+
+    return US_EASTERN_TIMEZONE.localize(datetime.datetime.combine(us_datetime.date() + datetime.timedelta(days=1), datetime.time(0, 0, 0)))
+
+def get_pre_market_start_datetime() -> datetime.datetime:
+    return get_current_us_datetime().replace(hour=4, minute=0, second=0, microsecond=0)
+
 def get_us_business_day(offset_day: int = 0, us_date: datetime.datetime = None) -> datetime.datetime:
     if not us_date: 
         us_business_day = get_current_us_datetime()
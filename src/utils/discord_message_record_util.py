@@ -1,16 +1,93 @@
 from datetime import datetime
+from datetime import time as dt_time
+import threading
+import time
+import pandas as pd
 
 from oracledb import Cursor
 
-from sql.oracle_connector import execute_in_transaction
+from sql.database_connector import DatabaseQuery, execute_in_transaction
 from sql.execute_query_impl import ExecuteQueryImpl
 
-from constant.query.oracle_query import OracleQuery
+from utils.datetime_util import get_current_us_datetime, get_us_business_day
+from utils.logger import Logger
+
 from constant.broker import Broker
 
-def check_if_pattern_analysis_message_sent(ticker: str, hit_scanner_datetime: datetime, pattern: str, bar_size: str) -> bool:
+logger = Logger()
+
+sent_pattern_analysis_message_record_lock = threading.Lock()
+sent_pattern_analysis_message_key_set = set()
+sent_pattern_analysis_message_record_load_date = None
+sent_pattern_analysis_message_record_window_start_datetime = None
+# Replay keeps the sent records in memory, the live records would suppress its alerts and its alerts would suppress live ones
+is_in_memory_message_record = False
+
+def use_in_memory_message_record() -> None:
+    global is_in_memory_message_record
+    is_in_memory_message_record = True
+
+def get_pattern_analysis_message_key(ticker: str, hit_scanner_datetime: datetime, pattern: str, bar_size: str) -> tuple:
+    if not isinstance(hit_scanner_datetime, datetime):
+        hit_scanner_datetime = datetime.combine(hit_scanner_datetime, dt_time())
+    
+    hit_scanner_datetime = pd.Timestamp(hit_scanner_datetime).to_pydatetime().replace(tzinfo=None)
+    return (ticker, hit_scanner_datetime, getattr(pattern, 'value', pattern), getattr(bar_size, 'value', bar_size))
+
+def get_sent_pattern_analysis_message_record(start_datetime: datetime) -> list:
+    def execute(cursor: Cursor, params):
+        cursor.execute(DatabaseQuery.GET_PATTERN_ANALYSIS_MESSAGE_QUERY.value, params)
+        return cursor.fetchall()
+
+    exec = type(
+        "GetPatternAnalysisMessage",
+        (ExecuteQueryImpl,),
+        {
+            "execute": execute
+        }
+    )
+    
+    return execute_in_transaction(exec, dict(start_datetime=start_datetime))
+
+def load_sent_pattern_analysis_message_record() -> None:
+    global sent_pattern_analysis_message_key_set, sent_pattern_analysis_message_record_load_date, sent_pattern_analysis_message_record_window_start_datetime
+    
+    current_date = get_current_us_datetime().date()
+    
+    if sent_pattern_analysis_message_record_load_date == current_date:
+        return
+    
+    # Previous business day is kept as well for the yesterday candle patterns
+    window_start_datetime = datetime.combine(get_us_business_day(-1).date(), dt_time())
+    
+    load_start_time = time.time()
+    record_list = get_sent_pattern_analysis_message_record(window_start_datetime) if not is_in_memory_message_record else []
+    sent_pattern_analysis_message_key_set = {get_pattern_analysis_message_key(*record) for record in record_list} | (sent_pattern_analysis_message_key_set if is_in_memory_message_record else set())
+    sent_pattern_analysis_message_record_load_date = current_date
+    sent_pattern_analysis_message_record_window_start_datetime = window_start_datetime
+    logger.log_debug_msg(f'Load {len(sent_pattern_analysis_message_key_set)} sent pattern analysis message record since {window_start_datetime} time: {time.time() - load_start_time} seconds')
+
+def get_sent_pattern_analysis_message_key_set(key_list: list) -> set:
+    with sent_pattern_analysis_message_record_lock:
+        load_sent_pattern_analysis_message_record()
+        
+        normalised_key_list = [get_pattern_analysis_message_key(*key) for key in key_list]
+        sent_key_set = {key for key in normalised_key_list if key in sent_pattern_analysis_message_key_set}
+        out_of_window_key_list = [key for key in normalised_key_list if key[1] < sent_pattern_analysis_message_record_window_start_datetime]
+    
+    for key in out_of_window_key_list:
+        if is_in_memory_message_record:
+            with sent_pattern_analysis_message_record_lock:
+                if key in sent_pattern_analysis_message_key_set:
+                    sent_key_set.add(key)
+        elif count_pattern_analysis_message(*key) >= 1:
+            sent_key_set.add(key)
+    
+    return sent_key_set
+
+def count_pattern_analysis_message(ticker: str, hit_scanner_datetime: datetime, pattern: str, bar_size: str) -> int:
     def execute(cursor: Cursor, params):
-        cursor.execute(OracleQuery.COUNT_PATTERN_ANALYSIS_MESSAGE_QUERY.value, **params)
+        cursor.execute(DatabaseQuery.COUNT_PATTERN_ANALYSIS_MESSAGE_QUERY.value, params)
         result = cursor.fetchone()
         no_of_result = result[0]
         return no_of_result
@@ -24,16 +101,14 @@ def check_if_pattern_analysis_message_sent(ticker: str, hit_scanner_datetime: da
     )
     
     params = dict(ticker=ticker, hit_scanner_datetime=hit_scanner_datetime, scan_pattern=pattern, bar_size=bar_size)
-    no_of_result = execute_in_transaction(exec, params)
-    
-    if no_of_result >= 1:
-        return True
-    else:
-        return False
+    return execute_in_transaction(exec, params)
+
+def check_if_pattern_analysis_message_sent(ticker: str, hit_scanner_datetime: datetime, pattern: str, bar_size: str) -> bool:
+    return len(get_sent_pattern_analysis_message_key_set([(ticker, hit_scanner_datetime, pattern, bar_size)])) > 0
 
 def add_sent_pattern_analysis_message_record(param_list: list):
     def execute(cursor: Cursor, params):
-        cursor.executemany(OracleQuery.ADD_PATTERN_ANALYSIS_QUERY.value, params)
+        cursor.executemany(DatabaseQuery.ADD_PATTERN_ANALYSIS_QUERY.value, params)
     
     exec = type(
         "ExecBatchPatternAnalysisInsertion",
@@ -43,11 +118,15 @@ def add_sent_pattern_analysis_message_record(param_list: list):
         }
     )
     
-    execute_in_transaction(exec, param_list)
+    if not is_in_memory_message_record:
+        execute_in_transaction(exec, param_list)
+    
+    with sent_pattern_analysis_message_record_lock:
+        sent_pattern_analysis_message_key_set.update(get_pattern_analysis_message_key(*param) for param in param_list)
 
 def delete_all_sent_pattern_analysis_message_record() -> int:
     def execute(cursor: Cursor, params):
-        cursor.executemany(OracleQuery.CLEAN_PATTERN_ANALYSIS_QUERY.value, params)
+        cursor.executemany(DatabaseQuery.CLEAN_PATTERN_ANALYSIS_QUERY.value, params)
     
     exec = type(
         "ExecCleanPatternAnalysis",
@@ -57,11 +136,15 @@ def delete_all_sent_pattern_analysis_message_record() -> int:
         }
     )
 
-    execute_in_transaction(exec)
+    if not is_in_memory_message_record:
+        execute_in_transaction(exec)
+    
+    with sent_pattern_analysis_message_record_lock:
+        sent_pattern_analysis_message_key_set.clear()
 
 def check_if_trade_summary_message_sent(ticker: str, acquired_date: datetime, sold_date: datetime, trading_platform: Broker) -> bool:
     def execute(cursor: Cursor, params):
-        cursor.execute(OracleQuery.COUNT_TRADE_SUMMARY_MESSAGE_QUERY.value, **params)
+        cursor.execute(DatabaseQuery.COUNT_TRADE_SUMMARY_MESSAGE_QUERY.value, params)
         result = cursor.fetchone()
         no_of_result = result[0]
         return no_of_result
@@ -74,7 +157,7 @@ def check_if_trade_summary_message_sent(ticker: str, acquired_date: datetime, so
         }
     )
     
-    params = dict(acquired_date=acquired_date, sold_date=sold_date, trading_platform=trading_platform)
+    params = dict(ticker=ticker, acquired_date=acquired_date, sold_date=sold_date, trading_platform=getattr(trading_platform, 'value', trading_platform))
     no_of_result = execute_in_transaction(exec, params)
     
     if no_of_result == 1:
@@ -84,10 +167,10 @@ def check_if_trade_summary_message_sent(ticker: str, acquired_date: datetime, so
 
 def add_sent_trade_summary_message_record(param_list: list):
     def execute(cursor: Cursor, params):
-        cursor.executemany(OracleQuery.ADD_PATTERN_ANALYSIS_QUERY.value, params)
+        cursor.executemany(DatabaseQuery.ADD_TRADE_SUMMARY_MESSAGE_QUERY.value, params)
     
     exec = type(
-        "ExecBatchPatternAnalysisInsertion",
+        "ExecBatchTradeSummaryInsertion",
         (ExecuteQueryImpl,),
         {
             "execute": execute
@@ -98,10 +181,10 @@ def add_sent_trade_summary_message_record(param_list: list):
     
 def delete_all_sent_trade_summary_message_record() -> int:
     def execute(cursor: Cursor, params):
-        cursor.executemany(OracleQuery.CLEAN_TRADE_SUMMARY_MESSAGE_QUERY.value, params)
+        cursor.execute(DatabaseQuery.CLEAN_TRADE_SUMMARY_MESSAGE_QUERY.value)
     
     exec = type(
-        "ExecCleanPatternAnalysis",
+        "ExecCleanTradeSummary",
         (ExecuteQueryImpl,),
         {
             "execute": execute
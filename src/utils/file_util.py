@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+from utils.config_util import ROOT_DIR
+
+def write_file_atomically(file_path: str, content: str) -> None:
+    file_dir = os.path.dirname(file_path) or '.'
+    os.makedirs(file_dir, exist_ok=True)
+
+    # Written to a temporary file and swapped in, a crash never leaves a truncated file behind
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=file_dir, suffix='.tmp', delete=False) as temp_file:
+        temp_file.write(content)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+
+    os.replace(temp_file.name, file_path)
+
+def get_root_relative_path(file_path: str) -> str:
+    if not file_path or os.path.isabs(file_path):
+        return file_path
+
+    return os.path.join(ROOT_DIR, file_path)
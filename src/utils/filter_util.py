@@ -1,4 +1,3 @@
-import pytz
 import datetime
 
 from constant.scanner.ib.instrument import Instrument
@@ -6,6 +5,8 @@ from constant.scanner.ib.scan_code import ScanCode
 from constant.scanner.scanner_target import ScannerTarget
 from constant.scanner.ib.filter_parameter import FilterParameter
 
+from utils.datetime_util import get_current_us_datetime
+
 def get_finviz_scanner_filter(scan_target: ScannerTarget):
   if scan_target == ScannerTarget.TOP_GAINER:
     scan_type = 'ta_topgainers'
@@ -19,14 +20,7 @@ def get_finviz_scanner_filter(scan_target: ScannerTarget):
   return scanner_filter
 
 def get_ib_scanner_filter(scan_target: ScannerTarget = ScannerTarget.TOP_GAINER, min_price: float = 0.3, percent_change_param: float = 10, min_usd_volume: int = 20000, max_market_cap: int = 1e6 * 500, additional_filter_list: list = []) -> dict:
-    # Get current datetime in HK time
-    hk_datetime = datetime.datetime.now()
-    
-    # Convert Hong Kong time to US/Eastern time
-    us_eastern_timezone = pytz.timezone('US/Eastern')
-    hong_kong_timezone = pytz.timezone('Asia/Hong_Kong')
-    hk_datetime = hong_kong_timezone.localize(hk_datetime)
-    us_time = hk_datetime.astimezone(us_eastern_timezone)
+    us_time = get_current_us_datetime()
     
     # Define trading hours in US/Eastern time
     normal_trading_hour_end_time = datetime.time(16, 0, 0)
@@ -1,21 +1,139 @@
 import asyncio
+import atexit
 import threading
 import aiohttp
 import time
+from typing import Callable
 
+from utils.config_util import get_config
+from utils.rate_limiter import get_rate_limiter
 from utils.logger import Logger
 
 logger = Logger()
-loop = asyncio.new_event_loop()
 
-async def fetch(session: aiohttp.ClientSession(), method: str, endpoint: str, payload: dict, semaphore, headers: dict = None):
+CONNECTION_LIMIT = get_config('HTTP_CLIENT', 'CONNECTION_LIMIT')
+CONNECTION_LIMIT_PER_HOST = get_config('HTTP_CLIENT', 'CONNECTION_LIMIT_PER_HOST')
+KEEPALIVE_TIMEOUT = get_config('HTTP_CLIENT', 'KEEPALIVE_TIMEOUT')
+
+http_client_lock = threading.Lock()
+http_client_stats_lock = threading.Lock()
+
+loop = None
+loop_thread = None
+session = None
+
+host_to_connection_stats_dict = {}
+endpoint_to_latency_stats_dict = {}
+
+async def on_request_start(session: aiohttp.ClientSession, trace_config_ctx, params):
+    trace_config_ctx.host = params.url.host
+
+async def on_connection_create_end(session: aiohttp.ClientSession, trace_config_ctx, params):
+    record_connection(getattr(trace_config_ctx, 'host', None), 'create')
+
+async def on_connection_reuseconn(session: aiohttp.ClientSession, trace_config_ctx, params):
+    record_connection(getattr(trace_config_ctx, 'host', None), 'reuse')
+
+def record_connection(host: str, connection_type: str):
+    with http_client_stats_lock:
+        connection_stats_dict = host_to_connection_stats_dict.setdefault(host, dict(create=0, reuse=0))
+        connection_stats_dict[connection_type] += 1
+
+def record_latency(method: str, endpoint: str, latency: float, is_failed: bool):
+    with http_client_stats_lock:
+        latency_stats_dict = endpoint_to_latency_stats_dict.setdefault(f'{method} {endpoint}', dict(no_of_request=0, no_of_failure=0, total_latency=0, max_latency=0, last_latency=None))
+        latency_stats_dict['no_of_request'] += 1
+        latency_stats_dict['total_latency'] += latency
+        latency_stats_dict['max_latency'] = max(latency_stats_dict['max_latency'], latency)
+        latency_stats_dict['last_latency'] = latency
+
+        if is_failed:
+            latency_stats_dict['no_of_failure'] += 1
+
+def get_http_client_stats() -> dict:
+    with http_client_stats_lock:
+        endpoint_to_latency_dict = {endpoint: dict(no_of_request=latency_stats_dict['no_of_request'],
+                                                   no_of_failure=latency_stats_dict['no_of_failure'],
+                                                   average_latency=latency_stats_dict['total_latency'] / latency_stats_dict['no_of_request'],
+                                                   max_latency=latency_stats_dict['max_latency'],
+                                                   last_latency=latency_stats_dict['last_latency']) for endpoint, latency_stats_dict in endpoint_to_latency_stats_dict.items()}
+        host_to_connection_dict = {host: dict(connection_stats_dict) for host, connection_stats_dict in host_to_connection_stats_dict.items()}
+
+    return dict(endpoint=endpoint_to_latency_dict, connection=host_to_connection_dict)
+
+async def create_session() -> aiohttp.ClientSession:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+    connector = aiohttp.TCPConnector(limit=CONNECTION_LIMIT,
+                                     limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                                     keepalive_timeout=KEEPALIVE_TIMEOUT,
+                                     ssl=False)
+
+    # Cookies are not shared between requests, same as a new session per batch
+    return aiohttp.ClientSession(connector=connector,
+                                 cookie_jar=aiohttp.DummyCookieJar(),
+                                 trace_configs=[trace_config])
+
+def get_event_loop_and_session():
+    global loop, loop_thread, session
+
+    with http_client_lock:
+        if loop is None or loop.is_closed():
+            loop = asyncio.new_event_loop()
+            loop_thread = threading.Thread(target=loop.run_forever, name='http_client_event_loop', daemon=True)
+            loop_thread.start()
+            session = None
+            logger.log_debug_msg('Start http client event loop thread')
+
+        if session is None or session.closed:
+            session = asyncio.run_coroutine_threadsafe(create_session(), loop).result()
+            logger.log_debug_msg(f'Create http client session, connection limit: {CONNECTION_LIMIT}, connection limit per host: {CONNECTION_LIMIT_PER_HOST}, keep alive timeout: {KEEPALIVE_TIMEOUT}')
+
+        return loop, session
+
+def close_http_client():
+    global loop, loop_thread, session
+
+    with http_client_lock:
+        if loop is None or loop.is_closed():
+            return
+
+        if session is not None and not session.closed:
+            asyncio.run_coroutine_threadsafe(session.close(), loop).result()
+
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join()
+        loop.close()
+
+        loop = None
+        loop_thread = None
+        session = None
+        logger.log_debug_msg(f'Close http client, stats: {get_http_client_stats()}')
+
+atexit.register(close_http_client)
+
+async def fetch(session: aiohttp.ClientSession, method: str, endpoint: str, payload: dict, semaphore, headers: dict = None, on_response: Callable = None):
     async with semaphore:
+        rate_limiter = get_rate_limiter(endpoint)
+        if rate_limiter:
+            await rate_limiter.acquire_async()
+        
+        request_start_time = time.time()
+        is_failed = False
+
         try:
             if method == 'GET':
                 logger.log_debug_msg(f"GET request with payload: {payload} send")
                 async with session.get(endpoint, params=payload, ssl=False, headers=headers) as response:
                     json_response = await response.json()
                     logger.log_debug_msg(f"GET request with payload: {payload} response: {json_response}")
+                    
+                    if on_response:
+                        on_response(payload, response.status, json_response)
+                    
                     return json_response
             elif method == 'POST':
                 async with session.post(endpoint, json=payload, ssl=False, headers=headers) as response:
@@ -28,57 +146,49 @@ async def fetch(session: aiohttp.ClientSession(), method: str, endpoint: str, pa
                     logger.log_debug_msg(f"POST request with payload: {payload} response: {json_response}")
                     return await response.json()
         except Exception as e:
+            is_failed = True
             logger.log_error_msg(f'Error during {method} request to {endpoint}, payload: {payload}, Cause: {e}, Status code: {response.status}')
             return {'status': 'FAILED', 'statusCode:': {response.status}, 'errorMsg': str(e), 'payload': payload}
+        finally:
+            record_latency(method, endpoint, time.time() - request_start_time, is_failed)
 
-async def process_async_request(method: str, endpoint: str, payload_list: list, chunk_size: int, no_of_request_per_sec: int, headers: dict = None) -> dict:
+async def process_async_request(session: aiohttp.ClientSession, method: str, endpoint: str, payload_list: list, chunk_size: int, headers: dict = None, on_response: Callable = None) -> dict:
     semaphore = asyncio.Semaphore(chunk_size)  # Limit to chunk_size concurrent requests
     result_dict = {'response_list': [], 'error_response_list': []}
-    
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        
-        all_chunk_start_time = time.time()
-        
-        for i, payload in enumerate(payload_list):
-            task = asyncio.create_task(fetch(session, method, endpoint, payload, semaphore, headers))
-            tasks.append(task)
-            
-            # If we've hit the rate limit, sleep for a second
-            if no_of_request_per_sec:
-                if (i + 1) % chunk_size == 0:
-                    logger.log_debug_msg(f'Wait {no_of_request_per_sec} to process next chunk')
-                    await asyncio.sleep(no_of_request_per_sec)
-        
-        response_list = await asyncio.gather(*tasks, return_exceptions=True)
-        logger.log_debug_msg(f'Completion of all async requests time: {time.time() - all_chunk_start_time} seconds')
-        
-        for response in response_list:
-            if 'errorMsg' in response:
-                result_dict['error_response_list'].append(response)
-            else:
-                result_dict['response_list'].append(response)
-        
+
+    tasks = []
+
+    all_chunk_start_time = time.time()
+
+    for payload in payload_list:
+        task = asyncio.create_task(fetch(session, method, endpoint, payload, semaphore, headers, on_response))
+        tasks.append(task)
+
+    response_list = await asyncio.gather(*tasks, return_exceptions=True)
+    logger.log_debug_msg(f'Completion of all async requests time: {time.time() - all_chunk_start_time} seconds')
+
+    for response in response_list:
+        if 'errorMsg' in response:
+            result_dict['error_response_list'].append(response)
+        else:
+            result_dict['response_list'].append(response)
+
     return result_dict
-        
-def send_async_request(method: str, endpoint: str, payload_list: list, chunk_size: int, no_of_request_per_sec: float = None, headers: dict = None, loop = None):
-    if loop is None:
-        logger.log_debug_msg(f'No event loop is set for {endpoint}, caller thread: {threading.current_thread().name}')
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    else:
-        logger.log_debug_msg(f'Use event loop passed from {threading.current_thread().name}')
-    
-    response_result = loop.run_until_complete(process_async_request(method, endpoint, payload_list, chunk_size, no_of_request_per_sec, headers))
-    loop.close()
-    
+
+def send_async_request(method: str, endpoint: str, payload_list: list, chunk_size: int, headers: dict = None, on_response: Callable = None):
+    event_loop, client_session = get_event_loop_and_session()
+    logger.log_debug_msg(f'Submit {method} {endpoint} requests to http client event loop, caller thread: {threading.current_thread().name}')
+
+    response_result = asyncio.run_coroutine_threadsafe(process_async_request(client_session, method, endpoint, payload_list, chunk_size, headers, on_response), event_loop).result()
+    logger.log_debug_msg(f'Http client stats: {get_http_client_stats()}')
+
     response_list = response_result['response_list']
     error_response_list = response_result['error_response_list']
-    
+
     if len(error_response_list) > 0:
         for error_response in error_response_list:
             status_code = error_response.get('statusCode')
             if status_code == 401:
                 raise aiohttp.ClientError(f'Client Portal Connection Error, response: {error_response}')
-    
-    return response_list
\ No newline at end of file
+
+    return response_list
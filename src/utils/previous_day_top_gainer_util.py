@@ -1,14 +1,23 @@
 import datetime
+import threading
 from oracledb import Cursor
 
-from sql.oracle_connector import execute_in_transaction
+from sql.database_connector import DatabaseQuery, execute_in_transaction
 from sql.execute_query_impl import ExecuteQueryImpl
 
-from constant.query.oracle_query import OracleQuery
+from utils.datetime_util import get_current_us_datetime
+from utils.logger import Logger
 
-def get_previous_day_top_gainer_list(pct_change: float, start_datetime: datetime.datetime, end_datetime: datetime.datetime) -> bool:
+logger = Logger()
+
+# (pct_change, start date, end date) -> top gainers of completed days, they never change once the day is over
+completed_day_top_gainer_cache_dict = {}
+completed_day_top_gainer_cache_date = None
+completed_day_top_gainer_cache_lock = threading.Lock()
+
+def query_previous_day_top_gainer_list(pct_change: float, start_datetime: datetime.datetime, end_datetime: datetime.datetime) -> list:
     def execute(cursor: Cursor, params):
-        cursor.execute(OracleQuery.GET_TOP_GAINER_QUERY.value, **params)
+        cursor.execute(DatabaseQuery.GET_TOP_GAINER_QUERY.value, params)
         result = cursor.fetchall()
         return result
 
@@ -19,10 +28,41 @@ def get_previous_day_top_gainer_list(pct_change: float, start_datetime: datetime
             "execute": execute
         }
     )
-    
+
     params = dict(percentage=pct_change, start_datetime=start_datetime, end_datetime=end_datetime)
     result = execute_in_transaction(exec, params)
-    
+
     return result
 
-   
+def get_previous_day_top_gainer_list(pct_change: float, start_datetime: datetime.datetime, end_datetime: datetime.datetime) -> list:
+    global completed_day_top_gainer_cache_date
+
+    current_datetime = get_current_us_datetime()
+    current_date = current_datetime.date()
+
+    # Rows are per scan date, ordered by scan date descending, so today's rows go in front of the completed days
+    current_day_top_gainer_list = []
+    if end_datetime.date() >= current_date:
+        current_day_top_gainer_list = list(query_previous_day_top_gainer_list(pct_change, max(start_datetime, current_datetime), end_datetime))
+        completed_day_end_datetime = current_datetime - datetime.timedelta(days=1)
+    else:
+        completed_day_end_datetime = end_datetime
+
+    if start_datetime.date() > completed_day_end_datetime.date():
+        return current_day_top_gainer_list
+
+    cache_key = (pct_change, start_datetime.date(), completed_day_end_datetime.date())
+
+    with completed_day_top_gainer_cache_lock:
+        if completed_day_top_gainer_cache_date != current_date:
+            completed_day_top_gainer_cache_dict.clear()
+            completed_day_top_gainer_cache_date = current_date
+
+        completed_day_top_gainer_list = completed_day_top_gainer_cache_dict.get(cache_key)
+
+        if completed_day_top_gainer_list is None:
+            completed_day_top_gainer_list = list(query_previous_day_top_gainer_list(pct_change, start_datetime, completed_day_end_datetime))
+            completed_day_top_gainer_cache_dict[cache_key] = completed_day_top_gainer_list
+            logger.log_debug_msg(f'Cache {len(completed_day_top_gainer_list)} top gainers from {cache_key[1]} to {cache_key[2]} over {pct_change}')
+
+    return current_day_top_gainer_list + completed_day_top_gainer_list
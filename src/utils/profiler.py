@@ -0,0 +1,160 @@
+from collections import deque
+from contextlib import contextmanager
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+import numpy as np
+
+from utils.config_util import ROOT_DIR, get_config
+from utils.logger import Logger
+
+logger = Logger()
+
+PROFILER_ENABLED = get_config('PROFILER', 'ENABLED')
+ROLLING_WINDOW_SIZE = get_config('PROFILER', 'ROLLING_WINDOW_SIZE')
+SUMMARY_INTERVAL_IN_SECOND = get_config('PROFILER', 'SUMMARY_INTERVAL_IN_SECOND')
+WRITE_TRACE = get_config('PROFILER', 'WRITE_TRACE')
+TRACE_FILE_PATH = get_config('PROFILER', 'TRACE_FILE_PATH')
+
+thread_local = threading.local()
+profiler_lock = threading.Lock()
+trace_file_lock = threading.Lock()
+
+cycle_id_counter = itertools.count(1)
+stage_to_duration_deque_dict = {}
+stage_to_max_duration_dict = {}
+stage_to_no_of_span_dict = {}
+last_summary_time = time.time()
+trace_file = None
+
+def get_trace_file_path() -> str:
+    if os.path.isabs(TRACE_FILE_PATH):
+        return TRACE_FILE_PATH
+
+    return os.path.join(ROOT_DIR, TRACE_FILE_PATH)
+
+def record_duration(stage: str, duration: float) -> None:
+    with profiler_lock:
+        duration_deque = stage_to_duration_deque_dict.get(stage)
+
+        if duration_deque is None:
+            duration_deque = deque(maxlen=ROLLING_WINDOW_SIZE)
+            stage_to_duration_deque_dict[stage] = duration_deque
+
+        duration_deque.append(duration)
+        stage_to_max_duration_dict[stage] = max(stage_to_max_duration_dict.get(stage, 0), duration)
+        stage_to_no_of_span_dict[stage] = stage_to_no_of_span_dict.get(stage, 0) + 1
+
+def get_profiler_summary() -> dict:
+    with profiler_lock:
+        stage_to_duration_list_dict = {stage: list(duration_deque) for stage, duration_deque in stage_to_duration_deque_dict.items()}
+        stage_to_max_duration = dict(stage_to_max_duration_dict)
+        stage_to_no_of_span = dict(stage_to_no_of_span_dict)
+
+    summary_dict = {}
+    for stage, duration_list in stage_to_duration_list_dict.items():
+        p50, p95 = np.percentile(duration_list, [50, 95])
+        summary_dict[stage] = dict(p50=float(p50),
+                                   p95=float(p95),
+                                   rolling_max=max(duration_list),
+                                   max=stage_to_max_duration[stage],
+                                   no_of_span=stage_to_no_of_span[stage])
+
+    return summary_dict
+
+def log_profiler_summary() -> None:
+    summary_dict = get_profiler_summary()
+    summary_str = '\n'.join(f'{stage}: p50 {stats["p50"]:.4f}s, p95 {stats["p95"]:.4f}s, max {stats["rolling_max"]:.4f}s (all time {stats["max"]:.4f}s), no. of span {stats["no_of_span"]}'
+                                for stage, stats in sorted(summary_dict.items(), key=lambda item: item[1]['p95'], reverse=True))
+    logger.log_debug_msg(f'Profiler summary of last {ROLLING_WINDOW_SIZE} span(s) per stage:\n{summary_str}')
+
+def log_profiler_summary_if_due() -> None:
+    global last_summary_time
+
+    with profiler_lock:
+        if time.time() - last_summary_time < SUMMARY_INTERVAL_IN_SECOND:
+            return
+
+        last_summary_time = time.time()
+
+    log_profiler_summary()
+
+def write_trace(cycle_trace_dict: dict) -> None:
+    global trace_file
+
+    try:
+        with trace_file_lock:
+            if trace_file is None:
+                trace_file = open(get_trace_file_path(), 'a', encoding='utf-8')
+
+            trace_file.write(json.dumps(cycle_trace_dict, default=str) + '\n')
+            trace_file.flush()
+    except OSError as os_exception:
+        logger.log_error_msg(f'Failed to write profiler trace, {os_exception}')
+
+def close_trace_file() -> None:
+    global trace_file
+
+    with trace_file_lock:
+        if trace_file is not None:
+            trace_file.close()
+            trace_file = None
+
+atexit.register(close_trace_file)
+
+@contextmanager
+def profile_span(stage: str):
+    if not PROFILER_ENABLED:
+        yield
+        return
+
+    span_stack = getattr(thread_local, 'span_stack', None)
+    if span_stack is None:
+        span_stack = []
+        thread_local.span_stack = span_stack
+
+    span_dict = dict(stage=stage, depth=len(span_stack), start_time=time.time(), duration=None)
+    if span_stack:
+        span_stack[-1].setdefault('child_list', []).append(span_dict)
+
+    span_stack.append(span_dict)
+    start_time = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        span_dict['duration'] = time.perf_counter() - start_time
+        span_stack.pop()
+        record_duration(stage, span_dict['duration'])
+
+# Root span of one scan family cycle, the nested spans are written to the trace file as one JSON line
+@contextmanager
+def profile_scan_cycle(scan_family: str):
+    if not PROFILER_ENABLED:
+        yield
+        return
+
+    cycle_id = next(cycle_id_counter)
+    thread_local.span_stack = []
+    is_failed = False
+
+    try:
+        with profile_span(scan_family):
+            cycle_span_dict = thread_local.span_stack[0]
+            yield
+    except Exception:
+        is_failed = True
+        raise
+    finally:
+        thread_local.span_stack = None
+
+        if WRITE_TRACE:
+            write_trace(dict(cycle_id=cycle_id,
+                             thread=threading.current_thread().name,
+                             is_failed=is_failed,
+                             **cycle_span_dict))
+
+        log_profiler_summary_if_due()
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+from constant.endpoint.ib.client_portal_api_endpoint import CLIENT_PORTAL_API_ENDPOINT_TO_RATE_LIMIT_DICT, ClientPortalApiEndpoint
+
+from utils.logger import Logger
+
+logger = Logger()
+
+class TokenBucketRateLimiter:
+    def __init__(self, name: str, capacity: float, refill_rate_per_sec: float):
+        self.__name = name
+        self.__capacity = capacity
+        self.__refill_rate_per_sec = refill_rate_per_sec
+        self.__token = capacity
+        self.__last_refill_time = time.monotonic()
+        self.__lock = threading.Lock()
+
+        self.__no_of_acquire = 0
+        self.__no_of_wait = 0
+        self.__total_wait_time = 0
+        self.__max_wait_time = 0
+
+    @property
+    def name(self):
+        return self.__name
+
+    def __refill(self, current_time: float) -> None:
+        self.__token = min(self.__capacity, self.__token + (current_time - self.__last_refill_time) * self.__refill_rate_per_sec)
+        self.__last_refill_time = current_time
+
+    def __reserve(self, no_of_token: float) -> float:
+        # Token is taken at once and may go negative, the deficit is the time the caller has to wait for
+        with self.__lock:
+            self.__refill(time.monotonic())
+            self.__token -= no_of_token
+            wait_time = max(0, -self.__token / self.__refill_rate_per_sec)
+
+            self.__no_of_acquire += 1
+            if wait_time > 0:
+                self.__no_of_wait += 1
+                self.__total_wait_time += wait_time
+                self.__max_wait_time = max(self.__max_wait_time, wait_time)
+
+        if wait_time > 0:
+            logger.log_debug_msg(f'{self.__name} rate limit reached, wait {wait_time} seconds')
+
+        return wait_time
+
+    def acquire(self, no_of_token: float = 1) -> float:
+        wait_time = self.__reserve(no_of_token)
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+        return wait_time
+
+    async def acquire_async(self, no_of_token: float = 1) -> float:
+        wait_time = self.__reserve(no_of_token)
+
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+        return wait_time
+
+    def get_metrics(self) -> dict:
+        with self.__lock:
+            self.__refill(time.monotonic())
+            return dict(available_token=self.__token,
+                        capacity=self.__capacity,
+                        refill_rate_per_sec=self.__refill_rate_per_sec,
+                        no_of_acquire=self.__no_of_acquire,
+                        no_of_wait=self.__no_of_wait,
+                        total_wait_time=self.__total_wait_time,
+                        max_wait_time=self.__max_wait_time)
+
+endpoint_to_rate_limiter_dict = {ClientPortalApiEndpoint.HOSTNAME + endpoint: TokenBucketRateLimiter(endpoint.value, capacity, refill_rate_per_sec)
+                                    for endpoint, (capacity, refill_rate_per_sec) in CLIENT_PORTAL_API_ENDPOINT_TO_RATE_LIMIT_DICT.items()}
+
+def get_rate_limiter(endpoint: str) -> TokenBucketRateLimiter:
+    return endpoint_to_rate_limiter_dict.get(endpoint)
+
+def get_rate_limiter_metrics() -> dict:
+    return {rate_limiter.name: rate_limiter.get_metrics() for rate_limiter in endpoint_to_rate_limiter_dict.values()}